@@ -0,0 +1,126 @@
+"""Background autosaves of a game into rotating slots
+"""
+import copy
+import marshal
+import os
+import threading
+
+import dork.saveload as saveload
+
+__all__ = ["AutoSave", "open_autosave", "slot_name"]
+
+
+def slot_name(save_name, slot):
+    """returns the file name of an autosave slot, the slot number put
+    before the suffixes of save_name, as in autosave.1.yml.gz
+    """
+    directory, base = os.path.split(save_name)
+    stem, dot, suffix = base.partition(".")
+    return os.path.join(directory, f"{stem}.{slot}{dot}{suffix}")
+
+
+class AutoSave():
+    """Saves a game every few commands without blocking the prompt
+
+    The game is snapshotted on the calling thread, which only copies
+    plain data, through marshal, or copy.deepcopy for data marshal cannot
+    hold, such as dates, and a worker thread serialises and writes it through
+    dork.saveload.dump_file, which writes a temporary file and moves it
+    in place, so a crash mid-write never corrupts a slot. Writes cycle
+    through slots numbered 1 to slots, starting after the newest one.
+    A snapshot still waiting for the worker is replaced by a newer one,
+    so a slow disk skips autosaves rather than holding up the game.
+
+    Attributes:
+        error: the last error the worker hit, None if there was none
+
+    Args:
+        game: dork.types.Game to autosave
+        save_name: file name the slot names are made from, see slot_name
+        slots: number of slots to rotate through
+        every: number of commands between autosaves
+    """
+
+    # pylint: disable=too-many-instance-attributes
+    def __init__(self, game, save_name, slots=3, every=10):
+        self._game = game
+        self.save_name = save_name
+        self.slots = slots
+        self.every = every
+        self.error = None
+        newest = self.latest()
+        self._slot = 1 if newest is None else newest % slots + 1
+        self._count = 0
+        self._pending = None
+        self._closed = False
+        self._condition = threading.Condition()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def latest(self):
+        """returns the number of the newest slot, None if none was written
+        """
+        written = [(os.path.getmtime(slot_name(self.save_name, slot)), slot)
+                   for slot in range(1, self.slots + 1)
+                   if os.path.exists(slot_name(self.save_name, slot))]
+        return max(written)[1] if written else None
+
+    def tick(self):
+        """counts a command, autosaving every so many of them, and reports
+        the last error of the worker, if any
+        """
+        if self.error is not None:
+            print("Autosave failed: " + str(self.error))
+            self.error = None
+        self._count += 1
+        if self._count >= self.every:
+            self.request()
+
+    def request(self):
+        """snapshots the game and hands it to the worker
+        """
+        self._count = 0
+        game = self._game
+        data = saveload.save_data(game)
+        try:
+            snapshot = marshal.loads(marshal.dumps(data))
+        except ValueError:
+            snapshot = copy.deepcopy(data)
+        with self._condition:
+            self._pending = snapshot
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed:
+                    self._condition.wait()
+                if self._pending is None:
+                    return
+                snapshot, self._pending = self._pending, None
+            try:
+                saveload.dump_file(snapshot,
+                                   slot_name(self.save_name, self._slot))
+                self._slot = self._slot % self.slots + 1
+            except (OSError, ValueError) as error:
+                self.error = error
+
+    def close(self):
+        """writes the snapshot still waiting, if any, and stops the worker
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._worker.join()
+
+
+def open_autosave(game, save_name=None):
+    """returns an AutoSave of game named save_name, by default by the
+    DORK_AUTOSAVE environment variable, None if neither is set
+    """
+    save_name = save_name or os.environ.get("DORK_AUTOSAVE")
+    if not save_name:
+        return None
+    return AutoSave(game, save_name,
+                    int(os.environ.get("DORK_AUTOSAVE_SLOTS", "3")),
+                    int(os.environ.get("DORK_AUTOSAVE_EVERY", "10")))
@@ -0,0 +1,415 @@
+"""Compact binary save format for dork
+"""
+import io
+import struct
+import sys
+from array import array
+from itertools import accumulate, chain, islice
+
+__all__ = ["MAGIC", "VERSION", "ROOM_PARTS", "dump", "dumps", "loads",
+           "is_binary"]
+
+MAGIC = b"DORKSAV\0"
+VERSION = 1
+
+_HEADER = struct.Struct("<8sHHI")
+_COUNT = struct.Struct("<Q")
+
+ROOM_PARTS = (
+    ("messages", ("description", "inspect", "unlock message")),
+    ("door", ("item", "locked", "unlock")),
+    ("fight", ("enemy", "fight")),
+    ("paths", ("up", "down", "left", "right")),
+)
+
+_PART_NAMES = tuple(part for part, _ in ROOM_PARTS)
+
+MISSING, LISTED, NONE, FALSE, TRUE, DICT, LIST, INT, FLOAT = range(-1, -10, -1)
+
+ABSENT, NULL, PRESENT = range(3)
+
+_ALL_PRESENT = sum(PRESENT << (2 * shift)
+                   for shift in range(len(_PART_NAMES)))
+
+_SCALARS = {str, bool, type(None)}
+
+
+class _Marker():
+    """Stands for a missing or listed value while rooms are rebuilt
+    """
+    __slots__ = ()
+
+
+_MISSING_VALUE, _LISTED_VALUE = _Marker(), _Marker()
+
+# appended to the string table, so the negative codes from TRUE to
+# MISSING index their values
+_CONSTANTS = [True, False, None, _LISTED_VALUE, _MISSING_VALUE]
+
+_FIELDS = sum(len(keys) for _, keys in ROOM_PARTS)
+
+
+class _Strings():
+    """String table of a save, every distinct string stored once
+
+    Codes of strings index the table, None, False and True have negative
+    codes of their own.
+    """
+
+    def __init__(self):
+        self.strings = []
+        self.ids = {None: NONE, False: FALSE, True: TRUE}
+
+    def code(self, value):
+        """returns the code of a string, None or boolean
+
+        Raises:
+            ValueError: value is of any other type
+        """
+        if type(value) not in _SCALARS:
+            raise ValueError(f"cannot store {type(value).__name__} "
+                             f"in a binary room")
+        found = self.ids.get(value)
+        if found is None:
+            found = self.ids[value] = len(self.strings)
+            self.strings.append(value)
+        return found
+
+    def codes(self, values):
+        """returns an array of the codes of a list of strings, None and
+        booleans, adding new strings in bulk
+
+        Raises:
+            ValueError: a value is of any other type
+        """
+        kinds = set(map(type, values))
+        if not kinds <= _SCALARS:
+            raise ValueError(f"cannot store {sorted(map(str, kinds))} "
+                             f"in a binary room")
+        fresh = dict.fromkeys(values).keys() - self.ids.keys()
+        self.ids.update(zip(fresh, range(len(self.strings),
+                                         len(self.strings) + len(fresh))))
+        self.strings.extend(fresh)
+        return array("i", map(self.ids.__getitem__, values))
+
+    def arrays(self):
+        """returns the string lengths and the utf-8 text of the table
+        """
+        text = "".join(self.strings).encode("utf-8", "surrogatepass")
+        return array("I", map(len, self.strings)), array("B", text)
+
+
+def _strings(lengths, text):
+    """returns the string table read back from the arrays of
+    _Strings.arrays, followed by _CONSTANTS so codes index it directly
+    """
+    text = text.tobytes().decode("utf-8", "surrogatepass")
+    strings = [sys.intern(text[end - length:end])
+               for end, length in zip(accumulate(lengths), lengths)]
+    return strings + _CONSTANTS
+
+
+def _tree(value, strings, numbers, tokens):
+    """appends a nested dictionary, list or scalar to tokens
+    """
+    if isinstance(value, dict):
+        tokens.extend((DICT, len(value)))
+        for key, element in value.items():
+            _tree(key, strings, numbers, tokens)
+            _tree(element, strings, numbers, tokens)
+    elif isinstance(value, list):
+        tokens.extend((LIST, len(value)))
+        for element in value:
+            _tree(element, strings, numbers, tokens)
+    elif type(value) in (int, float):
+        ints, floats = numbers
+        table = ints if isinstance(value, int) else floats
+        tokens.extend((INT if table is ints else FLOAT, len(table)))
+        try:
+            table.append(value)
+        except OverflowError:
+            raise ValueError(f"{value} does not fit a binary save") from None
+    else:
+        tokens.append(strings.code(value))
+
+
+def _untree(tokens, values, numbers):
+    """reads back one value written by _tree from an iterator of tokens
+    """
+    token = next(tokens)
+    if token == DICT:
+        return dict((_untree(tokens, values, numbers),
+                     _untree(tokens, values, numbers))
+                    for _ in range(next(tokens)))
+    if token == LIST:
+        return [_untree(tokens, values, numbers)
+                for _ in range(next(tokens))]
+    if token in (INT, FLOAT):
+        return numbers[token == FLOAT][next(tokens)]
+    return values[token]
+
+
+def _uniform(rooms):
+    """returns the value columns of rooms that all hold every key of
+    every part, one column per key in ROOM_PARTS order, None otherwise
+    """
+    if set(map(type, rooms)) != {dict} or\
+       set(map(len, rooms)) != {len(ROOM_PARTS)}:
+        return None
+    columns = []
+    for part, keys in ROOM_PARTS:
+        try:
+            records = [room[part] for room in rooms]
+        except KeyError:
+            return None
+        if set(map(type, records)) != {dict} or\
+           set(map(len, records)) != {len(keys)}:
+            return None
+        try:
+            columns.extend([record[key] for record in records]
+                           for key in keys)
+        except KeyError:
+            return None
+    return columns
+
+
+def _room_columns(rooms, strings):
+    """splits rooms into code columns, one per key in ROOM_PARTS order
+
+    Rooms holding every key of every part are split column by column,
+    any others room by room. Lists are stored apart, field by field and
+    room by room within a field, each as its length and its codes.
+
+    Returns:
+        parts, list lengths and list codes arrays, and the columns
+
+    Raises:
+        ValueError: a room holds a key or a value the format has no
+        column for
+    """
+    rooms = list(rooms)
+    columns = _uniform(rooms)
+    if columns is None:
+        return _room_rows(rooms, strings)
+    parts = array("B", [_ALL_PRESENT]) * len(rooms)
+    lengths, items, fields = array("I"), array("i"), []
+    for column in columns:
+        if set(map(type, column)) == {list}:
+            lengths.extend(map(len, column))
+            items.extend(strings.codes(list(chain.from_iterable(column))))
+            fields.append(array("i", [LISTED]) * len(column))
+        else:
+            fields.append(strings.codes(column))
+    return parts, lengths, items, fields
+
+
+def _room_rows(rooms, strings):
+    """_room_columns for rooms that lack keys or parts, room by room
+    """
+    # pylint: disable=too-many-locals
+    parts = array("B")
+    columns = [[] for _ in range(_FIELDS)]
+    lists = [[] for _ in columns]
+    for room in rooms:
+        if not isinstance(room, dict) or set(room).difference(_PART_NAMES):
+            raise ValueError(f"no binary form for room {room!r}")
+        flags = 0
+        column = 0
+        for shift, (part, keys) in enumerate(ROOM_PARTS):
+            record = room.get(part, _MISSING_VALUE)
+            state = ABSENT if record is _MISSING_VALUE else\
+                NULL if record is None else PRESENT
+            if state == PRESENT and (not isinstance(record, dict) or
+                                     set(record).difference(keys)):
+                raise ValueError(f"no binary form for {part} {record!r}")
+            flags |= state << (2 * shift)
+            for key in keys:
+                value = record.get(key, _MISSING_VALUE)\
+                    if state == PRESENT else _MISSING_VALUE
+                if value is _MISSING_VALUE:
+                    columns[column].append(MISSING)
+                elif isinstance(value, list):
+                    columns[column].append(LISTED)
+                    lists[column].append(value)
+                else:
+                    columns[column].append(strings.code(value))
+                column += 1
+        parts.append(flags)
+    lengths, items = array("I"), array("i")
+    for column in lists:
+        lengths.extend(map(len, column))
+        items.extend(strings.codes(list(chain.from_iterable(column))))
+    return parts, lengths, items, [array("i", column) for column in columns]
+
+
+def _values(column, values, lists):
+    """decodes a column of codes, taking listed values from lists
+    """
+    decoded = list(map(values.__getitem__, column))
+    if column.count(LISTED):
+        decoded = [next(lists) if value is _LISTED_VALUE else value
+                   for value in decoded]
+    return decoded
+
+
+def _records(keys, columns, states):
+    """rebuilds the records of one part of every room
+
+    Args:
+        keys: keys of the part
+        columns: decoded values, one list per key
+        states: state of the part per room, None if present in all
+    """
+    if states is None and\
+       not any(_MISSING_VALUE in column for column in columns):
+        return [dict(zip(keys, row)) for row in zip(*columns)]
+    states = states or [PRESENT] * len(columns[0])
+    return [{key: value for key, value in zip(keys, row)
+             if value is not _MISSING_VALUE}
+            if state == PRESENT else
+            None if state == NULL else _MISSING_VALUE
+            for state, row in zip(states, zip(*columns))]
+
+
+def _rooms(names, parts, lists, fields, values):
+    """rebuilds the rooms dictionary from the arrays of _room_columns
+
+    Args:
+        names: codes of the room names
+        parts: which parts each room holds
+        lists: list lengths and list codes arrays
+        fields: code columns, one per key in ROOM_PARTS order
+        values: string table followed by _CONSTANTS
+    """
+    lengths, items = lists
+    listed = iter(list(map(values.__getitem__, items)))
+    lists = (list(islice(listed, length)) for length in lengths)
+    uniform = parts.count(_ALL_PRESENT) == len(parts)
+    records = []
+    column = 0
+    for shift, (_, keys) in enumerate(ROOM_PARTS):
+        columns = [_values(field, values, lists)
+                   for field in fields[column:column + len(keys)]]
+        states = None if uniform else\
+            [(flags >> (2 * shift)) & 3 for flags in parts]
+        records.append(_records(keys, columns, states))
+        column += len(keys)
+    names = map(values.__getitem__, names)
+    if uniform:
+        return {name: dict(zip(_PART_NAMES, row))
+                for name, row in zip(names, zip(*records))}
+    return {name: {part: record for part, record in zip(_PART_NAMES, row)
+                   if record is not _MISSING_VALUE}
+            for name, row in zip(names, zip(*records))}
+
+
+def _write_array(stream, data):
+    """writes an array, prefixed by its length, in little endian order
+    """
+    stream.write(_COUNT.pack(len(data)))
+    if sys.byteorder == "big" and data.itemsize > 1:
+        data = array(data.typecode, data)
+        data.byteswap()
+    stream.write(data.tobytes())
+
+
+def _read_array(buffer, offset, typecode):
+    """reads an array written by _write_array
+
+    Returns:
+        2-tuple of the array and the offset after it
+
+    Raises:
+        ValueError: the buffer ends inside the array
+    """
+    if offset + _COUNT.size > len(buffer):
+        raise ValueError("binary save is truncated")
+    (count,) = _COUNT.unpack_from(buffer, offset)
+    offset += _COUNT.size
+    data = array(typecode)
+    end = offset + count * data.itemsize
+    if end > len(buffer):
+        raise ValueError("binary save is truncated")
+    data.frombytes(buffer[offset:end])
+    if sys.byteorder == "big" and data.itemsize > 1:
+        data.byteswap()
+    return data, end
+
+
+def is_binary(prefix):
+    """returns True if bytes start like a binary save
+    """
+    return bytes(prefix[:len(MAGIC)]) == MAGIC
+
+
+def dump(data, stream):
+    """writes game data, as from Game.save or Game.save_overlay, to a
+    binary stream
+
+    The header holds MAGIC, VERSION, whether there are rooms and how
+    many. It is followed by the string table, the numbers and tokens of
+    everything but the rooms, then the rooms: their names, which parts
+    they hold, their lists and one column of codes per key of
+    ROOM_PARTS, every array prefixed by its length.
+
+    Args:
+        data: dictionary of game data
+        stream: file opened for binary writing
+
+    Raises:
+        ValueError: data holds something the format cannot store
+    """
+    strings = _Strings()
+    rooms = data.get("rooms") or {}
+    names = strings.codes(list(rooms))
+    if len(names) and set(map(type, rooms)) != {str}:
+        raise ValueError("binary saves need string room names")
+    parts, lengths, items, fields = _room_columns(rooms.values(), strings)
+    numbers = array("q"), array("d")
+    tokens = array("i")
+    _tree({key: value for key, value in data.items() if key != "rooms"},
+          strings, numbers, tokens)
+    stream.write(_HEADER.pack(MAGIC, VERSION, "rooms" in data, len(rooms)))
+    for data_array in (*strings.arrays(), *numbers, tokens, names, parts,
+                       lengths, items, *fields):
+        _write_array(stream, data_array)
+
+
+def dumps(data):
+    """returns game data as the bytes of a binary save, see dump
+    """
+    stream = io.BytesIO()
+    dump(data, stream)
+    return stream.getvalue()
+
+
+def loads(buffer):
+    """reads game data back from the bytes of a binary save
+
+    Args:
+        buffer: bytes-like object, as from dumps
+
+    Returns:
+        dictionary of game data
+
+    Raises:
+        ValueError: buffer is not a binary save, or one of a later version
+    """
+    buffer = memoryview(buffer)
+    if len(buffer) < _HEADER.size or not is_binary(buffer):
+        raise ValueError("not a binary save")
+    _, version, has_rooms, _ = _HEADER.unpack_from(buffer)
+    if version > VERSION:
+        raise ValueError(f"binary save version {version} is newer "
+                         f"than {VERSION}")
+    offset = _HEADER.size
+    arrays = []
+    for typecode in "IBqdiiBIi" + "i" * _FIELDS:
+        data_array, offset = _read_array(buffer, offset, typecode)
+        arrays.append(data_array)
+    values = _strings(arrays[0], arrays[1])
+    data = _untree(iter(arrays[4]), values, arrays[2:4])
+    if has_rooms:
+        data["rooms"] = _rooms(arrays[5], arrays[6], arrays[7:9], arrays[9:],
+                               values)
+    return data
@@ -0,0 +1,174 @@
+"""World bundles, worlds split into region files loaded in parallel
+"""
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import dork.saveload as saveload
+
+__all__ = ["BUNDLE_SUFFIX", "MANIFEST_NAME", "REGION_SEPARATOR",
+           "load_bundle", "merge"]
+
+BUNDLE_SUFFIX = ".bundle"
+MANIFEST_NAME = "manifest.yml"
+REGION_SEPARATOR = "/"
+
+_SECTIONS = ("rooms", "items", "npc")
+
+
+def _parse_region(file_name):
+    """parses a region file, safe to run in a worker process
+
+    Returns:
+        2-tuple of the region data and the sha256 hex digest of the file
+    """
+    documents, digest = saveload.parse_file(file_name)
+    return saveload.fold(documents) if documents else {}, digest
+
+
+def _resolve(target, region, owners, rooms):
+    """returns the room a path names, None if there is no such room
+
+    Args:
+        target: room name, plain or qualified as region/room
+        region: name of the region the path is in
+        owners: dictionary of room names to the region that defines them
+        rooms: dictionary of region names to the room names they define
+    """
+    if target in rooms.get(region, ()):
+        return target
+    named, separator, room = target.partition(REGION_SEPARATOR)
+    if separator and named in rooms:
+        return room if room in rooms[named] and\
+            owners.get(room) == named else None
+    return target if target in owners else None
+
+
+def _resolve_paths(entry, room, names, conflicts):
+    """makes the paths of a room name rooms by their plain names, closing
+    those naming no room, see _resolve
+
+    Args:
+        entry: name of the room
+        room: room data
+        names: 2-tuple of the owners and rooms arguments of _resolve
+        conflicts: list to add conflicts to
+    """
+    owners, rooms = names
+    paths = room.get("paths") or {}
+    for direction, target in paths.items():
+        if not target:
+            continue
+        resolved = _resolve(target, owners[entry], owners, rooms)
+        if resolved is None:
+            conflicts.append(f"path {direction} of room {entry} names "
+                             f"unknown room {target}, closing it")
+            resolved = ""
+        paths[direction] = resolved
+
+
+def _player(regions, conflicts):
+    """returns the player of the first region that has one, None if none
+    does, adding a conflict if more than one does
+    """
+    players = [name for name, region in regions if "player" in region]
+    if not players:
+        return None
+    if len(players) > 1:
+        conflicts.append("player is in regions " + ", ".join(players) +
+                         ", using " + players[0])
+    return dict(regions)[players[0]]["player"]
+
+
+def merge(regions, player=None):
+    """merges the data of regions into the data of one world
+
+    Rooms, items and npcs keep their names. A name defined differently
+    by two regions is a conflict, the region listed first wins. Paths
+    naming a room of their own region, or of any region if only one
+    defines it, are kept, and so are paths naming a room as region/room,
+    which are made plain. Paths naming no room are conflicts and closed.
+
+    Args:
+        regions: list of (region name, region data), in manifest order
+        player: player data, by default that of the first region with one
+
+    Returns:
+        2-tuple of the world data and the list of conflicts, as messages
+    """
+    data = {section: {} for section in _SECTIONS}
+    owners = {}
+    rooms = {}
+    conflicts = []
+    if player is None:
+        player = _player(regions, conflicts)
+    if player is not None:
+        data["player"] = player
+    for name, region in regions:
+        rooms[name] = set(region.get("rooms") or ())
+        for section in _SECTIONS:
+            for entry, value in (region.get(section) or {}).items():
+                if entry not in data[section]:
+                    data[section][entry] = value
+                    if section == "rooms":
+                        owners[entry] = name
+                elif data[section][entry] != value:
+                    conflicts.append(f"{section} {entry} of region {name} "
+                                     f"is already defined, keeping it "
+                                     f"as before")
+    for entry, room in data["rooms"].items():
+        _resolve_paths(entry, room, (owners, rooms), conflicts)
+    return data, conflicts
+
+
+def load_bundle(bundle_name, max_workers=None):
+    """loads a world bundle, a directory holding a manifest and the
+    region files it lists
+
+    The manifest, MANIFEST_NAME, holds a regions mapping of region names
+    to file names relative to the bundle, and may hold the player. The
+    region files hold rooms, items and npcs like any world file and are
+    parsed concurrently in worker processes, then merged, see merge.
+    Conflicts are printed. The merged world is added to the store, so
+    games loaded from a bundle can be saved as overlays.
+
+    Args:
+        bundle_name: path of the bundle directory
+        max_workers: process count for parsing, 1 parses in this process
+
+    Returns:
+        dictionary of game data, as from dork.saveload.load_file
+
+    Raises:
+        FileNotFoundError: the bundle has no manifest, or a region file
+            is missing
+        ValueError: the manifest lists no regions
+    """
+    manifest, digest = _parse_region(os.path.join(bundle_name,
+                                                  MANIFEST_NAME))
+    names = list((manifest.get("regions") or {}).keys())
+    if not names:
+        raise ValueError(f"manifest of {bundle_name} lists no regions")
+    files = [os.path.join(bundle_name, manifest["regions"][name])
+             for name in names]
+    if max_workers == 1 or len(files) == 1:
+        parsed = list(map(_parse_region, files))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            parsed = list(pool.map(_parse_region, files))
+    data, conflicts = merge([(name, region) for name, (region, _)
+                             in zip(names, parsed)], manifest.get("player"))
+    for conflict in conflicts:
+        print("Conflict in " + bundle_name + ": " + conflict)
+    base = hashlib.sha256(digest.encode())
+    for _, region_digest in parsed:
+        base.update(region_digest.encode())
+    stored = os.path.join(saveload.store_dir(), base.hexdigest() + ".yml")
+    if not os.path.exists(stored):
+        os.makedirs(saveload.store_dir(), exist_ok=True)
+        saveload.dump_file(data, stored)
+    data["base"] = base.hexdigest()
+    return data
+
+
+saveload.LOADERS[BUNDLE_SUFFIX] = load_bundle
@@ -0,0 +1,194 @@
+"""Catalog of the worlds and saves in a directory, kept in an index
+"""
+import hashlib
+import json
+import os
+import time
+
+import yaml
+
+import dork.saveload as saveload
+import dork.worldfile as worldfile
+
+__all__ = ["Catalog", "INDEX_SUFFIX", "describe", "index_file",
+           "is_listed"]
+
+INDEX_SUFFIX = ".catalog.json"
+INDEX_VERSION = 1
+
+_SUFFIXES = tuple(suffix + compressed for suffix in
+                  (".yml", saveload.BINARY_SUFFIX, saveload.WORLD_SUFFIX)
+                  for compressed in ("", *saveload.COMPRESSORS))
+
+
+def is_listed(file_name):
+    """returns True if a file is named like a world or a save
+    """
+    return file_name.endswith(_SUFFIXES) and\
+        not os.path.basename(file_name).startswith(".")
+
+
+def index_file(directory):
+    """returns the path of the index of a directory, in the catalogs
+    folder of the store, named after the sha256 hex digest of the
+    absolute path of the directory, so listing never writes to it
+    """
+    key = hashlib.sha256(os.path.abspath(directory).encode()).hexdigest()
+    return os.path.join(saveload.store_dir(), "catalogs", key + INDEX_SUFFIX)
+
+
+def _location(data):
+    """returns where the player of game data is, None if it has no player
+    """
+    player = data.get("player")
+    if isinstance(player, dict) and isinstance(player.get("position"), dict):
+        return player["position"].get("location")
+    return None
+
+
+def _room_count(data):
+    """returns the number of rooms of game data, those of the base world
+    for overlay saves, None if that world is not in the store
+    """
+    if "base" in data:
+        try:
+            base = saveload.parse_file(saveload.resolve_world(data["base"]))
+        except FileNotFoundError:
+            return None
+        data = base[0][0]
+    return len(data.get("rooms") or {})
+
+
+def describe(file_name):
+    """returns the catalog entry of a world or save, parsing it whole
+
+    Args:
+        file_name: path of the file
+
+    Returns:
+        dictionary with the size, mtime in nanoseconds, sha256 hash,
+        room count and player location of the file, the last three None
+        if the file cannot be read as a game
+    """
+    stat = os.stat(file_name)
+    entry = {"size": stat.st_size, "mtime": stat.st_mtime_ns,
+             "hash": None, "rooms": None, "location": None}
+    try:
+        if worldfile.is_world_file(file_name):
+            world = worldfile.WorldFile(file_name)
+            data = world.data()
+            entry.update(hash=world.digest, rooms=len(world),
+                         location=_location(data))
+            world.close()
+            return entry
+        documents, entry["hash"] = saveload.parse_file(file_name)
+        if documents and isinstance(documents[0], dict):
+            data = saveload.fold(documents)
+            entry.update(rooms=_room_count(data), location=_location(data))
+    except (OSError, ValueError, KeyError, TypeError, yaml.YAMLError):
+        pass
+    return entry
+
+
+class Catalog():
+    """Worlds and saves of a directory and its subdirectories
+
+    The entries are kept in an index file in the store, see index_file.
+    Refreshing it only stats the files, and parses those whose mtime or
+    size changed since, so listing thousands of saves costs a directory
+    scan rather than thousands of parses.
+
+    Attributes:
+        entries: dictionary of file names, relative to the directory, to
+            their entries, see describe
+
+    Args:
+        directory: path of the directory
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._index = index_file(directory)
+        self.entries = {}
+        try:
+            with open(self._index, encoding="utf-8") as index:
+                stored = json.load(index)
+            if stored.get("version") == INDEX_VERSION:
+                self.entries = stored["entries"]
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+
+    def _scan(self, directory):
+        """yields the directory entries of the listed files below directory
+        """
+        try:
+            with os.scandir(directory) as found:
+                for entry in list(found):
+                    if entry.name.startswith("."):
+                        continue
+                    if entry.is_dir():
+                        yield from self._scan(entry.path)
+                    elif entry.is_file() and is_listed(entry.name):
+                        yield entry
+        except FileNotFoundError:
+            pass
+
+    def refresh(self):
+        """brings the entries up to date with the files, parsing only the
+        new and changed ones, and writes the index if anything changed
+
+        Returns:
+            the catalog
+        """
+        entries = {}
+        changed = False
+        for found in self._scan(self.directory):
+            name = os.path.relpath(found.path, self.directory)\
+                .replace(os.sep, "/")
+            stat = found.stat()
+            entry = self.entries.get(name)
+            if entry is None or entry["mtime"] != stat.st_mtime_ns or\
+               entry["size"] != stat.st_size:
+                entry = describe(found.path)
+                changed = True
+            entries[name] = entry
+        changed = changed or len(entries) != len(self.entries)
+        self.entries = entries
+        if changed:
+            self._write()
+        return self
+
+    def _write(self):
+        """writes the index, quietly giving up on read only stores
+        """
+        try:
+            os.makedirs(os.path.dirname(self._index), exist_ok=True)
+            with open(self._index + ".tmp", "w", encoding="utf-8") as index:
+                json.dump({"version": INDEX_VERSION,
+                           "entries": self.entries}, index)
+            os.replace(self._index + ".tmp", self._index)
+        except OSError:
+            pass
+
+    def names(self):
+        """returns the names of the files, sorted
+        """
+        return sorted(self.entries)
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def lines(self):
+        """returns a line describing every file, sorted by name
+        """
+        lines = []
+        for name in self.names():
+            entry = self.entries[name]
+            rooms = "?" if entry["rooms"] is None else entry["rooms"]
+            modified = time.strftime("%Y-%m-%d %H:%M",
+                                     time.localtime(entry["mtime"] / 1e9))
+            lines.append(f"{name}  {rooms} rooms  "
+                         f"at {entry['location'] or '?'}  "
+                         f"{entry['size']} bytes  {modified}  "
+                         f"{(entry['hash'] or '?')[:12]}")
+        return lines
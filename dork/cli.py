@@ -4,16 +4,28 @@
 import argparse
 import os
 import re
+from functools import partial
 from io import StringIO
 import cursor
 import dork
+import dork.bundle  # registers the loader of world bundles
 import dork.saveload as sl
+from dork.autosave import open_autosave
+from dork.catalog import Catalog
+from dork.journal import open_journal
+from dork.minimap import BACKENDS, WORKERS
 
 
 __all__ = ["main"]
 
 __EXTENSION__ = ".yml"
 
+# game settings the command line can give, with the names they must be
+# one of, None for any value. Unset ones fall back to their environment
+# variables where the game uses them.
+SETTINGS = {"map": BACKENDS, "map_worker": WORKERS, "journal": None,
+            "autosave": None}
+
 
 def is_filename_compliant(filename):
     """checks if filename follows win and unix naming guidelines
@@ -43,10 +55,32 @@ def get_help_message(argparser):
     return msg
 
 
+def _game_settings(arglist):
+    """returns the SETTINGS given on the command line, None if one is not
+    a known name
+    """
+    settings = {}
+    for option, choices in SETTINGS.items():
+        value = getattr(arglist, option, None)
+        if not value:
+            continue
+        if choices is not None and value not in choices:
+            print(option.replace("_", " ") + " " + value +
+                  " does not exist, use one of " + ", ".join(choices))
+            return None
+        settings[option] = value
+    return settings
+
+
 def the_predork_cli(help_msg, *args):
-    """non-game loop command line """
+    """non-game loop command line
+
+    Returns:
+        3-tuple of whether to exit, whether to print the help and the
+        dictionary of the SETTINGS given for the game
+    """
     if len(args) < 2:
-        return (False, False)
+        return (False, False, {})
 
     def _out(filename):
         if not is_filename_compliant(filename):
@@ -75,24 +109,17 @@ def the_predork_cli(help_msg, *args):
         return (True, False)
 
     def _list():
-        print(os.linesep.join(get_maze_files()))
+        print(os.linesep.join(Catalog(__EXTENSION__[1:]).refresh().lines()))
         return (True, False)
 
-    def get_maze_files():
-        mazes = []
-        for (_, _, filenames) in os.walk(__EXTENSION__[1:]):
-            mazes.extend(filenames)
-        return [maze for maze in mazes
-                if maze.find(__EXTENSION__) > 0]
-
     def _init(filename):
-        if filename and filename + __EXTENSION__ in get_maze_files():
+        if filename and\
+           filename + __EXTENSION__ in Catalog(__EXTENSION__[1:]).refresh():
             print("loaded maze " + filename)
             return (False, False)
         print("maze " + filename + " does not exist")
         return (True, False)
 
-    dork_flags = (True, True)
     parser = argparse.ArgumentParser(description="Dork command line " +
                                      "interface. Run dork with no options to" +
                                      " begin game", add_help=False)
@@ -105,11 +132,27 @@ def the_predork_cli(help_msg, *args):
                         help='-o <mazename> generates a maze and saves it')
     parser.add_argument('-v', '--version', action='store_true',
                         help="prints version and exits")
+    parser.add_argument('-m', '--map',
+                        help='-m <backend> draws the minimap with ' +
+                        'matplotlib, in the terminal or not at all (none)')
+    parser.add_argument('-w', '--map-worker',
+                        help='-w <thread|process> draws the minimap ' +
+                        'without blocking the prompt')
+    parser.add_argument('-j', '--journal',
+                        help='-j <file> journals every move, load ' +
+                        '<file> to recover the game after a crash')
+    parser.add_argument('-a', '--autosave',
+                        help='-a <file> autosaves every few moves in the ' +
+                        'background, rotating through numbered copies of file')
 
     help_msg.append(get_help_message(parser))
 
     arglist, _ = parser.parse_known_args(args[1:])
+    settings = _game_settings(arglist)
+    if settings is None:
+        return (True, False, {})
 
+    dork_flags = (False, False) if settings else (True, True)
     options = {"out": _one_arg, "init": _one_arg,
                "version": _no_arg, "list": _no_arg}
     for option in options:
@@ -117,7 +160,7 @@ def the_predork_cli(help_msg, *args):
             args = options[option](arglist.__dict__[option])
             dork_flags = locals()["_"+option](*args)
 
-    return dork_flags
+    return dork_flags + (settings,)
 
 
 def main(*args):
@@ -125,25 +168,29 @@ def main(*args):
     """
     help_msg = []
 
-    exit_dork, print_help = the_predork_cli(help_msg, *args)
+    exit_dork, print_help, settings = the_predork_cli(help_msg, *args)
 
     if print_help:
         print(help_msg[0])
     if exit_dork:
         return
     print("running dork")
-    title_screen()
+    title_screen(settings)
 
 
-def title_screen():
+def title_screen(settings=None):
     """
     Will display the four options for users. Play will set up a new game.
     Load will load a file that the user can play. Help will print out
     simple commands that will help the user play the game. Quit will
     exit the game. If none of the play options are entered the user
     will be prompted to input a valid command.
+
+    Args:
+        settings: dictionary of SETTINGS for the game, see the_predork_cli
     """
-    play_options = {'play': setup_game, 'load': load_game,
+    play_options = {'play': partial(setup_game, settings),
+                    'load': partial(load_game, settings),
                     'help': help_menu, 'quit': quit_game}
     user_play = True
     print("##########################")
@@ -164,18 +211,22 @@ def title_screen():
             print("Please enter a valid command.\n")
 
 
-def setup_game():
+def setup_game(settings=None):
     """
     This will set up a new game from a yaml file. It gets the game state of
     the inputted file, prints the description of the starting room and passes
     the game state to prompt.
+
+    Args:
+        settings: dictionary of SETTINGS for the game, see the_predork_cli
     """
-    game = sl.game_state()
+    settings = settings or {}
+    game = sl.game_state(settings.get("map"), settings.get("map_worker"))
     player = game.player
     player_room_description = game.rooms[player.position['location']].messages[
         'description']
     print(player_room_description)
-    prompt(game)
+    prompt(game, settings.get("journal"), settings.get("autosave"))
 
 
 def help_menu():
@@ -200,6 +251,9 @@ def help_menu():
     Use the keyword 'pick' to put an item into your inventory.
     i.e. 'pick up excaliber'.
 
+    Undo: To take back your last action use the keyword 'undo',
+    'redo' plays it again.
+
     Help: If you need to be reminded of available actions
     while playing the game use the keyword 'help' to access
     the help menu.
@@ -209,16 +263,22 @@ def help_menu():
     return True
 
 
-def load_game():
+def load_game(settings=None):
     """
     Will load a game from a stated file. The file has to be located with
-    the other yaml files in order to be loaded properly.
+    the other yaml files in order to be loaded properly, which are listed
+    first.
+
+    Args:
+        settings: dictionary of SETTINGS for the game, see the_predork_cli
     """
-    game = sl.game_state()
+    settings = settings or {}
+    print(os.linesep.join(Catalog("./dork/yaml").refresh().lines()))
+    game = sl.game_state(settings.get("map"), settings.get("map_worker"))
     player = game.player
     print("the player is in the " + player.position['location'])
     print(game.rooms[player.position['location']].messages['description'])
-    prompt(game)
+    prompt(game, settings.get("journal"), settings.get("autosave"))
 
 
 def quit_game():
@@ -247,7 +307,7 @@ def end_game(_game):
     return False
 
 
-def prompt(game):
+def prompt(game, journal_name=None, autosave_name=None):
     """
     Prompt will print out as statement
     asking the user what they would like to do.
@@ -255,6 +315,10 @@ def prompt(game):
 
     Args:
         game: A dictionary containing the current game state.
+        journal_name: file to journal every move to, defaults to the
+            DORK_JOURNAL environment variable, see open_journal
+        autosave_name: file the autosave slots are named after, defaults
+            to the DORK_AUTOSAVE environment variable, see open_autosave
 
     """
     keep_prompting = True
@@ -301,7 +365,11 @@ def prompt(game):
                       'user': (user_menu, one_arg),
                       'help': (help_menu, no_arg),
                       'save': (save_game, no_arg),
+                      'undo': (undo_command, no_arg),
+                      'redo': (redo_command, no_arg),
                       'quit': (end_game, no_arg)}
+    journal = open_journal(game, journal_name)
+    autosave = open_autosave(game, autosave_name)
     while keep_prompting is True and not_last is False and dead is False:
         user_action = input("\n" +
                             "What would you like to do? ").lower().split()
@@ -312,8 +380,52 @@ def prompt(game):
             keep_prompting = player_actions[action][0](game, *args)
             dead = fight_check(game)
             not_last = last_room(game)
+            game.history.commit()
+            if journal is not None:
+                journal.record()
+            if autosave is not None:
+                autosave.tick()
         else:
             print("Enter a valid command. ")
+    if journal is not None:
+        journal.close()
+    if autosave is not None:
+        autosave.close()
+    game.close()
+
+
+def undo_command(game):
+    """Takes back the last command that changed the game
+
+    Args:
+        game: The current game state
+
+    Returns:
+        True to keep prompting
+    """
+    if game.history.undo():
+        game.room_map.update()
+        print("You are back in the " + game.player.position['location'])
+    else:
+        print("There is nothing to undo.")
+    return True
+
+
+def redo_command(game):
+    """Plays the last undone command again
+
+    Args:
+        game: The current game state
+
+    Returns:
+        True to keep prompting
+    """
+    if game.history.redo():
+        game.room_map.update()
+        print("You are in the " + game.player.position['location'])
+    else:
+        print("There is nothing to redo.")
+    return True
 
 
 def last_room(game):
@@ -373,8 +485,8 @@ def player_move(game, user_action):
                         'left': 'left', }
     if action in player_direction:
         cardinal = player_direction[action]
-        lock_check(game, game.rooms[player.position[
-            'location']].paths[cardinal])
+        lock_check(game, game.world.path(player.position['location'],
+                                         cardinal))
     else:
         print("Invalid direction")
     return True
@@ -390,8 +502,7 @@ def lock_check(game, direction):
     player = game.player
     if direction != '':
         player.position['next location'] = direction
-        next_lock = game.rooms[player.position['next location']].door['locked']
-        if next_lock is True:
+        if game.world.is_locked(player.position['next location']) is True:
             print('You might be able to use ' +
                   'an item if you want to go that way.')
         else:
@@ -408,6 +519,7 @@ def movement_handler(game, destination):
     """
     player = game.player
     player.position['location'] = destination
+    game.touch()
     game.room_map.update()
     print("You have moved to " + destination)
     print("")
@@ -477,6 +589,7 @@ def player_take(game, user_action):
         print("You have picked up the " + key_word)
         player.inventory.append(key_word)
         game.rooms[player.position['location']].door['item'].remove(key_word)
+        game.touch(player.position['location'])
     else:
         print("There is no such item")
     return True
@@ -559,6 +672,7 @@ def unlock_room(game, user_action, direction):
             game.rooms[player.position['next location']].door['locked'] = False
             print(unlock_message)
             remove_item(game)
+            game.touch(player.position['next location'])
         else:
             print('You do not have the key for this room.')
 
@@ -607,6 +721,7 @@ def drop_item(game):
         return True
     game.rooms[player.position['location']].door['item'].append(item)
     player.inventory.remove(item)
+    game.touch(player.position['location'])
     return True
 
 
@@ -653,7 +768,7 @@ def next_room(game):
     while direction_check not in player_directions:
         direction_check = input("Please input cardinal direction. ").lower()
     direction = player_directions[direction_check]
-    return game.rooms[player.position['location']].paths[direction]
+    return game.world.path(player.position['location'], direction)
 
 
 def fight_check(game):
@@ -670,7 +785,7 @@ def fight_check(game):
     """
     check = False
     player = game.player
-    if game.rooms[player.position['location']].fight['fight'] is True:
+    if game.world.has_fight(player.position['location']) is True:
         check = fight_prompt(game)
     return check
 
@@ -737,6 +852,7 @@ def fight(game, damage):
     points = game.npc[enemy].points
     fighting = True
 
+    game.touch(player.position['location'])
     while fighting is True:
         print('Your health is ' + str(player.stats['health']))
         ehealth -= damage
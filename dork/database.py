@@ -0,0 +1,284 @@
+"""SQLite storage of worlds and saves for dork
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections.abc import Mapping
+
+__all__ = ["Database", "TABLES"]
+
+TABLES = {"rooms": "rooms", "items": "items", "npc": "npcs"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS worlds (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    base TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS worlds_base ON worlds (base);
+CREATE TABLE IF NOT EXISTS saves (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    world INTEGER NOT NULL REFERENCES worlds (id) ON DELETE CASCADE,
+    saved REAL NOT NULL,
+    player TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS saves_world ON saves (world);
+CREATE TABLE IF NOT EXISTS save_rooms (
+    save INTEGER NOT NULL REFERENCES saves (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (save, name)
+) WITHOUT ROWID;
+""" + "".join(f"""
+CREATE TABLE IF NOT EXISTS {table} (
+    world INTEGER NOT NULL REFERENCES worlds (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (world, name)
+) WITHOUT ROWID;
+""" for table in TABLES.values())
+
+
+class _Rows(Mapping):
+    """Rows of one world in a table, read by name on lookup
+
+    Decoded rows are kept, so changes made to them by overlays and delta
+    records stick.
+
+    Args:
+        database: Database holding the rows
+        table: name of the table
+        world: id of the world
+    """
+
+    def __init__(self, database, table, world):
+        self._database = database
+        self._table = table
+        self._world = world
+        self._rows = {}
+        self._count = None
+
+    def _query(self, sql, *args):
+        return self._database.query(
+            sql.format(table=self._table), (self._world, *args))
+
+    def __getitem__(self, name):
+        row = self._rows.get(name)
+        if row is None:
+            found = self._query("SELECT data FROM {table} "
+                                "WHERE world = ? AND name = ?", name)
+            if not found:
+                raise KeyError(name)
+            row = self._rows[name] = json.loads(found[0][0])
+        return row
+
+    def __contains__(self, name):
+        return name in self._rows or bool(self._query(
+            "SELECT 1 FROM {table} WHERE world = ? AND name = ?", name))
+
+    def __iter__(self):
+        return (name for (name,) in self._query(
+            "SELECT name FROM {table} WHERE world = ? ORDER BY name"))
+
+    def __len__(self):
+        if self._count is None:
+            self._count = self._query(
+                "SELECT count(*) FROM {table} WHERE world = ?")[0][0]
+        return self._count
+
+    def decoded(self):
+        """returns the number of rows decoded so far
+        """
+        return len(self._rows)
+
+    def update(self, rows):
+        """replaces rows, as delta records do
+
+        Raises:
+            KeyError: a row is not in the table
+        """
+        for name, row in rows.items():
+            if name not in self:
+                raise KeyError(name)
+            self._rows[name] = row
+
+
+class Database():
+    """Worlds and saves in a SQLite database
+
+    Worlds are stored a row per room, item and npc, saves as the player
+    and the door and fight state of the rooms that may have changed,
+    like overlay saves. Every lookup is an index search, every write a
+    single transaction, and the database is in WAL mode so readers never
+    wait for a writer.
+
+    Args:
+        file_name: path of the database, created if missing
+    """
+
+    def __init__(self, file_name):
+        self._connection = sqlite3.connect(file_name,
+                                           check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode = WAL")
+            self._connection.execute("PRAGMA synchronous = NORMAL")
+            self._connection.execute("PRAGMA foreign_keys = ON")
+            self._connection.executescript(_SCHEMA)
+
+    def query(self, sql, args=()):
+        """returns every row of a query
+        """
+        with self._lock:
+            return self._connection.execute(sql, args).fetchall()
+
+    def worlds(self):
+        """returns the names of the stored worlds, sorted
+        """
+        return [name for (name,) in
+                self.query("SELECT name FROM worlds ORDER BY name")]
+
+    def saves(self):
+        """returns the names of the stored saves, sorted
+        """
+        return [name for (name,) in
+                self.query("SELECT name FROM saves ORDER BY name")]
+
+    def add_world(self, name, data):
+        """stores a world, replacing any world of the same name in place,
+        so the saves of the world stay
+
+        Args:
+            name: name of the world
+            data: dictionary of game data, rooms, items and npc may be
+                any mapping
+
+        Returns:
+            the base digest of the world, data's base entry if it has one,
+            otherwise the sha256 of its rows
+
+        Raises:
+            ValueError: a world of the same name with other content has
+                saves, which are overlays of that content
+        """
+        digest = hashlib.sha256()
+        rows = {}
+        for key, table in TABLES.items():
+            rows[table] = [(entry, json.dumps(value, sort_keys=True))
+                           for entry, value in (data.get(key) or {}).items()]
+            for entry, value in rows[table]:
+                digest.update(f"{table}\0{entry}\0{value}\0".encode())
+        rest = {key: value for key, value in data.items()
+                if key not in TABLES and key not in ("base", "overlay")}
+        rest = json.dumps(rest, sort_keys=True)
+        digest.update(rest.encode())
+        base = data.get("base") or digest.hexdigest()
+        with self._lock, self._connection:
+            found = self._connection.execute(
+                "SELECT id, base FROM worlds WHERE name = ?",
+                (name,)).fetchone()
+            if found is None:
+                world = self._connection.execute(
+                    "INSERT INTO worlds (name, base, data) VALUES (?, ?, ?)",
+                    (name, base, rest)).lastrowid
+            else:
+                world = found[0]
+                if found[1] != base and self._connection.execute(
+                        "SELECT 1 FROM saves WHERE world = ? LIMIT 1",
+                        (world,)).fetchone():
+                    raise ValueError(f"world {name} has saves, it cannot "
+                                     f"be replaced by another world")
+                self._connection.execute(
+                    "UPDATE worlds SET base = ?, data = ? WHERE id = ?",
+                    (base, rest, world))
+                for table in rows:
+                    self._connection.execute(
+                        f"DELETE FROM {table} WHERE world = ?", (world,))
+            for table, values in rows.items():
+                self._connection.executemany(
+                    f"INSERT INTO {table} (world, name, data) "
+                    f"VALUES (?, ?, ?)",
+                    ((world, entry, value) for entry, value in values))
+        return base
+
+    def world(self, name):
+        """returns the game data of a world, rooms, items and npcs are
+        read from the database as they are looked up
+
+        Raises:
+            KeyError: there is no world with that name
+        """
+        found = self.query("SELECT id, base, data FROM worlds "
+                           "WHERE name = ?", (name,))
+        if not found:
+            raise KeyError(name)
+        world, base, rest = found[0]
+        data = json.loads(rest)
+        for key, table in TABLES.items():
+            data[key] = _Rows(self, table, world)
+        data["base"] = base
+        return data
+
+    def world_named(self, base):
+        """returns the name of a world with a base digest, None if none
+        """
+        found = self.query("SELECT name FROM worlds WHERE base = ? "
+                           "ORDER BY id LIMIT 1", (base,))
+        return found[0][0] if found else None
+
+    def add_save(self, name, overlay):
+        """stores a save, replacing any save of the same name
+
+        Args:
+            name: name of the save
+            overlay: dictionary from Game.save_overlay
+
+        Raises:
+            KeyError: no stored world has the overlay's base
+        """
+        world = self.world_named(overlay["base"])
+        if world is None:
+            raise KeyError(overlay["base"])
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM saves WHERE name = ?",
+                                     (name,))
+            save = self._connection.execute(
+                "INSERT INTO saves (name, world, saved, player) "
+                "SELECT ?, id, ?, ? FROM worlds WHERE name = ?",
+                (name, time.time(), json.dumps(overlay["player"]),
+                 world)).lastrowid
+            self._connection.executemany(
+                "INSERT INTO save_rooms (save, name, data) VALUES (?, ?, ?)",
+                ((save, room, json.dumps(state))
+                 for room, state in overlay.get("rooms", {}).items()))
+
+    def save(self, name):
+        """returns a save as an overlay of its world
+
+        Returns:
+            dictionary with world, base, player and rooms entries
+
+        Raises:
+            KeyError: there is no save with that name
+        """
+        found = self.query("SELECT saves.id, worlds.name, worlds.base, "
+                           "saves.player FROM saves JOIN worlds "
+                           "ON worlds.id = saves.world "
+                           "WHERE saves.name = ?", (name,))
+        if not found:
+            raise KeyError(name)
+        save, world, base, player = found[0]
+        rooms = {room: json.loads(state) for room, state in self.query(
+            "SELECT name, data FROM save_rooms WHERE save = ?", (save,))}
+        return {"world": world, "base": base, "player": json.loads(player),
+                "rooms": rooms}
+
+    def close(self):
+        """closes the connection
+        """
+        with self._lock:
+            self._connection.close()
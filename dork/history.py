@@ -0,0 +1,201 @@
+"""Versions of the game state for undo, redo and forks
+"""
+
+__all__ = ["History", "Version"]
+
+
+def _freeze_player(player):
+    """returns the player state as nested tuples
+    """
+    return (tuple(player.position.items()), tuple(player.inventory),
+            tuple(player.stats.items()))
+
+
+def _freeze_room(door, fight):
+    """returns the changing part of a room, its items, lock and fight
+    """
+    return (tuple(door["item"]) if door else None,
+            door["locked"] if door else None,
+            fight["fight"] if fight else None)
+
+
+def _room_at(game, version, name):
+    """finds the state of a room at version in the closest ancestor that
+    changed it, rooms no version changed are as loaded
+    """
+    for ancestor in version.lineage():
+        if name in ancestor.rooms:
+            return ancestor.rooms[name]
+    data = game.rooms.loaded(name)
+    return _freeze_room(data.get("door"), data.get("fight"))
+
+
+def _apply(game, version, names):
+    """sets the player and the named rooms of game to their state at
+    version
+
+    Returns:
+        dictionary of room name to the frozen state applied
+    """
+    player = game.player
+    position, inventory, stats = version.player
+    player.position.clear()
+    player.position.update(position)
+    player.inventory[:] = inventory
+    player.stats.clear()
+    player.stats.update(stats)
+    applied = {}
+    for name in names:
+        room = game.rooms[name]
+        applied[name] = items, locked, fight = _room_at(game, version, name)
+        if room.door:
+            room.door["item"] = list(items)
+            room.door["locked"] = locked
+        if room.fight:
+            room.fight["fight"] = fight
+    game.touch(*names)
+    return applied
+
+
+class Version():
+    """One immutable version of the game state
+
+    A version holds the player and only the rooms that changed since
+    its parent, every other room is shared with the versions before it.
+
+    Attributes:
+        number: integer, the index of the version in History.versions
+        parent: Version this one was made from, None for the first one
+        player: frozen player state
+        rooms: dictionary of room name to frozen room state
+    """
+    __slots__ = ("number", "parent", "player", "rooms")
+
+    def __init__(self, number, parent, player, rooms):
+        self.number = number
+        self.parent = parent
+        self.player = player
+        self.rooms = rooms
+
+    def lineage(self):
+        """yields this version and its ancestors, newest first
+        """
+        version = self
+        while version is not None:
+            yield version
+            version = version.parent
+
+
+class History():
+    """Versions of a game, one per command that changed something
+
+    Making a version costs the rooms built since the game was loaded,
+    never the size of the world, and stores only what changed. Rooms
+    never built are still as loaded.
+
+    Attributes:
+        versions: list of every Version, across branches
+        head: Version the game is at
+    """
+
+    def __init__(self, game):
+        self._game = game
+        self.versions = [Version(0, None, _freeze_player(game.player), {})]
+        self.head = self.versions[0]
+        self._redo = []
+        self._head_rooms = {}
+
+    def commit(self):
+        """records the current game state as a new version, if it changed
+
+        Returns:
+            the head Version
+        """
+        rooms = {}
+        for name, room in self._game.rooms.built():
+            state = _freeze_room(room.door, room.fight)
+            if name not in self._head_rooms:
+                self._head_rooms[name] = _room_at(self._game, self.head,
+                                                  name)
+            if state != self._head_rooms[name]:
+                rooms[name] = state
+        player = _freeze_player(self._game.player)
+        if not rooms and player == self.head.player:
+            return self.head
+        self.head = Version(len(self.versions), self.head, player, rooms)
+        self.versions.append(self.head)
+        self._head_rooms.update(rooms)
+        self._redo.clear()
+        return self.head
+
+    def checkout(self, version):
+        """moves the game to any version, on any branch
+
+        Only the rooms changed on the way from the head to version are
+        touched.
+
+        Args:
+            version: Version or its number
+        """
+        if isinstance(version, int):
+            version = self.versions[version]
+        ancestors = {id(ancestor) for ancestor in version.lineage()}
+        names = set()
+        for ancestor in self.head.lineage():
+            if id(ancestor) in ancestors:
+                common = ancestor
+                break
+            names.update(ancestor.rooms)
+        for ancestor in version.lineage():
+            if ancestor is common:
+                break
+            names.update(ancestor.rooms)
+        self._head_rooms.update(_apply(self._game, version, names))
+        self.head = version
+
+    def undo(self):
+        """goes back to the version before the head
+
+        Returns:
+            False if there is nothing to undo
+        """
+        if self.head.parent is None:
+            return False
+        self._redo.append(self.head)
+        self.checkout(self.head.parent)
+        return True
+
+    def redo(self):
+        """goes forward to the last version undone
+
+        Returns:
+            False if there is nothing to redo
+        """
+        if not self._redo:
+            return False
+        self.checkout(self._redo.pop())
+        return True
+
+    def fork(self, version=None):
+        """builds a separate game at a version, for what-if simulations
+
+        The fork is loaded from the same data, so it costs the rooms that
+        changed up to the version, and has a history of its own.
+
+        Args:
+            version: Version or its number, defaults to the head
+
+        Returns:
+            Game without a drawn minimap
+        """
+        if version is None:
+            version = self.head
+        if isinstance(version, int):
+            version = self.versions[version]
+        game = type(self._game)(self._game.loaded(), map_backend="none")
+        names = set()
+        for ancestor in version.lineage():
+            names.update(ancestor.rooms)
+        _apply(game, version, names)
+        game.history = History(game)
+        return game
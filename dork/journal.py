@@ -0,0 +1,191 @@
+"""Write-ahead journal of the commands that change a game
+"""
+import glob
+import json
+import os
+import threading
+
+import dork.saveload as saveload
+import dork.types as types
+
+__all__ = ["JOURNAL_SUFFIX", "Journal", "open_journal", "recover"]
+
+JOURNAL_SUFFIX = ".journal"
+SNAPSHOT_SUFFIX = ".snapshot.yml"
+SEGMENT_SUFFIX = ".log"
+
+
+def _segments(journal_name):
+    """returns the segment files of a journal, oldest first
+    """
+    return sorted(glob.glob(glob.escape(journal_name) + ".*" +
+                            SEGMENT_SUFFIX))
+
+
+def _records(segment):
+    """yields the records of a segment, up to a torn last line
+    """
+    with open(segment, encoding="utf-8") as file:
+        for line in file:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                return
+
+
+def _apply(data, record):
+    """applies a record onto loaded game data, like an overlay
+
+    Records hold the whole player and whole room states, so applying one
+    twice, or an older one before newer ones, ends in the same state.
+    """
+    data["player"] = record["player"]
+    overlay = data.setdefault("overlay", [])
+    for name, state in record.get("rooms", {}).items():
+        for part, values in state.items():
+            data["rooms"][name][part].update(values)
+        if name not in overlay:
+            overlay.append(name)
+
+
+def _write_snapshot(game, snapshot):
+    """writes a game as the snapshot, dump_file replaces it once complete
+    """
+    saveload.dump_file(saveload.save_data(game), snapshot)
+
+
+def recover(journal_name):
+    """loads the game a journal ends in, replaying its segments onto its
+    last snapshot
+
+    Args:
+        journal_name: path of the journal
+
+    Returns:
+        dictionary of game data, as from dork.saveload.load_file
+
+    Raises:
+        FileNotFoundError: the journal has no snapshot
+    """
+    data = saveload.load_file(journal_name + SNAPSHOT_SUFFIX)
+    for segment in _segments(journal_name):
+        for record in _records(segment):
+            _apply(data, record)
+    return data
+
+
+saveload.LOADERS[JOURNAL_SUFFIX] = recover
+
+
+class Journal():
+    """Appends what every command changed to a journal of a game
+
+    Each record holds the player and the door and fight state of the
+    rooms the command touched, one line of JSON flushed to disk, so
+    durability costs one small append per command. Every snapshot_every
+    records the journal moves on to a new segment, and a background
+    thread folds the finished segments into the snapshot and deletes
+    them. Starting a journal snapshots the game and drops anything an
+    earlier journal of the same name held.
+
+    Args:
+        game: dork.types.Game to journal
+        journal_name: path of the journal, its snapshot and segments are
+            named after it
+        snapshot_every: number of records per segment
+    """
+
+    # pylint: disable=too-many-instance-attributes
+    def __init__(self, game, journal_name, snapshot_every=100):
+        self._game = game
+        self.journal_name = journal_name
+        self.snapshot_every = snapshot_every
+        self._snapshot = journal_name + SNAPSHOT_SUFFIX
+        self._lock = threading.Lock()
+        self._compactor = None
+        _write_snapshot(game, self._snapshot)
+        for segment in _segments(journal_name):
+            os.remove(segment)
+        game.take_changes()
+        self._finished = []
+        self._number = 0
+        self._count = 0
+        self._file = self._open_segment()
+
+    def _segment(self):
+        return f"{self.journal_name}.{self._number:08d}{SEGMENT_SUFFIX}"
+
+    def _open_segment(self):
+        # the segment stays open across records, rotate and close close it
+        # pylint: disable-next=consider-using-with
+        return open(self._segment(), 'a', encoding="utf-8")
+
+    def record(self):
+        """appends what changed since the last record, if anything did
+
+        Returns:
+            the record, None if nothing changed
+        """
+        changes = self._game.take_changes()
+        if not changes["player"] and not changes["rooms"]:
+            return None
+        record = {"player": self._game.player.save(),
+                  "rooms": {name: self._game.save_state(name)
+                            for name in sorted(changes["rooms"])}}
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._count += 1
+        if self._count >= self.snapshot_every:
+            self.rotate()
+        return record
+
+    def rotate(self):
+        """finishes the current segment, starts the next one and folds
+        the finished segments into the snapshot in the background
+        """
+        self._file.close()
+        with self._lock:
+            self._finished.append(self._segment())
+        self._number += 1
+        self._count = 0
+        self._file = self._open_segment()
+        if self._compactor is None or not self._compactor.is_alive():
+            self._compactor = threading.Thread(target=self.compact,
+                                               daemon=True)
+            self._compactor.start()
+
+    def compact(self):
+        """folds the finished segments into the snapshot and deletes them
+        """
+        with self._lock:
+            segments = list(self._finished)
+        if not segments:
+            return
+        data = saveload.load_file(self._snapshot)
+        for segment in segments:
+            for record in _records(segment):
+                _apply(data, record)
+        _write_snapshot(types.Game(data, map_backend="none"), self._snapshot)
+        for segment in segments:
+            os.remove(segment)
+        with self._lock:
+            del self._finished[:len(segments)]
+
+    def close(self):
+        """waits for compaction and closes the current segment
+        """
+        if self._compactor is not None:
+            self._compactor.join()
+        self._file.close()
+
+
+def open_journal(game, journal_name=None):
+    """returns a Journal of game named journal_name, by default by the
+    DORK_JOURNAL environment variable, None if neither is set
+    """
+    journal_name = journal_name or os.environ.get("DORK_JOURNAL")
+    if not journal_name:
+        return None
+    return Journal(game, journal_name,
+                   int(os.environ.get("DORK_JOURNAL_SNAPSHOT", "100")))
@@ -0,0 +1,272 @@
+"""Stacks generated mazes into floors connected by stairs
+"""
+from concurrent.futures import ProcessPoolExecutor
+from random import sample, choice, getrandbits, seed
+from itertools import product
+
+import networkx as nx
+
+from dork.maze import Ellers, Maze, MazeGenerator, _bfs
+
+
+def _generate_floor(width, height, maze_generator, random_seed):
+    """generates and closes one floor, safe to run in a worker process
+
+    Args:
+        width: integer number of cells per line
+        height: integer number of lines
+        maze_generator: MazeGenerator subclass
+        random_seed: integer, forked workers would otherwise share state
+
+    Returns:
+        closed MazeGenerator instance
+    """
+    seed(random_seed)
+    maze = maze_generator(width)
+    lines = maze.generate()
+    for _ in range(0, height):
+        next(lines)
+    maze.close()
+    return maze
+
+
+class MultiLevelMaze:
+    """Stacks independently generated mazes into floors connected by stairs
+
+    Every floor is its own closed Maze with its own graph, floors are
+    generated in parallel and stairs are placed in a final pass. Node
+    identifiers are 3D, a node at x,y on floor z is
+    x + y * width + z * width * height.
+
+    Attributes:
+        width: integer number of cells per line on every floor
+        height: integer number of lines on every floor
+        depth: integer number of floors
+        floors: list of closed Maze instances, index is the z coordinate
+        stairs: dictionary mapping z to the list of per-floor node ids
+                that connect floor z with floor z + 1
+        areas: dictionary using room name as key to Maze.Area instances
+        area_floors: dictionary using room name as key to floor index
+        is_closed: always True, floors are closed when generated
+
+    Example:
+
+            ::
+
+                maze = MultiLevelMaze(width=10, height=10, depth=3)
+
+                maze.claim_area("cell", Maze.Area(x=0, y=0, width=2,
+                                                  height=2), floor=0)
+
+                maze.claim_area("roof", Maze.Area(x=4, y=4, width=3,
+                                                  height=3), floor=2)
+
+                maze.get_path("cell", "right", "roof", "left")
+    """
+
+    def __init__(self, *, width=Maze.MIN, height=Maze.MIN, depth=2,
+                 maze_generator=Ellers, stairs_per_floor=1,
+                 max_workers=None):
+        """Generates all floors and places the stairs
+
+        Args:
+            width: integer number of cells per line, atleast 5
+            height: integer number of lines, atleast 2
+            depth: integer number of floors, atleast 1
+            maze_generator: MazeGenerator subclass used for every floor
+            stairs_per_floor: integer number of stairs between two floors
+            max_workers: process count for generation, 1 generates in
+                         this process
+
+        Raises:
+            TypeError: maze_generator must be subclass of MazeGenerator
+        """
+        assert issubclass(maze_generator, MazeGenerator),\
+            "Maze parameter maze_generator must be derived from MazeGenerator"
+        self.width = max(Maze.MIN, width)
+        self.height = max(2, height)
+        self.depth = max(1, depth)
+        self.areas = {}
+        self.area_floors = {}
+        self.is_closed = True
+
+        args = ([self.width] * self.depth,
+                [self.height - 1] * self.depth,
+                [maze_generator] * self.depth,
+                [getrandbits(32) for _ in range(0, self.depth)])
+        if max_workers == 1 or self.depth == 1:
+            generators = list(map(_generate_floor, *args))
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                generators = list(pool.map(_generate_floor, *args))
+
+        self.floors = [Maze.from_generator(self.width, generator)
+                       for generator in generators]
+        self.stairs = {}
+        self._claimed = {z: set() for z in range(0, self.depth)}
+        self._place_stairs(max(1, stairs_per_floor))
+
+    def _place_stairs(self, count):
+        """links each pair of neighbouring floors
+
+        Every floor is fully connected on its own, so one stair between
+        each pair of neighbouring floors connects the whole maze.
+
+        Args:
+            count: integer number of stairs per pair of floors
+        """
+        cells = range(0, self.width * self.height)
+        for z in range(0, self.depth - 1):
+            self.stairs[z] = sample(cells, min(count, len(cells)))
+
+    def node_id(self, x, y, z):
+        """returns the 3D node identifier of coordinates x, y, z
+        """
+        return x + y * self.width + z * self.width * self.height
+
+    def location(self, node_id):
+        """decomposes a 3D node identifier
+
+        Args:
+            node_id: integer
+
+        Returns:
+            coordinates as 3-integer-tuple (x, y, z)
+        """
+        z, local = divmod(node_id, self.width * self.height)
+        return (local % self.width, local // self.width, z)
+
+    def _split(self, node_id):
+        z, local = divmod(node_id, self.width * self.height)
+        return z, local
+
+    def _join(self, z, local):
+        return local + z * self.width * self.height
+
+    def size(self):
+        """returns the number of nodes on all floors
+        """
+        return sum(floor.size() for floor in self.floors)
+
+    def neighbors(self, node_id):
+        """returns the 3D node ids reachable in one step, stairs included
+        """
+        z, local = self._split(node_id)
+        found = [self._join(z, node)
+                 for node in self.floors[z].neighbors(local)]
+        if local in self.stairs.get(z, []):
+            found.append(self._join(z + 1, local))
+        if local in self.stairs.get(z - 1, []):
+            found.append(self._join(z - 1, local))
+        return found
+
+    def claim_area(self, name, area, *, floor=0):
+        """claims a set of nodes on one floor
+
+        Args:
+            name: Unique name for the area, across all floors
+            area: Maze.Area instance
+            floor: integer index of the floor
+
+        Raises:
+            KeyError: maze area with name was already claimed
+            IndexError: floor does not exist
+            ValueError: area position or dimensions not valid for maze, or
+                the area leaves no free cell for the stairs of its floor
+        """
+        if name in self.areas:
+            raise KeyError(f"area {name} already used")
+        if not 0 <= floor < self.depth:
+            raise IndexError(f"maze does not have floor {floor}")
+        cells = {x + y * self.width for x, y in
+                 product(range(area.origin.x, area.origin.x + area.box.width),
+                         range(area.origin.y,
+                               area.origin.y + area.box.height))}
+        for z in (floor - 1, floor):
+            if z not in self.stairs:
+                continue
+            claimed = self._claimed[z] | self._claimed[z + 1] | cells
+            if len(claimed) >= self.width * self.height:
+                raise ValueError(f"area {name} leaves no free cell on "
+                                 f"floor {floor} for the stairs between "
+                                 f"floors {z} and {z + 1}")
+        self.floors[floor].claim_area(name, area)
+        self.areas[name] = area
+        self.area_floors[name] = floor
+        self._claimed[floor].update(cells)
+        self._move_claimed_stairs(floor)
+
+    def _move_claimed_stairs(self, floor):
+        """moves stairs out of claimed areas next to floor
+
+        Claimed areas are cut off from the rest of their floor, a stair
+        inside one would split the maze.
+        """
+        for z in (floor - 1, floor):
+            if z not in self.stairs:
+                continue
+            claimed = self._claimed[z] | self._claimed[z + 1]
+            free = [node for node in range(0, self.width * self.height)
+                    if node not in claimed]
+            self.stairs[z] = [stair if stair not in claimed else choice(free)
+                              for stair in self.stairs[z]]
+
+    def _floor_path(self, z, source, target):
+        path = nx.shortest_path(self.floors[z].graph,
+                                source=source, target=target)
+        return [self._join(z, node) for node in path]
+
+    def _path_to_stair(self, z, source, stairs):
+        """breadth first search on floor z for the closest reachable stair
+
+        Returns:
+            list of per-floor node ids ending on a stair, empty if none
+        """
+        stairs = set(stairs)
+        return _bfs(self.floors[z].graph.successors, source,
+                    stairs.__contains__)
+
+    def get_path(self, from_area_name, from_way, to_area_name, to_way):
+        """generates a path between two areas, climbing stairs if needed
+
+        Only the floor graphs between the two areas are searched, each
+        floor is left through the closest stair reachable from the
+        current node.
+
+        Args:
+            from_area_name: name as a string for the departing area
+            from_way: direction as a string
+            to_area_name: name as a string for the destination area
+            to_way: direction as a string
+
+        Returns:
+            Empty list if no path is possible
+
+            List with the first and last elment being (area name, 3D node
+            id) tuples and 3D node identifiers as the path between them.
+        """
+        from_z = self.area_floors[from_area_name]
+        to_z = self.area_floors[to_area_name]
+        from_node, current = self.floors[from_z].exit(from_area_name,
+                                                      from_way)
+        to_node, to_next = self.floors[to_z].exit(to_area_name, to_way)
+
+        if not current or not to_next:
+            return []
+
+        path = []
+        z = from_z
+        step = 1 if to_z > from_z else -1
+        while z != to_z:
+            floor_path = self._path_to_stair(z, current,
+                                             self.stairs[min(z, z + step)])
+            if not floor_path:
+                return []
+            path.extend(self._join(z, node) for node in floor_path)
+            current = floor_path[-1]
+            z += step
+        path.extend(self._floor_path(z, current, to_next))
+
+        path.append((to_area_name, self._join(to_z, to_node)))
+        path.insert(0, (from_area_name, self._join(from_z, from_node)))
+        return path
@@ -2,6 +2,7 @@
 """
 from abc import ABC
 from abc import abstractmethod
+from collections import deque
 from random import sample, choice, randint
 from itertools import product
 from math import sqrt
@@ -9,6 +10,32 @@ from math import sqrt
 import networkx as nx
 
 
+def _bfs(neighbors, source, is_target):
+    """breadth first search for the closest node is_target accepts,
+    returns the nodes from source to it, an empty list if none is found
+
+    Args:
+        neighbors: function returning the nodes reachable from a node
+        source: node to start from
+        is_target: function returning True for the nodes to find
+    """
+    parents = {source: None}
+    frontier = deque([source])
+    while frontier:
+        node = frontier.popleft()
+        if is_target(node):
+            path = []
+            while node is not None:
+                path.append(node)
+                node = parents[node]
+            return path[::-1]
+        for next_node in neighbors(node):
+            if next_node not in parents:
+                parents[next_node] = node
+                frontier.append(next_node)
+    return []
+
+
 class MazeGenerator(ABC):
     """Abstract maze generator
     """
@@ -113,23 +140,16 @@ class Ellers(MazeGenerator):
         Returns:
             edges: list of 2-tuple intergers as node identifers [(0, 1)...]
         """
-        seen = {}
         down_indices = []
         line_sets = {}
-
-        kv_pairs = [(id(_set), _set) for _set in self.sets
-                    for node_id in line if node_id in _set]
-        line_sets.update(kv_pairs)
-
-        for _set in line_sets.values():
-            if id(_set) not in seen:
-                population = _set
-                current_line_set = set(line)
-                population = population.intersection(current_line_set)
-                k = randint(1, len(population)-1) if len(population) > 1 else 1
-                node_sample = sample(population, k)
-                down_indices.append(node_sample)
-                seen[id(_set)] = None
+        for node_id in line:
+            line_sets.setdefault(id(self._get_set(node_id)), []).append(
+                node_id)
+
+        for population in line_sets.values():
+            k = randint(1, len(population)-1) if len(population) > 1 else 1
+            node_sample = sample(population, k)
+            down_indices.append(node_sample)
         return down_indices
 
     def __init__(self, width=MIN):
@@ -410,6 +430,8 @@ class Maze:
 
     MIN = 5
 
+    PASSAGES = {"up": 1, "down": 2, "left": 4, "right": 8}
+
     def __init__(self, *, width=MIN, height=None, maze_generator=Ellers):
         """Inits the maze with Ellers generator, a width of atleast 5 cells
 
@@ -431,6 +453,31 @@ class Maze:
                 next(self.generator)
             self.close()
 
+    @classmethod
+    def from_generator(cls, width, maze_generator):
+        """builds a closed maze from an already closed maze generator
+
+        Used when the lines were generated elsewhere, i.e. in a worker
+        process, and only the generator state was sent back.
+
+        Args:
+            width: integer number of cells per line
+            maze_generator: closed MazeGenerator instance
+
+        Returns:
+            closed Maze
+        """
+        maze = cls.__new__(cls)
+        maze.width = max(Maze.MIN, width)
+        maze.graph = nx.DiGraph()
+        maze.areas = {}
+        maze.is_closed = True
+        maze._maze = maze_generator
+        maze.generator = None
+        maze.graph.add_nodes_from(maze_generator.get_nodes())
+        maze.graph.add_edges_from(maze_generator.get_edges())
+        return maze
+
     def size(self):
         """returns the number of nodes in the maze
         """
@@ -438,6 +485,67 @@ class Maze:
             raise RuntimeWarning("Mazes are read only until closed")
         return len(self.graph.nodes())
 
+    def neighbors(self, node_id):
+        """returns the node identifiers reachable in one step from node_id
+        """
+        if not self.is_closed:
+            raise RuntimeWarning("Mazes are read only until closed")
+        return list(self.graph.successors(node_id))
+
+    def height(self):
+        """returns the number of lines in the maze
+        """
+        return self.size() // self.width
+
+    def _passage(self, node_id, other):
+        """returns the Maze.PASSAGES bit for an edge, 0 if not adjacent
+        """
+        if not isinstance(other, int):
+            return 0
+        x, y = node_id % self.width, node_id // self.width
+        other_x, other_y = other % self.width, other // self.width
+        if (other_x, other_y) == (x, y - 1):
+            return Maze.PASSAGES["up"]
+        if (other_x, other_y) == (x, y + 1):
+            return Maze.PASSAGES["down"]
+        if (other_x, other_y) == (x - 1, y):
+            return Maze.PASSAGES["left"]
+        if (other_x, other_y) == (x + 1, y):
+            return Maze.PASSAGES["right"]
+        return 0
+
+    def wall_rows(self):
+        """yields the open passages of every cell, one line at a time
+
+        Each cell is one byte, or-ing the Maze.PASSAGES bits of every
+        neighbour it has an edge to. Edges between cells that are not
+        neighbours are left out, see shortcuts.
+
+        Yields:
+            bytearray of width bytes per line
+        """
+        if not self.is_closed:
+            raise RuntimeWarning("Mazes are read only until closed")
+        for y in range(0, self.height()):
+            row = bytearray(self.width)
+            for x in range(0, self.width):
+                node_id = x + y * self.width
+                for other in self.graph.successors(node_id):
+                    row[x] |= self._passage(node_id, other)
+            yield row
+
+    def shortcuts(self):
+        """returns the edges wall_rows cannot express
+
+        Returns:
+            list of edge tuples between cells that are not neighbours
+        """
+        if not self.is_closed:
+            raise RuntimeWarning("Mazes are read only until closed")
+        return [(u, v) for u, v in self.graph.edges()
+                if isinstance(u, int) and isinstance(v, int) and
+                not self._passage(u, v)]
+
     def grow(self, line_count=1):
         """grows the maze by calling next on generator
 
@@ -764,6 +872,100 @@ class Maze:
                 self.graph.add_edge(edge[0], edge[1])
                 self.graph.add_edge(edge[1], edge[0])
 
+    def exit(self, area_name, way):
+        """picks a border node of an area and the node just outside of it
+
+        Args:
+            area_name: name as a string of a claimed area
+            way: direction as a string
+
+        Returns:
+            2-tuple of node identifiers (border node, outside node)
+        """
+        area = self.areas[area_name]
+        node = choice(getattr(area, way + "_border"))
+        return node, getattr(self._maze, way)(node)
+
+    def _reconnect(self, claimed):
+        """knocks down walls until the unclaimed nodes are connected again
+
+        Union-find over the existing edges first, then over neighbouring
+        unclaimed cells, adding an edge pair only between cells of
+        different components.
+
+        Args:
+            claimed: set of node identifiers inside areas
+        """
+        parent = {node: node for node in self.graph.nodes()
+                  if node not in claimed}
+
+        def find(node):
+            while parent[node] != node:
+                parent[node] = parent[parent[node]]
+                node = parent[node]
+            return node
+
+        for u, v in self.graph.edges():
+            if u in parent and v in parent:
+                parent[find(u)] = find(v)
+
+        for node in list(parent):
+            x = node % self.width
+            neighbours = [node + self.width]
+            if x + 1 < self.width:
+                neighbours.append(node + 1)
+            for other in neighbours:
+                if other in parent and find(node) != find(other):
+                    parent[find(node)] = find(other)
+                    self.graph.add_edge(node, other)
+                    self.graph.add_edge(other, node)
+
+    def claim_areas(self, areas):
+        """claims many areas at once, makes maze consistent
+
+        Unlike calling claim_area for each area, the edges of every area
+        are cut in one pass and the rest of the maze is reconnected once,
+        so the cost grows with the size of the maze, not with the number
+        of areas times the size of the maze.
+
+        Args:
+            areas: dictionary of unique name to Maze.Area instance
+
+        Raises:
+            RuntimeWarning: maze needs to be closed
+            KeyError: maze area with name was already claimed
+            ValueError: area position or dimensions not valid for maze,
+                        or areas overlap
+        """
+        if not self.is_closed:
+            raise RuntimeWarning("Mazes are read only until closed")
+
+        height = self.height()
+        taken = {node.id for area in self.areas.values()
+                 for node in self._get_area_nodes(area)}
+        claimed = set()
+        for name, area in areas.items():
+            if name in self.areas:
+                raise KeyError(f"area {name} already used")
+            if any([area.origin.x < 0, area.origin.y < 0,
+                    area.box.width < 1, area.box.height < 1]):
+                raise ValueError("origin point and\
+                                dimensions must be positive")
+            if area.origin.x + area.box.width > self.width or\
+               area.origin.y + area.box.height > height:
+                raise ValueError(f"area {name} outside maze bounds")
+            nids = {node.id for node in self._get_area_nodes(area)}
+            if not nids.isdisjoint(claimed) or not nids.isdisjoint(taken):
+                raise ValueError(f"area {name} overlaps another area")
+            claimed |= nids
+
+        self.graph.remove_edges_from(list(self.graph.in_edges(claimed)))
+        self.graph.remove_edges_from(list(self.graph.out_edges(claimed)))
+        for name, area in areas.items():
+            self._grid_connect(area)
+            self.areas[name] = area
+        self._reconnect(claimed | taken)
+
     def get_path(self, from_area_name, from_way, to_area_name, to_way):
         """generates path for two areas if possible
 
@@ -784,14 +986,8 @@ class Maze:
         """
         if not self.is_closed:
             raise RuntimeWarning("Mazes are read only until closed")
-        from_area = self.areas[from_area_name]
-        to_area = self.areas[to_area_name]
-
-        from_node = choice(getattr(from_area, from_way + "_border"))
-        to_node = choice(getattr(to_area, to_way + "_border"))
-
-        from_next = getattr(self._maze, from_way)(from_node)
-        to_next = getattr(self._maze, to_way)(to_node)
+        from_node, from_next = self.exit(from_area_name, from_way)
+        to_node, to_next = self.exit(to_area_name, to_way)
 
         if not from_next or not to_next:
             return []
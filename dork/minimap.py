@@ -0,0 +1,789 @@
+# -*- coding: utf-8 -*-
+"""Minimap backends for Dork.
+
+The layout of the minimap is shared, drawing is left to a backend:
+NullMap draws nothing, TerminalMap prints ANSI coloured text, Map
+draws with matplotlib and FrameExporter records PNG frames off screen.
+matplotlib and networkx are only imported when a matplotlib backend is
+used.
+"""
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+from math import floor, hypot
+from types import SimpleNamespace
+
+__all__ = ["GridIndex", "MapLayout", "NullMap", "TerminalMap", "Map",
+           "FrameExporter", "AsyncMap", "BACKENDS", "WORKERS", "get_map"]
+
+
+def _matplotlib():
+    """imports networkx and pylab on first use of the matplotlib backend
+
+    Returns:
+        2-tuple of the networkx and pylab modules
+    """
+    # pylint: disable=import-outside-toplevel
+    import warnings
+    import networkx
+    import pylab
+    warnings.filterwarnings("ignore")
+    return networkx, pylab
+
+
+def _agg():
+    """imports the matplotlib Figure and Agg canvas, without pyplot, and
+    dork.render for the PNG writers, which needs networkx
+
+    Returns:
+        3-tuple of the Figure and FigureCanvasAgg classes and dork.render
+    """
+    # pylint: disable=import-outside-toplevel
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from dork import render
+    return Figure, FigureCanvasAgg, render
+
+
+def _draw_rooms(layout, axes, rooms):
+    """draws the static minimap of rooms: edges, room nodes and labels
+    """
+    nx, _ = _matplotlib()
+    labels = {layout.room_map[room]["node_id"]: room for room in rooms}
+    positions = {layout.room_map[room]["node_id"]: layout.positions[room]
+                 for room in rooms}
+    minimap = nx.Graph()
+    minimap.add_nodes_from(labels)
+    minimap.add_edges_from([(layout.room_map[room]["node_id"], e_node)
+                            for room in rooms
+                            for e_node in layout.room_map[room]["edges"]
+                            if e_node in labels])
+    nx.draw_networkx_edges(minimap, positions, ax=axes)
+    nx.draw_networkx_nodes(minimap, positions, ax=axes,
+                           node_color="blue", node_size=100)
+    delta = 0.1
+    pos_higher = {k: (v[0], v[1]+delta) for k, v in positions.items()}
+    nx.draw_networkx_labels(minimap, pos_higher, labels, ax=axes)
+    axes.set_axis_off()
+    axes.margins(0.2)
+
+
+class GridIndex():
+    """Spatial index bucketing named points into square grid cells
+
+    Range queries only look at the cells overlapping the query circle,
+    nearest queries search rings of cells outwards from the query point,
+    so neither depends on the total number of points.
+
+    Attributes:
+        cell_size: integer side length of a grid cell
+        points: dictionary of name to (x, y)
+    """
+
+    def __init__(self, points, cell_size=8):
+        self.cell_size = max(1, cell_size)
+        self.points = dict(points)
+        self._buckets = {}
+        for name, (x, y) in self.points.items():
+            self._buckets.setdefault(self._cell(x, y), []).append(name)
+        cells = list(self._buckets) or [(0, 0)]
+        self._extent = (min(cx for cx, _ in cells), min(cy for _, cy in cells),
+                        max(cx for cx, _ in cells), max(cy for _, cy in cells))
+
+    def _cell(self, x, y):
+        return (floor(x / self.cell_size), floor(y / self.cell_size))
+
+    def _distance(self, name, x, y):
+        px, py = self.points[name]
+        return hypot(px - x, py - y)
+
+    def within(self, x, y, radius):
+        """returns the names of points at most radius away from x, y
+        """
+        min_cx, min_cy = self._cell(x - radius, y - radius)
+        max_cx, max_cy = self._cell(x + radius, y + radius)
+        return [name
+                for cx in range(min_cx, max_cx + 1)
+                for cy in range(min_cy, max_cy + 1)
+                for name in self._buckets.get((cx, cy), [])
+                if self._distance(name, x, y) <= radius]
+
+    def _ring(self, center, ring):
+        cx, cy = center
+        if ring == 0:
+            return [center]
+        side = range(-ring, ring + 1)
+        return ([(cx + d, cy - ring) for d in side] +
+                [(cx + d, cy + ring) for d in side] +
+                [(cx - ring, cy + d) for d in side[1:-1]] +
+                [(cx + ring, cy + d) for d in side[1:-1]])
+
+    def nearest(self, x, y):
+        """returns the name of the point closest to x, y, None if empty
+        """
+        center = self._cell(x, y)
+        min_cx, min_cy, max_cx, max_cy = self._extent
+        rings = max(abs(center[0] - min_cx), abs(center[0] - max_cx),
+                    abs(center[1] - min_cy), abs(center[1] - max_cy))
+        best, best_distance = None, None
+        for ring in range(0, rings + 1):
+            for cell in self._ring(center, ring):
+                for name in self._buckets.get(cell, []):
+                    distance = self._distance(name, x, y)
+                    if best is None or distance < best_distance:
+                        best, best_distance = name, distance
+            if best is not None and best_distance <= ring * self.cell_size:
+                break
+        return best
+
+
+def room_paths(rooms):
+    """returns the paths of every room without building any
+
+    Args:
+        rooms: mapping of room name to Room, lazy rooms are read from the
+               dictionaries they were loaded from
+
+    Returns:
+        dictionary of room name to paths dictionary
+    """
+    loaded = getattr(rooms, "loaded", None)
+    if loaded is None:
+        return {name: dict(room.paths) for name, room in rooms.items()}
+    return {name: dict(loaded(name).get("paths") or {}) for name in rooms}
+
+
+class MapLayout():
+    """Map layout updates with player location change
+
+    This class takes a room dictionary and converts it to
+    a coordinate system that can be mapped to the maze
+
+    Attributes:
+        origins: dictionary of room_name keys to Point with x,y coordinates
+        positions: dictionary of room_name keys to x,y plot positions
+        index: GridIndex over the origins
+        radius: rooms further than this from the player are not drawn,
+                None draws every room
+        room_map: a dictioanry mapping room_names to node-edge-list
+                  representations {room_name: {node_id:
+                  <list of nodes node_id connects to>}}, the node ids are
+                  Maze node ids once a placement is associated
+        corridors: dictionary of room_name to {direction: maze path},
+                   empty until a placement is associated
+    """
+    class Point:
+        """Point class, bookkeeping
+
+        Attributes:
+            x: integer coordinate
+            y: integer coordinate
+        """
+        def __init__(self, *, x=0, y=0):
+            self.x = x
+            self.y = y
+
+    @staticmethod
+    def _adjust_minimap_origins(paths, direction, origins, name, nodes):
+        """transforms minimap origins into maze coordinate system
+
+        Args:
+            paths: paths dictionary of the room
+            direction: as string
+            origins: the origin list to update
+            name: key as string
+            nodes: dictionary mapping node ids to rooms, and old ids to new ids
+
+        Returns:
+            new edge tuple updated with maze-coordinate node identifiers
+            empty edge tuple if no edge existed in that direction
+        """
+        other = paths.get(direction)
+        if other:
+            if name not in origins:
+                origins[name] = MapLayout.Point(x=0, y=0)
+            if other not in origins:
+                origins[other] = MapLayout.Point(x=0, y=0)
+            x, y = (origins[name].x, origins[name].y)
+            if direction == "up":
+                y -= 1
+            if direction == "down":
+                y += 1
+            if direction == "left":
+                x -= 1
+            if direction == "right":
+                x += 1
+            origins[other] = MapLayout.Point(x=x, y=y)
+            return (nodes[name], nodes[other])
+        return tuple()
+
+    @staticmethod
+    def _construct_minimap(minimap, nodes, rooms):
+        """takes room associations and converts to a minimap graph
+
+        Args:
+            minimap: dictionary of node id to dictionary of neighbour ids
+            nodes: dictionary of node identifiers
+            rooms: dictionary of room_name to paths dictionary
+
+        Returns:
+            tuple with origins that can map into a Maze graph, and the
+            associated undirected adjacency dictionary
+        """
+        origins = {}
+        edges = []
+        for name, paths in rooms.items():
+            for direction in ["up", "down", "left", "right"]:
+                edges.append(MapLayout._adjust_minimap_origins(
+                    paths, direction, origins, name, nodes))
+
+        for u, v in filter(lambda edge: edge, edges):
+            minimap[u][v] = None
+            minimap[v][u] = None
+        return origins, minimap
+
+    def __init__(self, game, radius=None):
+        """Lays out the rooms of game
+
+        Args:
+            game: Game the map follows
+            radius: view radius in rooms, defaults to the DORK_MAP_RADIUS
+                    environment variable and then to no limit
+        """
+        self._game = game
+        rooms = room_paths(game.rooms)
+        nodes = {name: node_id for name, node_id in
+                 zip(rooms.keys(), range(0, len(rooms.keys())))}
+        minimap = {node_id: {} for node_id in nodes.values()}
+        origins, minimap = MapLayout._construct_minimap(minimap, nodes, rooms)
+
+        dx = min(origins.values(), key=lambda origin: origin.x).x
+        dy = min(origins.values(), key=lambda origin: origin.y).y
+
+        if dx < 0:
+            for origin in origins.values():
+                origin.x += abs(dx)
+        if dy < 0:
+            for origin in origins.values():
+                origin.y += abs(dy)
+
+        width = max(origins.values(), key=lambda origin: origin.x).x + 1
+        self.origins = origins
+        self.room_map = {room: {"node_id": None, "edges": []}
+                         for room in origins}
+        for name, origin in origins.items():
+            node_id = origin.x + origin.y * width
+            nodes[nodes[name]] = node_id
+            self.room_map[name]["node_id"] = node_id
+        for name, origin in origins.items():
+            for neighbour in minimap[nodes[name]]:
+                self.room_map[name]["edges"].append(nodes[neighbour])
+
+        max_y = max(origins.values(), key=lambda origin: origin.y).y
+        self.positions = {room: (origin.x, abs(origin.y-max_y))
+                          for room, origin in origins.items()}
+        self.index = GridIndex({room: (origin.x, origin.y)
+                                for room, origin in origins.items()})
+        if radius is None and os.environ.get("DORK_MAP_RADIUS"):
+            radius = float(os.environ["DORK_MAP_RADIUS"])
+        self.radius = radius
+        self.corridors = {}
+
+    def associate(self, placement):
+        """switches room_map over to the node ids of a Maze placement
+
+        Args:
+            placement: dork.placement.Placement of the game rooms
+        """
+        for name, info in self.room_map.items():
+            info["node_id"] = placement.node_id(name)
+            info["edges"] = []
+            self.corridors[name] = {}
+        for (name, way), path in placement.corridors.items():
+            node_id = placement.node_id(path[-1][0])
+            if node_id not in self.room_map[name]["edges"]:
+                self.room_map[name]["edges"].append(node_id)
+            self.corridors[name][way] = path
+
+    def _player_room(self):
+        return self._game.player.position["location"]
+
+    def visible_rooms(self, room=None):
+        """returns the rooms within radius of room, or of the player
+
+        Returns:
+            list of room names, all rooms if radius is None
+        """
+        if self.radius is None:
+            return list(self.origins)
+        origin = self.origins[room or self._player_room()]
+        return self.index.within(origin.x, origin.y, self.radius)
+
+    def room_at(self, x, y):
+        """returns the room laid out closest to the x, y origin coordinates
+        """
+        return self.index.nearest(x, y)
+
+    def show(self):
+        """draws the minimap, backends override this
+        """
+
+    def update(self):
+        """update the figure on game-state change
+        """
+        self.show()
+
+    def idle(self):
+        """gives the backend a chance to handle window events
+        """
+
+    def close(self):
+        """releases whatever the backend holds on to
+        """
+
+
+class NullMap(MapLayout):
+    """Minimap that never lays out nor draws anything, for headless runs
+
+    Laying out the map reads the paths of every room, which a game that
+    is never drawn has no use for.
+    """
+
+    # pylint: disable=super-init-not-called
+    def __init__(self, game, radius=None):
+        self._game = game
+        self.origins = {}
+        self.room_map = {}
+        self.positions = {}
+        self.index = GridIndex({})
+        self.radius = radius
+        self.corridors = {}
+
+    def associate(self, placement):
+        """keeps no node ids, there is no layout to switch over
+        """
+
+    def visible_rooms(self, room=None):
+        """returns no rooms, nothing is laid out
+        """
+        return []
+
+
+class TerminalMap(MapLayout):
+    """Minimap printed as ANSI coloured text
+
+    Rooms are drawn as #, the player as a red @, connections between
+    neighbouring rooms as - and |.
+
+    Attributes:
+        stream: text file object the map is written to
+    """
+    PLAYER = "\x1b[31m@\x1b[0m"
+    ROOM = "#"
+
+    def __init__(self, game, stream=None, radius=None):
+        super().__init__(game, radius)
+        self.stream = stream or sys.stdout
+
+    def _connected(self, room, other):
+        return other is not None and self.room_map[other]["node_id"] in\
+            self.room_map[room]["edges"]
+
+    def _lines(self, cells):
+        """yields text lines for a dictionary of (x, y) to room names
+        """
+        if not cells:
+            return
+        xs = [x for x, _ in cells]
+        ys = [y for _, y in cells]
+        player = self._player_room()
+        for y in range(min(ys), max(ys) + 1):
+            line, below = [], []
+            for x in range(min(xs), max(xs) + 1):
+                room = cells.get((x, y))
+                if room is None:
+                    line.append("  ")
+                    below.append("  ")
+                    continue
+                line.append(self.PLAYER if room == player else self.ROOM)
+                line.append("-" if self._connected(room,
+                                                   cells.get((x + 1, y)))
+                            else " ")
+                below.append("| " if self._connected(room,
+                                                     cells.get((x, y + 1)))
+                             else "  ")
+            yield "".join(line).rstrip()
+            yield "".join(below).rstrip()
+
+    def show(self):
+        """prints the rooms visible from the player
+        """
+        cells = {(self.origins[room].x, self.origins[room].y): room
+                 for room in self.visible_rooms()}
+        self.stream.write("\n".join(self._lines(cells)).rstrip() + "\n")
+
+
+class Map(MapLayout):
+    """Minimap drawn with matplotlib, in a window in the bottom-right corner
+    """
+
+    @staticmethod
+    def _setup_window(corner_offset=0.05, width_of_screen=0.3):
+        """sets up pylab window without borders and on the bottom-right corner
+
+        Args:
+            corner_offset: % of dimension to offset from corner
+            width_of_screen: % of screen dimensions to size the window
+        """
+        _, plt = _matplotlib()
+        fig_manager = plt.get_current_fig_manager()
+        fig_manager.set_window_title("Team NoName - Dork - Map")
+        width = int(fig_manager.window.winfo_screenwidth()*width_of_screen)
+        height = width
+        x = fig_manager.window.winfo_screenwidth() - width -\
+            int(width*corner_offset)
+        y = fig_manager.window.winfo_screenheight() - height -\
+            int(height*corner_offset)
+        fig_manager.window.wm_deiconify()
+        fig_manager.window.wm_geometry(f"{width}x{height}+{x}+{y}")
+        fig_manager.window.children["!navigationtoolbar2tk"].pack_forget()
+        fig_manager.window.overrideredirect(True)
+        plt.ion()
+
+    def __init__(self, game, radius=None):
+        super().__init__(game, radius)
+        self._drawn_around = None
+        self._figure = None
+        self._marker = None
+        self._background = None
+        self._draw_event = None
+
+        Map._setup_window()
+        self.show()
+
+    def _draw(self):
+        """draws the static minimap: edges, room nodes and labels
+
+        The player marker is animated, it is left out of full redraws and
+        blitted on top of the cached background instead.
+        """
+        _, plt = _matplotlib()
+        plt.clf()
+        self._figure = plt.gcf()
+        axes = plt.gca()
+        self._drawn_around = self._player_room()
+        _draw_rooms(self, axes, self.visible_rooms(self._drawn_around))
+        self._marker = axes.scatter(*zip(self._player_position()),
+                                    c="red", s=100, zorder=3, animated=True)
+        self._draw_event = self._figure.canvas.mpl_connect("draw_event",
+                                                           self._on_draw)
+        self._background = None
+        plt.show()
+
+    def _player_position(self):
+        return self.positions[self._player_room()]
+
+    def _left_view(self):
+        """True once the player is half the radius away from where the
+        visible rooms were last drawn around
+        """
+        if self.radius is None:
+            return False
+        x, y = self.positions[self._player_room()]
+        drawn_x, drawn_y = self.positions[self._drawn_around]
+        return hypot(x - drawn_x, y - drawn_y) > self.radius / 2
+
+    def _on_draw(self, _event):
+        """caches the freshly drawn background and puts the marker back
+        """
+        if self._marker.axes not in self._figure.axes:
+            self._figure.canvas.mpl_disconnect(self._draw_event)
+            return
+        canvas = self._figure.canvas
+        self._background = canvas.copy_from_bbox(self._marker.axes.bbox)
+        self._marker.axes.draw_artist(self._marker)
+
+    def show(self):
+        """Displays the graph as a networkkx plot
+
+        Note:
+            The graph is drawn once, later calls only move the player
+            marker. With a blitting canvas the cached background is
+            restored and the marker drawn on top, so the cost of a move
+            does not depend on the number of rooms. With a radius only
+            the visible rooms are drawn, again once the player gets half
+            the radius away from where they were drawn.
+        """
+        if self._marker is None or self._marker.axes not in self._figure.axes\
+           or self._left_view():
+            self._draw()
+        canvas = self._figure.canvas
+        self._marker.set_offsets([self._player_position()])
+        if self._background is None or not canvas.supports_blit:
+            canvas.draw_idle()
+            canvas.flush_events()
+            return
+        canvas.restore_region(self._background)
+        self._marker.axes.draw_artist(self._marker)
+        canvas.blit(self._marker.axes.bbox)
+        canvas.flush_events()
+
+    def idle(self):
+        """keeps the window responsive between moves
+        """
+        if self._figure is not None:
+            self._figure.canvas.flush_events()
+
+
+class FrameExporter(MapLayout):
+    """Minimap rendered off screen with the Agg backend, frame by frame
+
+    Every room is drawn once into a cached background, a frame restores
+    that background and draws only the player marker on top, so the cost
+    of a frame does not depend on the number of rooms. Used as the
+    frames backend, every update records the player location and close
+    writes the session as an animated PNG.
+
+    Attributes:
+        size: (width, height) of a frame in pixels
+        file_name: animated PNG written on close, defaults to the
+                   DORK_MAP_FRAMES environment variable and then to
+                   dork_map.png
+        locations: rooms the player was in on every update
+    """
+
+    def __init__(self, game, radius=None, *, figsize=(4, 4), dpi=100,
+                 file_name=None):
+        """Draws the static layer
+
+        Args:
+            game: Game the map follows
+            radius: ignored, every room is drawn into the background
+            figsize: (width, height) of a frame in inches
+            dpi: pixels per inch
+            file_name: see file_name
+        """
+        super().__init__(game, radius)
+        figure_class, canvas_class, self._render = _agg()
+        figure = figure_class(figsize=figsize, dpi=dpi)
+        self._canvas = canvas_class(figure)
+        axes = figure.add_subplot()
+        _draw_rooms(self, axes, list(self.origins))
+        self._marker = axes.scatter(*zip(self.positions[self._player_room()]),
+                                    c="red", s=100, zorder=3, animated=True)
+        self._canvas.draw()
+        self._background = self._canvas.copy_from_bbox(figure.bbox)
+        self.size = self._canvas.get_width_height()
+        self.file_name = file_name or os.environ.get("DORK_MAP_FRAMES") or\
+            "dork_map.png"
+        self.locations = []
+
+    def frame(self, room=None):
+        """renders the minimap with the player marker in room
+
+        Args:
+            room: room name, defaults to the player location
+
+        Returns:
+            bytes of 4 * width * height RGBA pixels
+        """
+        self._canvas.restore_region(self._background)
+        self._marker.set_offsets([self.positions[room or self._player_room()]])
+        self._marker.axes.draw_artist(self._marker)
+        return bytes(self._canvas.buffer_rgba())
+
+    def write_png(self, stream, room=None, level=1):
+        """writes one frame as a PNG image, see frame
+        """
+        self._render.write_rgba_png(stream, self.size, self.frame(room),
+                                    level=level)
+
+    def write_frames(self, rooms, pattern="frame_{:05d}.png", level=1):
+        """writes one PNG image per room
+
+        Args:
+            rooms: iterable of room names
+            pattern: file name format taking the frame number
+            level: zlib compression level
+
+        Returns:
+            list of the file names written
+        """
+        file_names = []
+        for number, room in enumerate(rooms):
+            file_names.append(pattern.format(number))
+            with open(file_names[-1], "wb") as stream:
+                self.write_png(stream, room, level)
+        return file_names
+
+    def write_animation(self, stream, rooms, *, delay=250, level=1):
+        """writes an animated PNG with one frame per room
+
+        Args:
+            stream: binary file object
+            rooms: sequence of room names
+            delay: milliseconds every frame is shown
+            level: zlib compression level
+        """
+        self._render.write_apng(stream, self.size, map(self.frame, rooms),
+                                count=len(rooms), delay=delay, level=level)
+
+    def show(self):
+        """records the player location as the next frame
+        """
+        self.locations.append(self._player_room())
+
+    def close(self):
+        """writes the recorded frames to file_name
+        """
+        if self.locations:
+            with open(self.file_name, "wb") as stream:
+                self.write_animation(stream, self.locations)
+            self.locations = []
+
+
+def _snapshot(game):
+    """copies the rooms and player location a worker needs to draw game
+
+    Returns:
+        picklable stand in for game with rooms and player.position
+    """
+    return SimpleNamespace(
+        rooms={name: SimpleNamespace(paths=paths)
+               for name, paths in room_paths(game.rooms).items()},
+        player=SimpleNamespace(
+            position={"location": game.player.position["location"]}))
+
+
+def _render_loop(backend, game, updates, interval, radius):
+    """draws a minimap from the player locations put on updates
+
+    Runs in a worker thread or process. Only the latest location of a
+    burst is drawn, None stops the loop.
+
+    Args:
+        backend: name of a backend in BACKENDS
+        game: snapshot of the game, see _snapshot
+        updates: queue of room names
+        interval: seconds to wait for an update before handling events
+        radius: view radius in rooms, see MapLayout
+    """
+    minimap = BACKENDS[backend](game, radius=radius)
+    while True:
+        try:
+            latest = [updates.get(timeout=interval)]
+        except queue.Empty:
+            minimap.idle()
+            continue
+        while True:
+            try:
+                latest.append(updates.get_nowait())
+            except queue.Empty:
+                break
+        locations = [location for location in latest if location is not None]
+        if locations:
+            game.player.position["location"] = locations[-1]
+            minimap.update()
+        if None in latest:
+            break
+    minimap.close()
+
+
+class AsyncMap(NullMap):
+    """Runs a minimap backend in a worker so drawing never blocks the REPL
+
+    Nothing is laid out here, the worker thread or process lays out and
+    draws its own map and is sent the player location on every update.
+    matplotlib windows must stay on the main thread, so the matplotlib
+    backend can only be drawn in a worker process.
+
+    Attributes:
+        backend: name of the backend drawing in the worker
+        worker: threading.Thread or multiprocessing.Process drawing it
+    """
+
+    def __init__(self, game, backend, *, worker="process", interval=0.1,
+                 radius=None):
+        """Starts the worker
+
+        Args:
+            game: Game the map follows
+            backend: name of a backend in BACKENDS
+            worker: "process" or "thread"
+            interval: seconds between window event checks in the worker
+            radius: view radius in rooms, see MapLayout
+
+        Raises:
+            ValueError: a matplotlib backend is to be drawn in a thread
+        """
+        if worker == "thread" and issubclass(BACKENDS[backend], Map):
+            raise ValueError(f"map backend {backend} draws with pyplot, "
+                             f"which cannot run off the main thread, use "
+                             f"the process worker")
+        super().__init__(game, radius)
+        self.backend = backend
+        args = (backend, _snapshot(game))
+        if worker == "thread":
+            self._updates = queue.Queue()
+            self.worker = threading.Thread(
+                target=_render_loop,
+                args=args + (self._updates, interval, radius), daemon=True)
+        else:
+            self._updates = multiprocessing.Queue()
+            self.worker = multiprocessing.Process(
+                target=_render_loop,
+                args=args + (self._updates, interval, radius), daemon=True)
+        self.worker.start()
+
+    def show(self):
+        """sends the player location to the worker and returns at once
+        """
+        self._updates.put(self._player_room())
+
+    def close(self):
+        """stops the worker once it has drawn what it was sent
+        """
+        self._updates.put(None)
+        self.worker.join()
+
+
+BACKENDS = {"none": NullMap, "terminal": TerminalMap, "matplotlib": Map,
+            "frames": FrameExporter}
+
+
+WORKERS = ("thread", "process")
+
+
+def get_map(game, backend=None, worker=None, radius=None):
+    """builds the minimap for a game with the chosen backend
+
+    Args:
+        game: Game the map follows
+        backend: name of a backend in BACKENDS, defaults to the DORK_MAP
+                 environment variable and then to matplotlib
+        worker: "thread" or "process" to draw with an AsyncMap, defaults
+                to the DORK_MAP_WORKER environment variable and then to
+                drawing inline
+        radius: view radius in rooms, defaults to the DORK_MAP_RADIUS
+                environment variable and then to no limit
+
+    Returns:
+        MapLayout subclass instance
+
+    Raises:
+        KeyError: backend or worker is not a known name
+        ValueError: the matplotlib backend is to be drawn in a thread
+    """
+    backend = backend or os.environ.get("DORK_MAP") or "matplotlib"
+    worker = worker or os.environ.get("DORK_MAP_WORKER")
+    if backend not in BACKENDS:
+        raise KeyError(f"unknown map backend {backend}, use one of "
+                       f"{', '.join(BACKENDS)}")
+    if worker and worker not in WORKERS:
+        raise KeyError(f"unknown map worker {worker}, use one of "
+                       f"{', '.join(WORKERS)}")
+    if worker:
+        return AsyncMap(game, backend, worker=worker, radius=radius)
+    return BACKENDS[backend](game, radius=radius)
@@ -0,0 +1,142 @@
+"""Places the rooms of a game into a generated maze
+"""
+from math import ceil, sqrt
+
+import networkx as nx
+
+from dork.maze import Ellers, Maze
+
+__all__ = ["Placement", "pack_rooms", "place_rooms"]
+
+OPPOSITE = {"up": "down", "down": "up", "left": "right", "right": "left"}
+
+
+class Placement:
+    """Rooms placed into a maze, with a corridor for every connection
+
+    Attributes:
+        maze: closed Maze with one claimed area per room
+        corridors: dictionary of (room name, direction) to a path as
+                   returned by Maze.get_path, leading to the room found
+                   in that direction
+    """
+
+    def __init__(self, maze, corridors):
+        self.maze = maze
+        self.corridors = corridors
+
+    def node_id(self, room):
+        """returns the maze node id of the top-left cell of a room
+        """
+        area = self.maze.areas[room]
+        return area.origin.x + area.origin.y * self.maze.width
+
+
+def pack_rooms(sizes, *, padding=1, width=None):
+    """packs room rectangles onto shelves, in the order given
+
+    Every room is kept padding cells away from other rooms and from the
+    maze border, so the cells left over stay connected and every room
+    can be left in every direction.
+
+    Args:
+        sizes: dictionary of room name to (width, height), in the order
+               rooms should be placed
+        padding: integer number of free cells around every room
+        width: integer maze width, defaults to a roughly square maze
+
+    Returns:
+        2-tuple of a dictionary of room name to Maze.Area, and the maze
+        (width, height) needed to hold them
+    """
+    padding = max(1, padding)
+    widest = max([size[0] for size in sizes.values()] + [1])
+    if width is None:
+        total = sum((w + padding) * (h + padding) for w, h in sizes.values())
+        width = ceil(sqrt(total)) + padding
+    width = max(Maze.MIN, width, widest + 2 * padding)
+
+    areas = {}
+    x, y, shelf_height = padding, padding, 0
+    for name, (room_width, room_height) in sizes.items():
+        if x + room_width + padding > width:
+            x, y, shelf_height = padding, y + shelf_height + padding, 0
+        areas[name] = Maze.Area(x=x, y=y, width=room_width,
+                                height=room_height)
+        x += room_width + padding
+        shelf_height = max(shelf_height, room_height)
+    return areas, (width, max(2, y + shelf_height + padding))
+
+
+def _corridor(maze, room, way, other):
+    """finds a path from room, leaving towards way, to other
+
+    A* with the manhattan distance only explores the cells between the
+    two rooms, packing keeps connected rooms close together.
+    """
+    from_node, from_next = maze.exit(room, way)
+    to_node, to_next = maze.exit(other, OPPOSITE[way])
+
+    def manhattan(node, target):
+        return (abs(node % maze.width - target % maze.width) +
+                abs(node // maze.width - target // maze.width))
+
+    path = nx.astar_path(maze.graph, from_next, to_next, heuristic=manhattan)
+    path.append((other, to_node))
+    path.insert(0, (room, from_node))
+    return path
+
+
+def _corridors(maze, rooms):
+    """searches one corridor per connection, reversed for the way back
+    """
+    corridors = {}
+    for room_name, room in rooms.items():
+        for way, other in room.paths.items():
+            if not other or other not in maze.areas or\
+               (room_name, way) in corridors:
+                continue
+            path = _corridor(maze, room_name, way, other)
+            corridors[(room_name, way)] = path
+            corridors.setdefault((other, OPPOSITE[way]), path[::-1])
+    return corridors
+
+
+def _order(game):
+    """rooms in minimap layout order, top to bottom and left to right
+    """
+    origins = getattr(getattr(game, "room_map", None), "origins", {})
+    return sorted(game.rooms,
+                  key=lambda room: ((origins[room].y, origins[room].x)
+                                    if room in origins else (0, 0)))
+
+
+def place_rooms(game, *, room_size=(3, 3), sizes=None, padding=1,
+                maze_generator=Ellers):
+    """builds a maze holding every room of game, connected by corridors
+
+    Rooms are packed in one pass, claimed with a single Maze.claim_areas
+    call, and one corridor is searched per pair of connected rooms. The
+    minimap of the game, if it has one, is switched to the maze node ids.
+
+    Args:
+        game: Game whose rooms and paths are placed
+        room_size: (width, height) of rooms missing from sizes
+        sizes: optional dictionary of room name to (width, height)
+        padding: integer number of free cells around every room
+        maze_generator: MazeGenerator subclass used for the maze
+
+    Returns:
+        Placement
+    """
+    sizes = sizes or {}
+    areas, (width, height) = pack_rooms(
+        {room: sizes.get(room, room_size) for room in _order(game)},
+        padding=padding)
+    maze = Maze(width=width, height=height, maze_generator=maze_generator)
+    maze.claim_areas(areas)
+
+    placement = Placement(maze, _corridors(maze, game.rooms))
+    if hasattr(game, "room_map"):
+        game.room_map.associate(placement)
+    return placement
@@ -0,0 +1,304 @@
+"""Renders closed mazes to PGM, PNG or SVG images line by line
+"""
+import re
+import struct
+import zlib
+from itertools import repeat
+
+from dork.maze import Maze
+
+__all__ = ["render", "write_pgm", "write_png", "write_svg", "write_rgba_png",
+           "write_apng"]
+
+WALL, FLOOR, AREA, PATH = range(0, 4)
+
+PALETTE = {WALL: (0, 0, 0), FLOOR: (255, 255, 255),
+           AREA: (80, 120, 220), PATH: (220, 40, 40)}
+
+_GRAY = bytes([0, 255, 170, 85]) + bytes(252)
+
+_RIGHT = bytes(FLOOR if passages & Maze.PASSAGES["right"] else WALL
+               for passages in range(0, 256))
+_DOWN = bytes(FLOOR if passages & Maze.PASSAGES["down"] else WALL
+              for passages in range(0, 256))
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_IDAT_SIZE = 1 << 16
+
+
+def _node(step):
+    """path steps are node ids, or (area name, node id) at either end
+    """
+    return step[-1] if isinstance(step, tuple) else step
+
+
+def _path_spans(width, path):
+    """yields (pixel row, start, stop) for the cells of a path and the
+    passages between neighbouring cells
+    """
+    nodes = [_node(step) for step in path]
+    for node, next_node in zip(nodes, nodes[1:] + [None]):
+        x, y = node % width, node // width
+        yield 2 * y + 1, 2 * x + 1, 2 * x + 2
+        if next_node is not None:
+            next_x, next_y = next_node % width, next_node // width
+            if abs(next_x - x) + abs(next_y - y) == 1:
+                yield y + next_y + 1, x + next_x + 1, x + next_x + 2
+
+
+def _highlights(maze, areas, paths):
+    """collects highlighted spans per pixel row
+
+    Memory use depends on the highlighted areas and paths only, not on
+    the size of the maze.
+
+    Returns:
+        dictionary mapping pixel row to list of (start, stop, colour)
+    """
+    marks = {}
+    for area in (maze.areas.values() if areas else []):
+        for pixel_y in range(2 * area.origin.y + 1,
+                             2 * (area.origin.y + area.box.height)):
+            marks.setdefault(pixel_y, []).append(
+                (2 * area.origin.x + 1,
+                 2 * (area.origin.x + area.box.width), AREA))
+    for path in paths:
+        for pixel_y, start, stop in _path_spans(maze.width, path):
+            marks.setdefault(pixel_y, []).append((start, stop, PATH))
+    return marks
+
+
+def _pixel_rows(maze, *, areas=True, paths=()):
+    """yields rows of palette indexes, two per line of the maze
+
+    Every cell is a floor pixel, the pixels right of and below it are
+    floor if the cell has a passage that way and wall otherwise. Rows
+    are built with slice assignment and bytes.translate, so the cost
+    per line is a handful of C loops.
+
+    Args:
+        maze: closed Maze or SharedMaze
+        areas: boolean, highlight claimed areas
+        paths: iterable of paths as returned by get_path
+
+    Yields:
+        bytearray of 2 * width + 1 palette indexes
+    """
+    width = 2 * maze.width + 1
+    floor = bytes([FLOOR]) * maze.width
+    marks = _highlights(maze, areas, paths)
+
+    def highlighted(pixel_y, row):
+        for start, stop, colour in marks.get(pixel_y, []):
+            row[start:stop] = bytes([colour]) * (stop - start)
+        return row
+
+    yield highlighted(0, bytearray(width))
+    for y, passages in enumerate(maze.wall_rows()):
+        passages = bytes(passages)
+        cells = bytearray(width)
+        cells[1:width:2] = floor
+        cells[2:width:2] = passages.translate(_RIGHT)
+        yield highlighted(2 * y + 1, cells)
+        below = bytearray(width)
+        below[1:width:2] = passages.translate(_DOWN)
+        yield highlighted(2 * y + 2, below)
+
+
+def _scaled(rows, scale):
+    """repeats every pixel scale times in both directions
+    """
+    for row in rows:
+        if scale > 1:
+            wide = bytearray(len(row) * scale)
+            for offset in range(0, scale):
+                wide[offset::scale] = row
+            row = wide
+        yield from repeat(row, scale)
+
+
+def _image_size(maze, scale):
+    return ((2 * maze.width + 1) * scale, (2 * maze.height() + 1) * scale)
+
+
+def write_pgm(maze, stream, *, scale=1, areas=True, paths=()):
+    """writes a binary greyscale PGM image
+
+    Args:
+        maze: closed Maze or SharedMaze
+        stream: binary file object
+        scale: integer pixels per maze pixel
+        areas: boolean, highlight claimed areas
+        paths: iterable of paths as returned by get_path
+    """
+    width, height = _image_size(maze, scale)
+    stream.write(f"P5\n{width} {height}\n255\n".encode("ascii"))
+    for row in _scaled(_pixel_rows(maze, areas=areas, paths=paths), scale):
+        stream.write(row.translate(_GRAY))
+
+
+def _png_chunk(stream, kind, data):
+    stream.write(struct.pack(">I", len(data)))
+    stream.write(kind)
+    stream.write(data)
+    stream.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(kind))))
+
+
+def _png_idat(stream, scanlines, level):
+    """compresses scanlines into IDAT chunks as they come in
+    """
+    compressor = zlib.compressobj(level)
+    pending = bytearray()
+    for scanline in scanlines:
+        pending += compressor.compress(b"\0")
+        pending += compressor.compress(scanline)
+        if len(pending) >= _IDAT_SIZE:
+            _png_chunk(stream, b"IDAT", bytes(pending))
+            pending.clear()
+    pending += compressor.flush()
+    _png_chunk(stream, b"IDAT", bytes(pending))
+
+
+def write_png(maze, stream, *, scale=1, areas=True, paths=(), level=6):
+    """writes an indexed-colour PNG image using PALETTE
+
+    Args:
+        maze: closed Maze or SharedMaze
+        stream: binary file object
+        scale: integer pixels per maze pixel
+        areas: boolean, highlight claimed areas
+        paths: iterable of paths as returned by get_path
+        level: zlib compression level
+    """
+    # keyword options are shared with write_pgm and write_svg for render
+    # pylint: disable=too-many-arguments
+    width, height = _image_size(maze, scale)
+    stream.write(_PNG_SIGNATURE)
+    _png_chunk(stream, b"IHDR",
+               struct.pack(">IIBBBBB", width, height, 8, 3, 0, 0, 0))
+    _png_chunk(stream, b"PLTE",
+               b"".join(bytes(PALETTE[index]) for index in sorted(PALETTE)))
+    _png_idat(stream,
+              _scaled(_pixel_rows(maze, areas=areas, paths=paths), scale),
+              level)
+    _png_chunk(stream, b"IEND", b"")
+
+
+def _rgba_scanlines(frame, width):
+    """yields the rows of an RGBA pixel buffer
+    """
+    frame = memoryview(frame).cast("B")
+    stride = 4 * width
+    for start in range(0, len(frame), stride):
+        yield frame[start:start + stride]
+
+
+def _rgba_header(stream, size):
+    stream.write(_PNG_SIGNATURE)
+    _png_chunk(stream, b"IHDR", struct.pack(">IIBBBBB", *size, 8, 6, 0, 0, 0))
+
+
+def write_rgba_png(stream, size, frame, *, level=1):
+    """writes an RGBA pixel buffer, as made by matplotlib, as a PNG image
+
+    Args:
+        stream: binary file object
+        size: (width, height) in pixels
+        frame: bytes-like of 4 * width * height RGBA bytes
+        level: zlib compression level
+    """
+    _rgba_header(stream, size)
+    _png_idat(stream, _rgba_scanlines(frame, size[0]), level)
+    _png_chunk(stream, b"IEND", b"")
+
+
+def write_apng(stream, size, frames, *, count=None, delay=250, level=1):
+    """writes RGBA pixel buffers as an animated PNG looping forever
+
+    Frames are compressed one at a time as they come in, so frames can
+    be a generator as long as count is given.
+
+    Args:
+        stream: binary file object
+        size: (width, height) in pixels of every frame
+        frames: iterable of bytes-like RGBA buffers
+        count: number of frames, defaults to len(frames)
+        delay: milliseconds every frame is shown
+        level: zlib compression level
+    """
+    # pylint: disable=too-many-arguments
+    count = len(frames) if count is None else count
+    _rgba_header(stream, size)
+    _png_chunk(stream, b"acTL", struct.pack(">II", count, 0))
+    sequence = 0
+    for number, frame in enumerate(frames):
+        _png_chunk(stream, b"fcTL", struct.pack(">IIIIIHHBB", sequence, *size,
+                                                0, 0, delay, 1000, 0, 0))
+        compressor = zlib.compressobj(level)
+        data = bytearray()
+        for scanline in _rgba_scanlines(frame, size[0]):
+            data += compressor.compress(b"\0")
+            data += compressor.compress(scanline)
+        data += compressor.flush()
+        if number == 0:
+            _png_chunk(stream, b"IDAT", bytes(data))
+            sequence += 1
+        else:
+            _png_chunk(stream, b"fdAT",
+                       struct.pack(">I", sequence + 1) + bytes(data))
+            sequence += 2
+    _png_chunk(stream, b"IEND", b"")
+
+
+def write_svg(maze, stream, *, scale=1, areas=True, paths=()):
+    """writes an SVG image, one path element per colour and pixel row
+
+    Args:
+        maze: closed Maze or SharedMaze
+        stream: text file object
+        scale: integer size of a maze pixel in SVG units
+        areas: boolean, highlight claimed areas
+        paths: iterable of paths as returned by get_path
+    """
+    width, height = _image_size(maze, 1)
+    colours = {index: "#" + "".join(f"{value:02x}" for value in rgb)
+               for index, rgb in PALETTE.items()}
+    runs = {index: re.compile(re.escape(bytes([index])) + b"+")
+            for index in PALETTE if index != FLOOR}
+    stream.write(f'<svg xmlns="http://www.w3.org/2000/svg" '
+                 f'width="{width * scale}" height="{height * scale}" '
+                 f'viewBox="0 0 {width} {height}" '
+                 f'shape-rendering="crispEdges">\n')
+    stream.write(f'<rect width="{width}" height="{height}" '
+                 f'fill="{colours[FLOOR]}"/>\n')
+    for y, row in enumerate(_pixel_rows(maze, areas=areas, paths=paths)):
+        row = bytes(row)
+        for index, run in runs.items():
+            spans = "".join(f"M{start} {y}h{stop - start}v1h-{stop - start}z"
+                            for start, stop in map(lambda match: match.span(),
+                                                   run.finditer(row)))
+            if spans:
+                stream.write(f'<path fill="{colours[index]}" d="{spans}"/>\n')
+    stream.write("</svg>\n")
+
+
+def render(maze, file_name, **options):
+    """writes maze to file_name, the extension picks the format
+
+    Args:
+        maze: closed Maze or SharedMaze
+        file_name: string path ending in .pgm, .png or .svg
+        options: keyword arguments for the writer
+
+    Raises:
+        ValueError: the extension is not a supported format
+    """
+    writers = {".pgm": (write_pgm, "wb"), ".png": (write_png, "wb"),
+               ".svg": (write_svg, "w")}
+    extension = file_name[file_name.rfind("."):].lower()
+    if extension not in writers:
+        raise ValueError(f"cannot render {file_name}, use one of "
+                         f"{', '.join(writers)}")
+    writer, mode = writers[extension]
+    with open(file_name, mode) as stream:
+        writer(maze, stream, **options)
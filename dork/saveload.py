@@ -3,8 +3,301 @@
 # Generously inspired by our LA,
 # https://github.com/LSmith-Zenoscave
 
+import bz2
+import glob
+import gzip
+import hashlib
+import lzma
+import marshal
+import os
+import shutil
 import yaml
+import dork.binary as binary
+import dork.database as database
+import dork.stream as stream
 import dork.types as types
+import dork.worldfile as worldfile
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+CACHE_SUFFIX = ".cache"
+CACHE_VERSION = 1
+STREAM_SIZE = 64 << 20
+BINARY_SUFFIX = ".dork"
+WORLD_SUFFIX = ".world"
+DATABASE_PREFIX = "db:"
+
+# functions loading game data from file names ending in a suffix, filled
+# in by the modules that own the suffix, such as dork.journal
+LOADERS = {}
+COMPRESSORS = {".gz": gzip, ".xz": lzma, ".bz2": bz2}
+
+_COMPRESSED = ((b"\x1f\x8b", gzip), (b"\xfd7zXZ\x00", lzma), (b"BZh", bz2))
+
+_DATABASES = {}
+
+# files loaded worlds came from, by digest, added to the store when a
+# game is first saved as an overlay of them, see store_base
+_SOURCES = {}
+
+
+def store_dir():
+    """
+    Returns the directory of the content-addressed world store, from the
+    DORK_STORE environment variable or ./dork/store.
+    """
+    return os.environ.get("DORK_STORE", "./dork/store")
+
+
+def _stored_suffix(file_name):
+    """
+    Returns the suffix a file keeps in the store, its format suffix and
+    any COMPRESSORS suffix after it, as in .yml.gz, .yml if it has none.
+    """
+    format_name = _format_name(file_name)
+    suffix = os.path.splitext(format_name)[1] or ".yml"
+    return suffix + file_name[len(format_name):]
+
+
+def store_world(file_name, digest, link=False):
+    """
+    Adds a world file to the content-addressed store, once per content,
+    named after the digest and keeping the suffix of the file, see
+    _stored_suffix. Files that are only ever replaced, never rewritten
+    in place, such as world files, may be hard linked into the store
+    instead of copied.
+
+    Args:
+        file_name: A string containing a file path.
+        digest: The sha256 hex digest of the file, see parse_file.
+        link: True to hard link the file where the file system allows.
+
+    Returns:
+        digest: The digest, the name of the world in the store.
+    """
+    if _find_world(digest) is not None:
+        return digest
+    stored = os.path.join(store_dir(), digest + _stored_suffix(file_name))
+    os.makedirs(store_dir(), exist_ok=True)
+    if os.path.exists(stored + ".tmp"):
+        os.remove(stored + ".tmp")
+    if link:
+        try:
+            os.link(file_name, stored + ".tmp")
+        except OSError:
+            shutil.copyfile(file_name, stored + ".tmp")
+    else:
+        shutil.copyfile(file_name, stored + ".tmp")
+    os.replace(stored + ".tmp", stored)
+    return digest
+
+
+def store_base(base):
+    """
+    Makes sure the base world of a game is in the content-addressed
+    store, adding the file it was loaded from if that file still holds
+    the same world. Loading only records where worlds came from, so
+    nothing is written until a game is saved as an overlay.
+
+    Args:
+        base: The sha256 hex digest of the world, see Game.base.
+
+    Returns:
+        True if the world is in the store, False if it cannot be added,
+        as when the file it came from was changed or removed since.
+    """
+    if _find_world(base) is not None:
+        return True
+    if base not in _SOURCES:
+        return False
+    file_name, is_world = _SOURCES[base]
+    try:
+        if is_world:
+            world = worldfile.WorldFile(file_name)
+            digest = world.digest
+            world.close()
+        else:
+            digest = parse_file(file_name)[1]
+    except (OSError, ValueError):
+        return False
+    if digest != base:
+        return False
+    store_world(file_name, base, link=is_world)
+    return True
+
+
+def save_data(game, full=False):
+    """
+    Returns the data to save a game as, an overlay of its base world
+    if it has one, or the whole game. Games whose base world cannot be
+    added to the store, see store_base, are saved whole, and so are
+    games asked to with full, so the save does not need the store.
+
+    Args:
+        game: The current game state.
+        full: True to save the whole game whatever its base.
+
+    Returns:
+        data: A dictionary from Game.save_overlay or Game.save.
+    """
+    if game.base and not full and store_base(game.base):
+        return game.save_overlay()
+    return game.save()
+
+
+def database_file():
+    """
+    Returns the path of the SQLite database of worlds and saves, from the
+    DORK_DATABASE environment variable or ./dork/dork.db.
+    """
+    return os.environ.get("DORK_DATABASE", "./dork/dork.db")
+
+
+def open_database():
+    """
+    Opens the database at database_file(), once per path, so lazily
+    loaded rooms keep reading from the same connection.
+
+    Returns:
+        dork.database.Database
+    """
+    file_name = database_file()
+    if file_name not in _DATABASES:
+        _DATABASES[file_name] = database.Database(file_name)
+    return _DATABASES[file_name]
+
+
+def cache_file(file_name):
+    """
+    Returns the path of the parse cache of a file, in the cache folder of
+    the store, named after the sha256 hex digest of the absolute path of
+    the file, so caches never sit next to the files they cache.
+    """
+    key = hashlib.sha256(os.path.abspath(file_name).encode()).hexdigest()
+    return os.path.join(store_dir(), "cache", key + CACHE_SUFFIX)
+
+
+def _find_world(digest):
+    """
+    Returns the path of the stored world with a digest, whatever the
+    suffix it was stored with, None if there is none.
+    """
+    pattern = os.path.join(glob.escape(store_dir()), digest + ".*")
+    for stored in sorted(glob.glob(pattern)):
+        if not stored.endswith(".tmp"):
+            return stored
+    return None
+
+
+def resolve_world(digest):
+    """
+    Finds a world in the content-addressed store, see _find_world.
+
+    Args:
+        digest: The sha256 hex digest of the world file.
+
+    Returns:
+        file_name: A string containing the path of the stored world.
+
+    Raises:
+        FileNotFoundError: If no world with that digest was ever stored.
+    """
+    stored = _find_world(digest)
+    if stored is None:
+        raise FileNotFoundError("base world " + digest + " is not in " +
+                                store_dir())
+    return stored
+
+
+def compressor(file_name):
+    """
+    Returns the module compressing files named like file_name, gzip,
+    lzma or bz2 after the COMPRESSORS suffix of the name, None if the
+    name has none.
+    """
+    return COMPRESSORS.get(os.path.splitext(file_name)[1])
+
+
+def open_file(file_name, mode, path=None):
+    """
+    Opens a file, through the compressor its name asks for, so what is
+    written is compressed as it goes rather than built up first.
+
+    Args:
+        file_name: A string containing a file path.
+        mode: The mode to open the file in, 'wt', 'at' or 'wb'.
+        path: A string containing the path to open instead, compressed
+        as file_name asks, for writing under a temporary name.
+
+    Returns:
+        The opened file object.
+    """
+    module = compressor(file_name)
+    if module is None:
+        return open(path or file_name, mode)
+    return module.open(path or file_name, mode)
+
+
+def _format_name(file_name):
+    """
+    Returns a file name without its compression suffix, which names the
+    format of the file under the compression.
+    """
+    if compressor(file_name) is None:
+        return file_name
+    return os.path.splitext(file_name)[0]
+
+
+class _Reader():
+    """
+    Reads a decompressed stream for the YAML parser, hashing everything
+    it reads. The first bytes are read ahead, to tell binary saves apart.
+
+    Args:
+        stream: A decompressing file object opened in binary mode.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self.head = stream.read(len(binary.MAGIC))
+        self.digest = hashlib.sha256(self.head)
+        self._pending = self.head
+
+    def read(self, size=-1):
+        """
+        Returns up to size bytes, everything left if size is negative.
+        """
+        pending, self._pending = self._pending, b""
+        if 0 <= size <= len(pending):
+            self._pending = pending[size:]
+            return pending[:size]
+        data = self._stream.read(size - len(pending) if size >= 0 else -1)
+        self.digest.update(data)
+        return pending + data
+
+
+def _parse_streamed(file_name, module, entities):
+    """
+    Parses a file as it is read, and decompressed if module is given.
+    If entities is True the YAML is parsed entity by entity, see
+    dork.stream, rather than built whole first.
+
+    Returns:
+        2-tuple of the list of documents and the sha256 hex digest of the
+        decompressed content.
+    """
+    with (open if module is None else module.open)(file_name, 'rb') as file:
+        reader = _Reader(file)
+        if binary.is_binary(reader.head):
+            documents = [binary.loads(reader.read())]
+        elif entities:
+            documents = stream.documents(reader)
+        else:
+            documents = list(yaml.load_all(reader, Loader=SafeLoader))
+    return documents, reader.digest.hexdigest()
 
 
 def get_input():
@@ -14,7 +307,12 @@ def get_input():
     It uses the input() method to first get a file name, before appending
     ./dork/yaml/ at the front and .yml in the back. Finally, it returns
     the completed file_name for use in creating save files or looking
-    for a file to load in other methods.
+    for a file to load in other methods. Names already ending in
+    BINARY_SUFFIX or WORLD_SUFFIX are kept as they are, for binary saves
+    and world files, and so are names ending in a COMPRESSORS suffix, for
+    compressed saves, names ending in a LOADERS suffix, such as journals
+    to recover a game from, and names starting with DATABASE_PREFIX, for
+    saves and worlds in the database.
 
     Note:
         input_name cannot contain "default" within it when saving a file
@@ -24,11 +322,368 @@ def get_input():
         file_name: A string containing a file path for use in save/load ops.
     """
     input_name = input("Enter a file name: ")
-    file_name = "./dork/yaml/" + input_name + ".yml"
+    if input_name.startswith(DATABASE_PREFIX):
+        return input_name
+    file_name = "./dork/yaml/" + input_name
+    if not input_name.endswith((BINARY_SUFFIX, WORLD_SUFFIX,
+                                *LOADERS, *COMPRESSORS)):
+        file_name += ".yml"
 
     return file_name
 
 
+def fold(documents):
+    """
+    Folds delta records onto the game data they were saved after.
+    The first document is a full save, every later one a delta record
+    from Game.save_delta, replacing the player and the entities it holds.
+    Games with a base world save only the door and fight state of their
+    rooms in delta records, which is applied part by part like an
+    overlay, and the rooms are added to the overlay entry, if the data
+    has one, so later overlay saves keep them.
+
+    Args:
+        documents: iterable of dictionaries, as from parse_file
+
+    Returns:
+        data: A dictionary containing the game state.
+    """
+    documents = iter(documents)
+    data = next(documents)
+    for delta in documents:
+        if "player" in delta:
+            data["player"] = delta["player"]
+        for section in ("items", "npc"):
+            if delta.get(section):
+                data[section].update(delta[section])
+        rooms = delta.get("rooms", {})
+        if "base" not in data:
+            data["rooms"].update(rooms)
+            continue
+        for name, room in rooms.items():
+            current = data["rooms"].get(name)
+            if not isinstance(current, dict):
+                data["rooms"].update({name: room})
+                continue
+            for part, values in room.items():
+                if isinstance(current.get(part), dict) and\
+                   isinstance(values, dict):
+                    current[part].update(values)
+                else:
+                    current[part] = values
+        if "overlay" in data:
+            data["overlay"] = sorted(set(data["overlay"]).union(rooms))
+    return data
+
+
+def apply_overlay(data, overlay):
+    """
+    Applies the mutable slice of an overlay save onto its base world.
+
+    Args:
+        data: A dictionary containing the base game state.
+        overlay: A dictionary from Game.save_overlay.
+
+    Returns:
+        data: The game state, with base and overlay entries naming the
+        base world and the rooms the overlay holds.
+    """
+    data["player"] = overlay["player"]
+    for name, room in overlay.get("rooms", {}).items():
+        for part, values in room.items():
+            data["rooms"][name][part].update(values)
+    data["base"] = overlay["base"]
+    data["overlay"] = sorted(overlay.get("rooms", {}))
+    return data
+
+
+def _read_cache(cache_name):
+    """
+    Reads a parse cache entry, None if it is missing or unreadable.
+    """
+    try:
+        with open(cache_name, 'rb') as cache:
+            entry = marshal.load(cache)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(entry, tuple) or len(entry) != 5 or\
+       entry[0] != CACHE_VERSION:
+        return None
+    return entry
+
+
+def _write_cache(cache_name, entry):
+    """
+    Writes a parse cache entry, quietly giving up on read only folders
+    and on documents marshal cannot hold, such as dates.
+    """
+    try:
+        os.makedirs(os.path.dirname(cache_name), exist_ok=True)
+        with open(cache_name + ".tmp", 'wb') as cache:
+            marshal.dump(entry, cache)
+        os.replace(cache_name + ".tmp", cache_name)
+    except (OSError, ValueError):
+        pass
+
+
+def parse_file(file_name):
+    """
+    Parses every YAML document of a file, using libyaml when available.
+    The parsed documents are cached in a marshal file in the store, see
+    cache_file, keyed by modification time, size and sha256 digest, so
+    loading an unchanged file again skips parsing. A file touched without
+    changing its content only needs to be hashed. Binary saves, recognised
+    by their magic bytes, are read directly and never cached. Files
+    compressed by gzip, lzma or bz2, also recognised by their magic
+    bytes whatever their name, are parsed as they are decompressed and
+    hashed by their decompressed content. Files of STREAM_SIZE bytes or
+    more are read as they are parsed, and their rooms, items and npcs
+    built one at a time, so the peak memory stays close to the size of
+    the loaded world. They are not cached, as the cache would have to be
+    read whole.
+
+    Args:
+        file_name: A string containing a file path.
+
+    Returns:
+        2-tuple of the list of documents and the sha256 hex digest.
+    """
+    stat = os.stat(file_name)
+    huge = stat.st_size >= STREAM_SIZE
+    cache_name = cache_file(file_name)
+    entry = None if huge else _read_cache(cache_name)
+    if entry and entry[1:3] == (stat.st_mtime_ns, stat.st_size):
+        return entry[4], entry[3]
+    with open(file_name, 'rb') as file:
+        content = file.read(len(binary.MAGIC))
+        for magic, module in _COMPRESSED:
+            if content.startswith(magic):
+                break
+        else:
+            module = None
+            if not huge:
+                content += file.read()
+    if module is not None or huge:
+        documents, digest = _parse_streamed(file_name, module, huge)
+        if not huge:
+            _write_cache(cache_name, (CACHE_VERSION, stat.st_mtime_ns,
+                                      stat.st_size, digest, documents))
+        return documents, digest
+    digest = hashlib.sha256(content).hexdigest()
+    if binary.is_binary(content):
+        return [binary.loads(content)], digest
+    if entry and entry[3] == digest:
+        documents = entry[4]
+    else:
+        documents = list(yaml.load_all(content, Loader=SafeLoader))
+    _write_cache(cache_name, (CACHE_VERSION, stat.st_mtime_ns,
+                              stat.st_size, digest, documents))
+    return documents, digest
+
+
+def load_database(name):
+    """
+    Loads a save, or failing that a world, from the database. Rooms,
+    items and npcs are read from the database as the game looks them up,
+    and saves are applied onto their world like overlays.
+
+    Args:
+        name: A string containing the name of the save or world.
+
+    Returns:
+        data: A dictionary containing the game state.
+
+    Raises:
+        FileNotFoundError: If the database has no save or world by that
+        name.
+    """
+    store = open_database()
+    try:
+        overlay = store.save(name)
+    except KeyError:
+        try:
+            return store.world(name)
+        except KeyError:
+            raise FileNotFoundError("no save or world " + name + " in " +
+                                    database_file()) from None
+    return apply_overlay(store.world(overlay["world"]), overlay)
+
+
+def write_database(game, name):
+    """
+    Saves a game to the database. Games with a base world in the
+    content-addressed store, see store_base, are saved as overlays of
+    it, adding the world from the store the first time, other games are
+    added as a world.
+
+    Args:
+        game: The current game state.
+        name: A string containing the name of the save.
+    """
+    store = open_database()
+    if not game.base or not store_base(game.base):
+        store.add_world(name, game.save())
+        return
+    if store.world_named(game.base) is None:
+        store.add_world(game.base, load_file(resolve_world(game.base)))
+    store.add_save(name, game.save_overlay())
+
+
+def load_file(file_name):
+    """
+    Loads a save file, with any delta records appended to it.
+    Overlay saves are applied onto their base world, found in the
+    content-addressed store. Other files become the base world of the
+    game, added to the store once the game is saved as an overlay, see
+    store_base, so loading never writes to disk. World files are
+    mapped into memory rather than read, their rooms are decoded as the
+    game visits them. Names starting with DATABASE_PREFIX are loaded
+    from the database, see load_database, and names ending in
+    a LOADERS suffix, such as dork.journal.JOURNAL_SUFFIX, are loaded by
+    its loader.
+
+    Args:
+        file_name: A string containing a file path.
+
+    Returns:
+        data: A dictionary containing the game state.
+    """
+    if file_name.startswith(DATABASE_PREFIX):
+        return load_database(file_name[len(DATABASE_PREFIX):])
+    for suffix, loader in LOADERS.items():
+        if file_name.endswith(suffix):
+            return loader(file_name)
+    is_world = worldfile.is_world_file(file_name)
+    if is_world:
+        world = worldfile.WorldFile(file_name)
+        documents, digest = [world.data()], world.digest
+    else:
+        documents, digest = parse_file(file_name)
+    first = documents[0]
+    if "base" in first:
+        first = apply_overlay(load_file(resolve_world(first["base"])),
+                              first)
+    else:
+        _SOURCES[digest] = (file_name, is_world)
+        first["base"] = digest
+    return fold([first] + documents[1:])
+
+
+def dump_file(data, file_name):
+    """
+    Writes game data in the format named by the end of the file name:
+    a world file for WORLD_SUFFIX, a binary save for BINARY_SUFFIX and
+    YAML for anything else. A COMPRESSORS suffix after the format, as in
+    save.yml.gz or save.dork.xz, streams the file through gzip, lzma or
+    bz2. Names starting with DATABASE_PREFIX add the data to the
+    database as a world. Files are written under a temporary name and
+    moved in place once complete, so a crash mid-write leaves the old
+    file whole.
+
+    Args:
+        data: A dictionary containing the game state.
+        file_name: A string containing a file path.
+
+    Raises:
+        ValueError: If data holds something the format cannot store, or
+        a world file is to be compressed, as they are mapped into memory.
+    """
+    format_name = _format_name(file_name)
+    if file_name.startswith(DATABASE_PREFIX):
+        open_database().add_world(file_name[len(DATABASE_PREFIX):], data)
+    elif format_name.endswith(WORLD_SUFFIX):
+        if format_name != file_name:
+            raise ValueError("world files cannot be compressed")
+        worldfile.write_world(data, file_name)
+    else:
+        temp_name = file_name + ".tmp"
+        try:
+            if format_name.endswith(BINARY_SUFFIX):
+                with open_file(file_name, 'wb', temp_name) as binary_file:
+                    binary.dump(data, binary_file)
+            else:
+                with open_file(file_name, 'wt', temp_name) as yaml_file:
+                    # the pure Python emitter, libyaml folds long lines
+                    # differently and would reformat every save rewritten
+                    yaml.dump(data, default_flow_style=False,
+                              stream=yaml_file, Dumper=yaml.SafeDumper)
+            os.replace(temp_name, file_name)
+        finally:
+            if os.path.exists(temp_name):
+                os.remove(temp_name)
+
+
+def write(game, file_name, full=False):
+    """
+    Writes the game to a save file. If the game was last saved to that
+    YAML file, only what changed since is appended, as a delta record, so
+    the cost of a save does not depend on the size of the world.
+    Otherwise the game is written as an overlay of its base world, or in
+    full if it has none or it cannot be stored, see save_data, which also
+    drops earlier delta records. Full saves, asked for with full, are
+    always written whole and need no store to load. Binary
+    saves and world files, see dump_file, are written whole every time.
+    Compressed YAML saves get their delta records appended as streams of
+    their own, which the decompressors read on as one. Names starting
+    with DATABASE_PREFIX are saved to the database, see write_database.
+
+    Args:
+        game: The current game state.
+        file_name: A string containing a file path.
+        full: True to write the whole game rather than an overlay.
+    """
+    if file_name.startswith(DATABASE_PREFIX):
+        write_database(game, file_name[len(DATABASE_PREFIX):])
+        game.saved(file_name)
+        return
+    is_yaml = not _format_name(file_name).endswith(
+        (BINARY_SUFFIX, WORLD_SUFFIX))
+    if is_yaml and not full and game.save_file == file_name and\
+       os.path.exists(file_name):
+        delta = game.save_delta()
+        if delta:
+            with open_file(file_name, 'at') as yaml_file:
+                yaml_file.write("---\n")
+                yaml.dump(delta, default_flow_style=False,
+                          stream=yaml_file, Dumper=yaml.SafeDumper)
+        return
+    dump_file(save_data(game, full), file_name)
+    game.saved(file_name)
+
+
+def convert(source, target):
+    """
+    Converts a save or world file between YAML, the binary format and
+    world files, compressed or not. The format of the source is detected
+    from its magic bytes, delta records are folded in, and the target is
+    written in the format its name asks for, see dump_file. Overlay
+    saves stay overlays of the same base world. Names starting with
+    DATABASE_PREFIX read a save, applied onto its world, or a world from
+    the database.
+
+    Args:
+        source: A string containing the path of the file to convert.
+        target: A string containing the path of the file to write.
+
+    Raises:
+        ValueError: If the source holds something the target format
+        cannot store.
+    """
+    if source.startswith(DATABASE_PREFIX):
+        data = load_database(source[len(DATABASE_PREFIX):])
+        for key in database.TABLES:
+            data[key] = dict(data[key])
+    elif worldfile.is_world_file(source):
+        world = worldfile.WorldFile(source)
+        data = world.data()
+        if "rooms" in data:
+            data["rooms"] = dict(data["rooms"])
+        world.close()
+    else:
+        data = fold(parse_file(source)[0])
+    dump_file(data, target)
+
+
 def load():
     """
     When called, asks the user for a file name and loads it to the game state.
@@ -58,9 +713,8 @@ def load():
 
     while loaded is False:
         try:
-            with open(file_name) as file:
-                data = yaml.safe_load(file.read())
-                loaded = True
+            data = load_file(file_name)
+            loaded = True
         except (OSError, FileNotFoundError, ValueError):
             print("ERROR: Invalid file name: " + file_name)
             print("Please try a different file name.")
@@ -83,7 +737,8 @@ def save(game):
     overwrite. The second loop ensures that the filename is valid and does
     not produce any errors, and will continue to prompt the user for a new
     filename until they input a valid one. Once we have a valid filename,
-    we use yaml's safe_dump() function to dump the data into a dictionary.
+    write() dumps the game, or only what changed if the game was last
+    saved to the same file.
     Finally, we return 0 to indicate a successful execution of save().
 
     Args:
@@ -101,7 +756,6 @@ def save(game):
     """
     print("Attempting to save data.")
 
-    data = game.save()
     file_name = get_input()
     saved = False
     name_ok = False
@@ -115,10 +769,8 @@ def save(game):
 
     while saved is False:
         try:
-            with open(file_name, 'w') as yaml_file:
-                yaml.safe_dump(data, default_flow_style=False,
-                               stream=yaml_file)
-                saved = True
+            write(game, file_name)
+            saved = True
         except (IOError, ValueError):
             print("ERROR: Invalid file name: " + file_name)
             print("Please try a different file name.")
@@ -131,14 +783,18 @@ def save(game):
     return 0
 
 
-def game_state():
+def game_state(map_backend=None, map_worker=None):
     """
     First, data is loaded using load() and then returned as a game sate.
     This function starts by assigning to data using load(), and then
     immediately returns the game state.
 
+    Args:
+        map_backend: minimap backend name, see dork.minimap.get_map
+        map_worker: minimap worker name, see dork.minimap.get_map
+
     Returns:
         types.Game(data): A dictionary containing the game state.
     """
     data = load()
-    return types.Game(data)
+    return types.Game(data, map_backend, map_worker)
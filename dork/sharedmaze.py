@@ -0,0 +1,313 @@
+"""Publishes closed mazes into shared memory for other processes
+"""
+import os
+import struct
+import sys
+from itertools import product
+from math import sqrt
+from multiprocessing import parent_process, shared_memory, resource_tracker
+from random import choice
+
+from dork.maze import Maze, _bfs
+
+__all__ = ["SharedMaze"]
+
+_HEADER = struct.Struct("<4sIIIII")
+_EDGE = struct.Struct("<II")
+_AREA = struct.Struct("<IIIIH")
+_MAGIC = b"DRKM"
+_VERSION = 2
+
+# names of the blocks published by this process, forked children inherit
+# them along with the resource tracker of the publisher
+_PUBLISHED = set()
+
+
+def _shares_tracker(name):
+    """returns True if this process may share the resource tracker of the
+    publisher of a block: it is the publisher, or was started by
+    multiprocessing, whose children use the tracker of their parent
+    """
+    return name in _PUBLISHED or parent_process() is not None
+
+
+def _pack_areas(areas):
+    """packs an area table as (x, y, width, height, name length, name)
+    """
+    table = bytearray()
+    for name, area in areas.items():
+        encoded = name.encode("utf-8")
+        table += _AREA.pack(area.origin.x, area.origin.y,
+                            area.box.width, area.box.height, len(encoded))
+        table += encoded
+    return bytes(table)
+
+
+def _unpack_areas(buffer, offset, count):
+    """reverses _pack_areas starting at offset into buffer
+    """
+    areas = {}
+    for _ in range(0, count):
+        x, y, width, height, length = _AREA.unpack_from(buffer, offset)
+        offset += _AREA.size
+        name = bytes(buffer[offset:offset + length]).decode("utf-8")
+        offset += length
+        areas[name] = Maze.Area(x=x, y=y, width=width, height=height)
+    return areas
+
+
+class SharedMaze:
+    """A frozen, read-only maze living in a shared memory block
+
+    The block holds a header, one byte of Maze.PASSAGES bits per cell,
+    the shortcut edges and the area table, so any number of processes
+    can attach to one copy of the maze. Neighbour and path queries read
+    the passage bytes directly, no networkx graph is built.
+
+    Attributes:
+        name: string name of the shared memory block
+        width: integer number of cells per line
+        areas: dictionary using room name as key to Maze.Area instances
+        is_closed: always True, shared mazes cannot grow
+
+    Example:
+
+            ::
+
+                shared = SharedMaze.publish(maze)
+
+                <in another process>
+
+                maze = SharedMaze.attach(shared.name)
+
+                maze.get_path("room", "right", "hallway", "left")
+
+                maze.close()
+
+                <in the publishing process, once every session is done>
+
+                shared.close()
+
+                shared.unlink()
+    """
+
+    def __init__(self, memory, *, owner=False):
+        """Reads the header and area table of an opened memory block
+
+        Use publish or attach instead of calling this directly.
+
+        Raises:
+            ValueError: the block does not hold a shared maze
+        """
+        self._memory = memory
+        self._owner = owner
+        magic, version, width, height, shortcut_count, area_count =\
+            _HEADER.unpack_from(memory.buf, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{memory.name} is not a shared maze")
+        self.name = memory.name
+        self.width = width
+        self._height = height
+        self.is_closed = True
+
+        offset = _HEADER.size
+        self._walls = memory.buf[offset:offset + width * height].toreadonly()
+        offset += width * height
+        self._shortcuts = {}
+        for _ in range(0, shortcut_count):
+            from_node, to_node = _EDGE.unpack_from(memory.buf, offset)
+            self._shortcuts.setdefault(from_node, []).append(to_node)
+            offset += _EDGE.size
+        self.areas = _unpack_areas(memory.buf, offset, area_count)
+        for area in self.areas.values():
+            self._fill_borders(area)
+
+    @classmethod
+    def publish(cls, maze, name=None):
+        """copies a closed maze into a new shared memory block
+
+        Args:
+            maze: closed Maze
+            name: optional string name for the block, generated if None
+
+        Returns:
+            SharedMaze that owns the block
+
+        Raises:
+            RuntimeWarning: maze needs to be closed
+        """
+        if not maze.is_closed:
+            raise RuntimeWarning("Mazes are read only until closed")
+        height = maze.height()
+        shortcuts = maze.shortcuts()
+        areas = _pack_areas(maze.areas)
+        size = (_HEADER.size + maze.width * height +
+                _EDGE.size * len(shortcuts) + len(areas))
+        memory = shared_memory.SharedMemory(name=name, create=True, size=size)
+        _HEADER.pack_into(memory.buf, 0, _MAGIC, _VERSION, maze.width,
+                          height, len(shortcuts), len(maze.areas))
+        offset = _HEADER.size
+        for row in maze.wall_rows():
+            memory.buf[offset:offset + maze.width] = row
+            offset += maze.width
+        for edge in shortcuts:
+            _EDGE.pack_into(memory.buf, offset, *edge)
+            offset += _EDGE.size
+        memory.buf[offset:offset + len(areas)] = areas
+        _PUBLISHED.add(memory.name)
+        return cls(memory, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        """opens a maze published by another process
+
+        Args:
+            name: string name of the shared memory block
+
+        Returns:
+            SharedMaze, closing it leaves the block to the publisher
+        """
+        # the publisher owns the block, the resource tracker of this
+        # process must not unlink it on exit
+        if sys.version_info >= (3, 13):
+            # pylint: disable=unexpected-keyword-arg
+            memory = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            memory = shared_memory.SharedMemory(name=name)
+            # before 3.13 opening a block registers it with the tracker,
+            # which only a process with a tracker of its own should undo,
+            # as it would drop the registration of the publisher too
+            if os.name == "posix" and not _shares_tracker(memory.name):
+                resource_tracker.unregister("/" + memory.name,
+                                            "shared_memory")
+        return cls(memory)
+
+    def close(self):
+        """releases this process' view of the block
+        """
+        self._walls.release()
+        self._memory.close()
+
+    def unlink(self):
+        """destroys the block, only the publisher should call this
+
+        Raises:
+            RuntimeWarning: this process did not publish the maze
+        """
+        if not self._owner:
+            raise RuntimeWarning("Only the publisher can unlink a maze")
+        self._memory.unlink()
+        _PUBLISHED.discard(self.name)
+
+    def _fill_borders(self, area):
+        """rebuilds the node lists Maze._grid_connect records for an area
+        """
+        offsets = product(range(0, area.box.width), range(0, area.box.height))
+        for dx, dy in offsets:
+            node = area.origin.x + dx + (area.origin.y + dy) * self.width
+            if dy == 0:
+                area.up_border.append(node)
+            if dy == area.box.height - 1:
+                area.down_border.append(node)
+            if dx == 0:
+                area.left_border.append(node)
+            if dx == area.box.width - 1:
+                area.right_border.append(node)
+            if 0 < dx < area.box.width - 1 and 0 < dy < area.box.height - 1:
+                area.center.append(node)
+
+    def size(self):
+        """returns the number of nodes in the maze
+        """
+        return self.width * self._height
+
+    def height(self):
+        """returns the number of lines in the maze
+        """
+        return self._height
+
+    def location(self, node_id):
+        """ gets x,y coordinates of a node identifier
+        """
+        return (node_id % self.width, node_id // self.width)
+
+    def step(self, node_id, way):
+        """returns the cell next to node_id in direction way
+
+        Args:
+            node_id: integer
+            way: direction as a string
+
+        Raises:
+            IndexError: coordinates must stay inside the maze
+        """
+        x, y = self.location(node_id)
+        x += {"left": -1, "right": 1}.get(way, 0)
+        y += {"up": -1, "down": 1}.get(way, 0)
+        if not (0 <= x < self.width and 0 <= y < self._height):
+            raise IndexError(f"node_id cannot go {way} of {node_id}")
+        return x + y * self.width
+
+    def wall_rows(self):
+        """yields read-only views of the passage bytes, one line at a time
+
+        See Maze.wall_rows
+        """
+        for y in range(0, self._height):
+            yield self._walls[y * self.width:(y + 1) * self.width]
+
+    def neighbors(self, node_id):
+        """returns the node identifiers reachable in one step from node_id
+        """
+        passages = self._walls[node_id]
+        found = [self.step(node_id, way)
+                 for way, bit in Maze.PASSAGES.items() if passages & bit]
+        found.extend(self._shortcuts.get(node_id, []))
+        return found
+
+    def distance(self, node_id_pair):
+        """see Maze.distance
+        """
+        (x_1, y_1), (x_2, y_2) = map(self.location, node_id_pair)
+        return (node_id_pair, sqrt(pow((x_2-x_1), 2)+pow((y_2-y_1), 2)))
+
+    def claim_area(self, name, area):
+        """shared mazes are frozen
+
+        Raises:
+            RuntimeWarning: always
+        """
+        raise RuntimeWarning(f"Shared mazes are read only, cannot claim "
+                             f"{name} at {area.origin.x},{area.origin.y}")
+
+    def exit(self, area_name, way):
+        """see Maze.exit
+        """
+        area = self.areas[area_name]
+        node = choice(getattr(area, way + "_border"))
+        return node, self.step(node, way)
+
+    def shortest_path(self, source, target):
+        """breadth first search over the passage bytes
+
+        Returns:
+            list of node identifiers from source to target, empty if none
+        """
+        return _bfs(self.neighbors, source, lambda node: node == target)
+
+    def get_path(self, from_area_name, from_way, to_area_name, to_way):
+        """see Maze.get_path
+
+        Returns:
+            Empty list if no path is possible, otherwise the path with
+            (area name, node id) tuples as first and last element
+        """
+        from_node, from_next = self.exit(from_area_name, from_way)
+        to_node, to_next = self.exit(to_area_name, to_way)
+
+        path = self.shortest_path(from_next, to_next)
+        if not path:
+            return []
+        path.append((to_area_name, to_node))
+        path.insert(0, (from_area_name, from_node))
+        return path
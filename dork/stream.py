@@ -0,0 +1,147 @@
+"""Streaming YAML loader for dork worlds too large to parse whole
+"""
+import yaml
+from yaml.composer import ComposerError
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+__all__ = ["SECTIONS", "documents", "entries"]
+
+SECTIONS = ("rooms", "items", "npc")
+
+
+def _resolve(loader, kind, event):
+    """returns the tag of a node, resolving implicit ones as yaml does
+    """
+    if event.tag is None or event.tag == "!":
+        value = event.value if kind is yaml.ScalarNode else None
+        return loader.resolve(kind, value, event.implicit)
+    return event.tag
+
+
+def _compose(loader, anchors):
+    """composes the node of the next events, as yaml's Composer does
+
+    The C parser does not expose the composer, only the events, so this
+    is the one composer working with both parsers.
+
+    Raises:
+        yaml.composer.ComposerError: an alias names an unknown anchor
+    """
+    event = loader.get_event()
+    if isinstance(event, yaml.AliasEvent):
+        if event.anchor not in anchors:
+            raise ComposerError(None, None,
+                                f"found undefined alias {event.anchor}",
+                                event.start_mark)
+        return anchors[event.anchor]
+    if isinstance(event, yaml.ScalarEvent):
+        node = yaml.ScalarNode(_resolve(loader, yaml.ScalarNode, event),
+                               event.value, event.start_mark,
+                               event.end_mark, style=event.style)
+    elif isinstance(event, yaml.SequenceStartEvent):
+        node = yaml.SequenceNode(_resolve(loader, yaml.SequenceNode, event),
+                                 [], event.start_mark, None,
+                                 flow_style=event.flow_style)
+        while not loader.check_event(yaml.SequenceEndEvent):
+            node.value.append(_compose(loader, anchors))
+        node.end_mark = loader.get_event().end_mark
+    else:
+        node = yaml.MappingNode(_resolve(loader, yaml.MappingNode, event),
+                                [], event.start_mark, None,
+                                flow_style=event.flow_style)
+        while not loader.check_event(yaml.MappingEndEvent):
+            key = _compose(loader, anchors)
+            node.value.append((key, _compose(loader, anchors)))
+        node.end_mark = loader.get_event().end_mark
+    if event.anchor is not None:
+        anchors[event.anchor] = node
+    return node
+
+
+def _construct(loader, anchors):
+    """returns the object of the next node, forgetting everything built
+    for it but the objects of anchored nodes, which aliases share
+    """
+    data = loader.construct_object(_compose(loader, anchors), deep=True)
+    anchored = set(anchors.values())
+    loader.constructed_objects = {
+        node: value for node, value in loader.constructed_objects.items()
+        if node in anchored}
+    loader.recursive_objects = {}
+    return data
+
+
+def entries(loader):
+    """yields the entries of the next document of a loader, one at a time
+
+    The rooms, items and npcs of SECTIONS are composed and constructed
+    one entity at a time, so only one of them is ever held as yaml
+    nodes. Everything else is constructed whole.
+
+    Args:
+        loader: yaml loader at the start of a document
+
+    Yields:
+        (key, None, value) for every top level entry, with an empty
+        dictionary as value for the sections of SECTIONS, followed by
+        (section, name, entity) for every entity of the section
+    """
+    loader.get_event()
+    if not loader.check_event(yaml.MappingStartEvent):
+        yield None, None, _construct(loader, {})
+        loader.get_event()
+        return
+    anchors = {}
+    loader.get_event()
+    while not loader.check_event(yaml.MappingEndEvent):
+        key = _construct(loader, anchors)
+        if key in SECTIONS and loader.check_event(yaml.MappingStartEvent):
+            loader.get_event()
+            yield key, None, {}
+            while not loader.check_event(yaml.MappingEndEvent):
+                name = _construct(loader, anchors)
+                yield key, name, _construct(loader, anchors)
+            loader.get_event()
+        else:
+            yield key, None, _construct(loader, anchors)
+    loader.get_event()
+    loader.get_event()
+
+
+def documents(stream):
+    """parses every document of a stream, the first one entity by entity
+
+    The entities go straight into the dictionaries of their sections, so
+    the peak memory of loading a world stays close to the size of the
+    loaded world rather than several times it. Delta records after the
+    first document are small and parsed as usual.
+
+    Args:
+        stream: file object, or anything with a read method, of yaml
+
+    Returns:
+        list of the documents
+    """
+    loader = SafeLoader(stream)
+    try:
+        loader.get_event()
+        if loader.check_event(yaml.StreamEndEvent):
+            return []
+        first = {}
+        for key, name, value in entries(loader):
+            if key is None:
+                first = value
+            elif name is None:
+                first[key] = value
+            else:
+                first[key][name] = value
+        parsed = [first]
+        while loader.check_data():
+            parsed.append(loader.get_data())
+        return parsed
+    finally:
+        loader.dispose()
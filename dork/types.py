@@ -1,227 +1,497 @@
 # -*- coding: utf-8 -*-
 """Basic entity classes and methods for Dork.
 """
-import warnings
-import networkx as nx
-import pylab as plt
+import sys
+from collections.abc import Mapping
+from weakref import WeakValueDictionary
 
-warnings.filterwarnings("ignore")
+from dork.history import History
+from dork.minimap import FrameExporter, Map, get_map
+from dork.world import World
 
-__all__ = ["Player", "Room", "GAME", "Map"]
+__all__ = ["Player", "Room", "GAME", "Map", "FrameExporter", "LazyEntities"]
 
 GAME = None
 
 
-class Map():
-    """Map class updates with player location change
+class Game():
+    """Creates and hold the game state
 
-    This class takes a room dictionary and converts it to
-    a coordinate system that can be mapped to the maze
+    Rooms, items and npcs are built on first access, the minimap on first
+    use, so starting a game does not depend on the size of the world.
 
-    Attributes:
-        origins: dictionary of room_name keys to Point with x,y coordinates
-        room_map: a dictioanry mapping room_names to node-edge-list
-                  representations {room_name: {node_id:
-                  <list of nodes node_id connects to>}}
-    Note:
-        TODO - Associate the minimap to Maze node identifiers
+    Args:
+        data: dictionary with player, rooms, items and npc entries
+        map_backend: minimap backend name, see dork.minimap.get_map
+        map_worker: minimap worker name, see dork.minimap.get_map
     """
-    class Point:
-        """Point class, bookkeeping
+    # pylint: disable=too-many-instance-attributes
+    def __init__(self, data, map_backend=None, map_worker=None):
+        self._loaded = data
+        self.player = Player(data['player'])
+        self.rooms = LazyRooms(data.get('rooms'))
+        self.items = LazyEntities(data.get('items'), Item)
+        self.npc = LazyEntities(data.get('npc'), Nonplayer)
+        self._map_backend = map_backend
+        self._map_worker = map_worker
+        self._room_map = None
+        self.history = History(self)
+        self.dirty = {"player": False, "rooms": set()}
+        self.changes = {"player": False, "rooms": set()}
+        self.save_file = None
+        self.base = data.get("base")
+        self._overlay = set(data.get("overlay", ()))
+
+    def loaded(self):
+        """returns the data the game was loaded from, as it was loaded
+        """
+        return self._loaded
 
-        Attributes:
-            x: integer coordinate
-            y: integer coordinate
+    @property
+    def world(self):
+        """dork.world.World of the rooms
         """
-        def __init__(self, *, x=0, y=0):
-            self.x = x
-            self.y = y
+        return self.rooms.world
 
-    @staticmethod
-    def _adjust_minimap_origins(room, direction, origins, name, nodes):
-        """transforms minimap origins into maze coordinate system
+    @property
+    def room_map(self):
+        """minimap of the game, built on first use
+        """
+        if self._room_map is None:
+            self._room_map = get_map(self, self._map_backend,
+                                     self._map_worker)
+        return self._room_map
 
-        Args:
-            room: Room object
-            direction: as string
-            origins: the origin list to update
-            name: key as string
-            nodes: dictionary mapping node ids to rooms, and old ids to new ids
+    @room_map.setter
+    def room_map(self, minimap):
+        self._room_map = minimap
 
-        Returns:
-            new edge tuple updated with maze-coordinate node identifiers
-            empty edge tuple if no edge existed in that direction
+    def close(self):
+        """releases the minimap, if it was ever built
         """
-        if room.paths[direction]:
-            if name not in origins:
-                origins[name] = Map.Point(x=0, y=0)
-            if room.paths[direction] not in origins:
-                origins[room.paths[direction]] = Map.Point(x=0, y=0)
-            x, y = (origins[name].x, origins[name].y)
-            if direction == "up":
-                y -= 1
-            if direction == "down":
-                y += 1
-            if direction == "left":
-                x -= 1
-            if direction == "right":
-                x += 1
-            origins[room.paths[direction]] = Map.Point(x=x, y=y)
-            return (nodes[name], nodes[room.paths[direction]])
-        return tuple()
-
-    @staticmethod
-    def _construct_minimap(minimap, nodes, rooms):
-        """takes room associations and converts to a minimap graph
-
-        Args:
-            minimap: graph with coordinates based on room associations
-            nodes: dictionary of node identifiers
-            rooms: dictionary of room_name to Room objects
+        if self._room_map is not None:
+            self._room_map.close()
 
-        Returns:
-            tuple with origins that can map into a Maze graph, and the
-            associated networkx graph
+    def touch(self, *rooms):
+        """marks the player, and the named rooms, as changed since the
+        last save and since the last take_changes, the rooms also for
+        every later overlay
         """
-        origins = {}
-        edges = []
-        for name, room in rooms.items():
-            for direction in ["up", "down", "left", "right"]:
-                edges.append(Map._adjust_minimap_origins(room, direction,
-                                                         origins, name, nodes))
-
-        minimap.add_edges_from(list(filter(lambda edge: edge, edges)))
-        return origins, minimap
-
-    @staticmethod
-    def _setup_window(corner_offset=0.05, width_of_screen=0.3):
-        """sets up pylab window without borders and on the bottom-right corner
-
-        Args:
-            corner_offset: % of dimension to offset from corner
-            width_of_screen: % of screen dimensions to size the window
+        for changed in (self.dirty, self.changes):
+            changed["player"] = True
+            changed["rooms"].update(rooms)
+        self._overlay.update(rooms)
+
+    def take_changes(self):
+        """returns what changed since the last call, see touch, for
+        dork.journal, leaving the save state alone
+
+        Returns:
+            dictionary with a player flag and a rooms set
         """
-        fig_manager = plt.get_current_fig_manager()
-        fig_manager.set_window_title("Team NoName - Dork - Map")
-        width = int(fig_manager.window.winfo_screenwidth()*width_of_screen)
-        height = width
-        x = fig_manager.window.winfo_screenwidth() - width -\
-            int(width*corner_offset)
-        y = fig_manager.window.winfo_screenheight() - height -\
-            int(height*corner_offset)
-        fig_manager.window.wm_deiconify()
-        fig_manager.window.wm_geometry(f"{width}x{height}+{x}+{y}")
-        fig_manager.window.children["!navigationtoolbar2tk"].pack_forget()
-        fig_manager.window.overrideredirect(True)
-        plt.ion()
-
-    def __init__(self, game):
-        self._game = game
-        rooms = game.rooms
-        minimap = nx.Graph()
-        nodes = {name: node_id for name, node_id in
-                 zip(rooms.keys(), range(0, len(rooms.keys())))}
-        minimap.add_nodes_from(nodes.values())
-        origins, minimap = Map._construct_minimap(minimap, nodes, rooms)
-
-        dx = min(origins.values(), key=lambda origin: origin.x).x
-        dy = min(origins.values(), key=lambda origin: origin.y).y
-
-        if dx < 0:
-            for origin in origins.values():
-                origin.x += abs(dx)
-        if dy < 0:
-            for origin in origins.values():
-                origin.y += abs(dy)
-
-        width = max(origins.values(), key=lambda origin: origin.x).x + 1
-        self.origins = origins
-        self.room_map = {room: {"node_id": None, "edges": []}
-                         for room in origins}
-        for name, origin in origins.items():
-            node_id = origin.x + origin.y * width
-            nodes[nodes[name]] = node_id
-            self.room_map[name]["node_id"] = node_id
-        for name, origin in origins.items():
-            for edge in minimap.edges(nodes[name]):
-                self.room_map[name]["edges"].append(nodes[edge[1]])
-
-        Map._setup_window()
-        self.show()
-
-    def show(self):
-        """Displays the graph as a networkkx plot
-
-        Note:
-            Redraws entire graph each time user moves
+        changes = self.changes
+        self.changes = {"player": False, "rooms": set()}
+        return changes
+
+    def saved(self, file_name=None):
+        """marks everything as saved, to file_name if given
         """
-        plt.clf()
-        labels = {node_info["node_id"]: room for room,
-                  node_info in self.room_map.items()}
-        max_y = max(self.origins.values(), key=lambda node: node.y).y
-        positions = {self.room_map[room]["node_id"]:
-                     (origin.x, abs(origin.y-max_y))
-                     for room, origin in self.origins.items()}
-        color_map = ["blue" for _ in labels]
-        color_map[list(labels.values())
-                  .index(self._game.player.position["location"])] = "red"
-        minimap = nx.Graph()
-        minimap.add_nodes_from([node_info["node_id"]
-                                for room, node_info in self.room_map.items()])
-        minimap.add_edges_from([(node_info["node_id"], e_node)
-                                for room, node_info in self.room_map.items()
-                                for e_node in node_info["edges"]])
-        nx.draw(minimap, pos=positions, node_color=color_map, node_size=100)
-        delta = 0.1
-        pos_higher = {k: (v[0], v[1]+delta) for k, v in positions.items()}
-        nx.draw_networkx_labels(minimap, pos_higher, labels)
-        plt.margins(0.2)
-        plt.show()
-
-    def update(self):
-        """update the figure on game-state change
+        self.dirty = {"player": False, "rooms": set()}
+        if file_name is not None:
+            self.save_file = file_name
+
+    def save_delta(self):
+        """returns only what changed since the last save, see touch, and
+        marks everything as saved
+
+        Returns:
+            dictionary with a player entry if the player changed and a
+            rooms entry with the rooms that changed, empty if nothing did,
+            holding only their door and fight state, see save_state, if
+            the game has a base world
         """
-        self.show()
+        delta = {}
+        if self.dirty["player"]:
+            delta["player"] = self.player.save()
+        if self.dirty["rooms"]:
+            save = self.save_state if self.base else\
+                (lambda name: self.rooms[name].save())
+            delta["rooms"] = {name: save(name)
+                              for name in sorted(self.dirty["rooms"])}
+        self.saved()
+        return delta
+
+    def save_overlay(self):
+        """returns the mutable slice of the game, relative to its base world
+
+        Rooms never changed, see touch, and not in the overlay the game
+        was loaded from, are as in the base world and left out.
 
+        Returns:
+            dictionary with the base world digest, the player, and the
+            door and fight state of the rooms that may have changed
 
-class Game():
-    """Creates and hold the game state
-    """
-    def __init__(self, data):
-        self._data = data
-        self.player = Player(data['player'])
-        self.rooms = {room_name: Room(room) for room_name,
-                      room in data.get('rooms').items()}
-        self.items = {item_name: Item(item) for item_name,
-                      item in data.get('items').items()}
-        self.npc = {npc_name: Nonplayer(npc) for npc_name,
-                    npc in data.get('npc').items()}
-        self.room_map = Map(self)
+        Raises:
+            ValueError: the game was not loaded from a stored world
+        """
+        if not self.base:
+            raise ValueError("game has no base world to overlay")
+        return {"base": self.base, "player": self.player.save(),
+                "rooms": {name: self.save_state(name)
+                          for name in sorted(self._overlay)}}
+
+    def save_state(self, name):
+        """returns the changing part of a room, its door items and lock
+        and its fight flag, as overlays hold it
+        """
+        room = self.rooms[name]
+        state = {}
+        if room.door:
+            state["door"] = {"item": room.door["item"],
+                             "locked": room.door["locked"]}
+        if room.fight:
+            state["fight"] = {"fight": room.fight["fight"]}
+        return state
 
     def save(self):
         """Will save the Game class
         """
         return {
             "player": self.player.save(),
-            "rooms": {
-                name: room.save()
-                for name, room in self.rooms.items()},
-            "items": {
-                name: item.save()
-                for name, item in self.items.items()},
-            "npc": {
-                name: npc.save()
-                for name, npc in self.npc.items()},
+            "rooms": self.rooms.save(),
+            "items": self.items.save(),
+            "npc": self.npc.save(),
         }
 
 
+class LazyEntities(Mapping):
+    """Read-only mapping of names to entities built on first access
+
+    Entries that were never looked up stay in their loaded dictionary
+    form and are saved as they are. The loaded data is never copied, so
+    it may be any mapping, such as the rooms of a dork.worldfile.
+
+    Args:
+        data: mapping of name to loaded entity dictionary
+        entity_class: class built from a loaded dictionary
+    """
+    __slots__ = ("_data", "_entries", "_entity_class")
+
+    def __init__(self, data, entity_class):
+        self._data = data if data is not None else {}
+        self._entries = {}
+        self._entity_class = entity_class
+
+    def _build(self, _name, data):
+        return self._entity_class(data)
+
+    def __getitem__(self, name):
+        entity = self._entries.get(name)
+        if entity is None:
+            entity = self._build(name, self._data[name])
+            self._entries[name] = entity
+        return entity
+
+    def __contains__(self, name):
+        return name in self._data
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def hydrated(self):
+        """returns the number of entities built so far
+        """
+        return len(self._entries)
+
+    def built(self):
+        """yields (name, entity) for the entities built so far
+        """
+        return iter(list(self._entries.items()))
+
+    def loaded(self, name):
+        """returns the dictionary an entry was loaded from
+        """
+        return self._data[name]
+
+    def save(self):
+        """returns every entry as a dictionary, building none
+        """
+        return {name: self._entries[name].save() if name in self._entries
+                else data for name, data in self._data.items()}
+
+
+class LazyRooms(LazyEntities):
+    """LazyEntities building rooms as views of a World
+
+    Attributes:
+        world: dork.world.World over the loaded rooms
+    """
+    __slots__ = ("world",)
+
+    def __init__(self, data):
+        super().__init__(data, Room)
+        self.world = World(data)
+
+    def _build(self, name, data):
+        return Room(data, self.world, self.world.room_id(name))
+
+
+def _compact(value):
+    """interns strings, also inside lists, so equal names and texts are
+    stored once however many entities use them
+    """
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, list):
+        return [_compact(element) for element in value]
+    return value
+
+
+def _extras(keys, data):
+    """returns the entries of data whose keys are not in keys, compacted
+    """
+    return {key: _compact(value) for key, value in data.items()
+            if key not in keys}
+
+
+class _Record(Mapping):
+    """Dictionary-like part of an entity with a fixed set of keys
+
+    Values live in slots named after the keys, with spaces replaced by
+    underscores, instead of a dictionary per instance. Keys missing from
+    the data are left out of the record, as they would be from a dict.
+    Keys of the data not in KEYS are kept as they are in extras, read
+    only, and saved back.
+
+    Attributes:
+        KEYS: tuple of the keys a record can hold
+        FROZEN: True if item assignment is refused
+    """
+    __slots__ = ("_extras",)
+    KEYS = ()
+    FROZEN = False
+
+    def __init__(self, data):
+        for key in self.KEYS:
+            if key in data:
+                object.__setattr__(self, key.replace(" ", "_"),
+                                   _compact(data[key]))
+        extras = _extras(self.KEYS, data)
+        if extras:
+            object.__setattr__(self, "_extras", extras)
+
+    @property
+    def extras(self):
+        """dictionary of the keys of the data not in KEYS, empty if none
+        """
+        return getattr(self, "_extras", {})
+
+    def __getitem__(self, key):
+        if key not in self.KEYS:
+            return self.extras[key]
+        try:
+            return getattr(self, key.replace(" ", "_"))
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        if self.FROZEN or key not in self.KEYS:
+            raise TypeError(f"{type(self).__name__} does not support "
+                            f"setting {key}")
+        setattr(self, key.replace(" ", "_"), _compact(value))
+
+    def __iter__(self):
+        yield from (key for key in self.KEYS
+                    if hasattr(self, key.replace(" ", "_")))
+        yield from self.extras
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self)!r})"
+
+    def save(self):
+        """returns the record as a plain dictionary
+        """
+        return {key: self[key] for key in self}
+
+
+class _SharedRecord(_Record):
+    """Immutable record, equal records are one shared object
+    """
+    __slots__ = ("__weakref__",)
+    FROZEN = True
+    _shared = WeakValueDictionary()
+
+    def __new__(cls, data):
+        key = tuple(_compact(data.get(key, cls)) for key in cls.KEYS) +\
+            tuple(_extras(cls.KEYS, data).items())
+        try:
+            record = cls._shared.get(key)
+        except TypeError:
+            # unhashable extras, such as nested dictionaries, are not shared
+            key = record = None
+        if record is None:
+            record = super().__new__(cls)
+            _Record.__init__(record, data)
+            if key is not None:
+                cls._shared[key] = record
+        return record
+
+    def __init__(self, data):
+        """filled in once by __new__, shared records never change
+        """
+        super().__init__({})
+
+
+class Messages(_SharedRecord):
+    """Texts shown in a room, shared between rooms with the same texts
+    """
+    KEYS = ("description", "inspect", "unlock message")
+    __slots__ = tuple(key.replace(" ", "_") for key in KEYS)
+    _shared = WeakValueDictionary()
+
+
+class Paths(_SharedRecord):
+    """Names of the neighbouring rooms of a room per direction
+    """
+    KEYS = ("down", "left", "right", "up")
+    __slots__ = KEYS
+    _shared = WeakValueDictionary()
+
+
+class Door(_Record):
+    """Lock state and items of a room
+    """
+    KEYS = ("item", "locked", "unlock")
+    __slots__ = KEYS
+
+
+class Fight(_Record):
+    """Whether a room still holds an enemy to fight
+    """
+    KEYS = ("enemy", "fight")
+    __slots__ = KEYS
+
+
+def _record(record_class, data, *args):
+    """builds a record from a dictionary, anything else is kept as is
+    """
+    return record_class(data, *args) if isinstance(data, dict) else data
+
+
+def _save(record):
+    return record.save() if isinstance(record, _Record) else record
+
+
+class _WorldRecord(_Record):
+    """Record of a room whose ARRAYS keys live in a World
+
+    ARRAYS keys are only listed, and saved, if the loaded dictionary had
+    them or they were set since, as keys of a dict would be.
+
+    Args:
+        data: loaded dictionary, ARRAYS keys are read from the World
+        world: dork.world.World holding the room
+        room_id: integer id of the room in world
+    """
+    __slots__ = ("_world", "_id", "_arrays")
+    ARRAYS = {}
+
+    def __init__(self, data, world, room_id):
+        super().__init__({key: value for key, value in data.items()
+                          if key not in self.ARRAYS})
+        self._world = world
+        self._id = room_id
+        self._arrays = tuple(key for key in self.ARRAYS if key in data)
+
+    def __getitem__(self, key):
+        if key in self.ARRAYS:
+            return getattr(self._world, self.ARRAYS[key])[self._id] == 1
+        return super().__getitem__(key)
+
+    def __setitem__(self, key, value):
+        if key in self.ARRAYS:
+            getattr(self._world, self.ARRAYS[key])[self._id] = bool(value)
+            if key not in self._arrays:
+                self._arrays += (key,)
+        else:
+            super().__setitem__(key, value)
+
+    def __iter__(self):
+        yield from (key for key in self.KEYS if key in self._arrays or
+                    hasattr(self, key.replace(" ", "_")))
+        yield from self.extras
+
+
+class DoorView(_WorldRecord):
+    """Door of a room whose lock flag lives in a World
+    """
+    KEYS = Door.KEYS
+    ARRAYS = {"locked": "locked"}
+    __slots__ = ("item", "unlock")
+
+
+class FightView(_WorldRecord):
+    """Fight of a room whose flag lives in a World
+    """
+    KEYS = Fight.KEYS
+    ARRAYS = {"fight": "fight"}
+    __slots__ = ("enemy",)
+
+
+class PathsView(_Record):
+    """Paths of a room read from the paths array of a World
+
+    Only the directions the loaded dictionary had are listed and saved.
+
+    Args:
+        world: dork.world.World holding the room
+        room_id: integer id of the room in world
+        data: optional loaded dictionary, the directions are read from
+            the World and only its extras are kept
+    """
+    __slots__ = ("_world", "_id", "_keys")
+    KEYS = Paths.KEYS
+    FROZEN = True
+
+    def __init__(self, world, room_id, data=None):
+        data = data or {}
+        super().__init__({key: value for key, value in data.items()
+                          if key not in self.KEYS})
+        self._world = world
+        self._id = room_id
+        self._keys = tuple(key for key in self.KEYS if key in data)
+
+    def __getitem__(self, key):
+        if key not in self.KEYS:
+            return self.extras[key]
+        return self._world.path(self._world.names[self._id], key)
+
+    def __iter__(self):
+        yield from self._keys
+        yield from self.extras
+
+
+def _copy(kind, value):
+    """returns a copy of value as kind, None if value is None
+    """
+    return kind(value) if value is not None else None
+
+
 class Player():
     """ This is the player class
     """
+    __slots__ = ("position", "inventory", "stats")
+
     def __init__(self, data):
-        self.position = data.get('position')
-        self.inventory = data.get('inventory')
-        self.stats = data.get('stats')
+        self.position = _copy(dict, data.get('position'))
+        self.inventory = _copy(list, data.get('inventory'))
+        self.stats = _copy(dict, data.get('stats'))
 
     def save(self):
         """Will save the player class
@@ -235,30 +505,50 @@ class Player():
 
 class Room():
     """A room on map
-    """
 
-    def __init__(self, data):
-        self.messages = data.get('messages')
-        self.door = data.get('door')
-        self.fight = data.get('fight')
-        self.paths = data.get('paths')
+    Messages and paths are immutable and shared between equal rooms,
+    door and fight hold the state that changes during a game. Rooms of
+    a World are thin views: paths, the lock and the fight flag are read
+    from and written to its arrays.
+
+    Args:
+        data: loaded room dictionary
+        world: optional dork.world.World holding the room
+        room_id: integer id of the room in world
+    """
+    __slots__ = ("messages", "door", "fight", "paths")
+
+    def __init__(self, data, world=None, room_id=None):
+        self.messages = _record(Messages, data.get('messages'))
+        if world is None:
+            self.door = _record(Door, data.get('door'))
+            self.fight = _record(Fight, data.get('fight'))
+            self.paths = _record(Paths, data.get('paths'))
+            return
+        self.door = _record(DoorView, data.get('door'), world, room_id)
+        self.fight = _record(FightView, data.get('fight'), world, room_id)
+        paths = data.get('paths')
+        self.paths = PathsView(world, room_id,
+                               paths if isinstance(paths, dict) else None)
 
     def save(self):
         """Will save the room class
         """
         return {
-            'messages': self.messages,
-            'door': self.door,
-            'fight': self.fight,
-            'paths': self.paths,
+            'messages': _save(self.messages),
+            'door': _save(self.door),
+            'fight': _save(self.fight),
+            'paths': _save(self.paths),
         }
 
 
 class Item():
     """Item in game
     """
+    __slots__ = ("description", "damage")
+
     def __init__(self, data):
-        self.description = data.get('description')
+        self.description = _compact(data.get('description'))
         self.damage = data.get('damage')
 
     def save(self):
@@ -273,6 +563,8 @@ class Item():
 class Nonplayer():
     """Creates the NPC class
     """
+    __slots__ = ("health", "attack", "points")
+
     def __init__(self, data):
         self.health = data.get('health')
         self.attack = data.get('attack')
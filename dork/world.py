@@ -0,0 +1,122 @@
+"""Rooms compiled into parallel arrays indexed by integer room ids
+"""
+from array import array
+
+__all__ = ["DIRECTIONS", "NO_ROOM", "NO_NAME", "World"]
+
+DIRECTIONS = ("up", "down", "left", "right")
+
+NO_ROOM, NO_NAME, UNFILLED = -1, -2, -3
+
+_EMPTY = {NO_ROOM: "", NO_NAME: None}
+
+
+class World():
+    """Struct-of-arrays store of the room state movement depends on
+
+    Room names are interned to integer ids in the order rooms are first
+    looked up. Every room owns one row of DIRECTIONS in paths, holding
+    the id of the neighbouring room, NO_ROOM for '' or NO_NAME for None,
+    and one byte in locked and fight. Ids and flags are assigned on first
+    lookup and a row of paths on first step out of the room, so building
+    a World is free and compile is only needed for queries over all
+    rooms.
+
+    Attributes:
+        names: list of room names indexed by room id
+        ids: dictionary of room name to room id
+        paths: array of 4 * len(names) room ids, row major
+        locked: bytearray, 1 where the door of the room is locked
+        fight: bytearray, 1 where an enemy waits in the room
+
+    Args:
+        rooms: mapping of room name to loaded room dictionary
+    """
+
+    def __init__(self, rooms):
+        self._rooms = rooms
+        self.names = []
+        self.ids = {}
+        self.paths = array("l")
+        self.locked = bytearray()
+        self.fight = bytearray()
+
+    def __len__(self):
+        return len(self._rooms)
+
+    def room_id(self, name):
+        """returns the id of a room, assigning one on first lookup
+
+        Raises:
+            KeyError: there is no room with that name
+        """
+        room_id = self.ids.get(name)
+        if room_id is None:
+            data = self._rooms[name]
+            room_id = len(self.names)
+            self.names.append(name)
+            self.ids[name] = room_id
+            self.paths.extend([UNFILLED] * len(DIRECTIONS))
+            self.locked.append(bool((data.get("door") or {}).get("locked")))
+            self.fight.append(bool((data.get("fight") or {}).get("fight")))
+        return room_id
+
+    def _row(self, room_id):
+        """returns the offset of the paths row of a room, filling it
+        """
+        offset = room_id * len(DIRECTIONS)
+        if self.paths[offset] == UNFILLED:
+            paths = self._rooms[self.names[room_id]].get("paths") or {}
+            for index, way in enumerate(DIRECTIONS):
+                name = paths.get(way, "")
+                self.paths[offset + index] = NO_NAME if name is None else\
+                    NO_ROOM if name == "" else self.room_id(name)
+        return offset
+
+    def step(self, room_id, way):
+        """returns the id of the room next to room_id in direction way,
+        NO_ROOM or NO_NAME if there is none
+        """
+        return self.paths[self._row(room_id) + DIRECTIONS.index(way)]
+
+    def path(self, name, way):
+        """returns the name of the room next to name in direction way
+
+        Returns:
+            string room name, or the empty value the room was loaded with
+        """
+        next_id = self.step(self.room_id(name), way)
+        return _EMPTY[next_id] if next_id < 0 else self.names[next_id]
+
+    def is_locked(self, name):
+        """returns True if the door of the room is locked
+        """
+        return self.locked[self.room_id(name)] == 1
+
+    def has_fight(self, name):
+        """returns True if an enemy waits in the room
+        """
+        return self.fight[self.room_id(name)] == 1
+
+    def compile(self):
+        """assigns every room an id and fills every row of paths
+
+        Returns:
+            self
+        """
+        for name in self._rooms:
+            self._row(self.room_id(name))
+        return self
+
+    def rooms_where(self, flags):
+        """returns the names of all rooms with a flag set
+
+        Args:
+            flags: locked or fight
+
+        Returns:
+            list of room names
+        """
+        self.compile()
+        return [self.names[room_id]
+                for room_id, flag in enumerate(flags) if flag]
@@ -0,0 +1,302 @@
+"""Random-access world files for dork, read through mmap
+"""
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from collections.abc import Mapping
+
+from dork import binary
+from dork.binary import (ABSENT, FALSE, MISSING, NONE, NULL, PRESENT,
+                         ROOM_PARTS, TRUE)
+
+__all__ = ["MAGIC", "VERSION", "WorldFile", "is_world_file", "write_world"]
+
+MAGIC = b"DORKWLD\0"
+VERSION = 1
+
+_HEADER = struct.Struct("<8sHHIQQQ32s")
+_FIELDS = sum(len(keys) for _, keys in ROOM_PARTS)
+_RECORD = struct.Struct(f"<q{_FIELDS}qQ")
+_ENTRY = struct.Struct("<BI")
+_REF = struct.Struct("<q")
+
+_STRING, _LIST = range(2)
+
+_CONSTANTS = {NONE: None, FALSE: False, TRUE: True}
+
+_NO_PART = object()
+
+
+class _Heap():
+    """String heap of a world file being written, each string once
+
+    Args:
+        file: file opened for binary writing, at the start of the heap
+    """
+
+    def __init__(self, file):
+        self._file = file
+        self._strings = {}
+        self.size = 0
+
+    def _entry(self, tag, count, payload):
+        ref = self.size
+        self._file.write(_ENTRY.pack(tag, count))
+        self._file.write(payload)
+        self.size += _ENTRY.size + len(payload)
+        return ref
+
+    def string(self, value):
+        """returns the ref of a string, writing it on first use
+        """
+        ref = self._strings.get(value)
+        if ref is None:
+            encoded = value.encode("utf-8", "surrogatepass")
+            ref = self._strings[value] = self._entry(_STRING, len(encoded),
+                                                     encoded)
+        return ref
+
+    def value(self, value):
+        """returns the ref of a string, list, None or boolean
+
+        Raises:
+            ValueError: value is of any other type
+        """
+        if value is None:
+            return NONE
+        if isinstance(value, bool):
+            return TRUE if value else FALSE
+        if isinstance(value, str):
+            return self.string(value)
+        if isinstance(value, list):
+            if any(isinstance(element, list) for element in value):
+                raise ValueError("world files cannot store nested lists")
+            refs = [self.value(element) for element in value]
+            return self._entry(_LIST, len(refs),
+                               struct.pack(f"<{len(refs)}q", *refs))
+        raise ValueError(f"cannot store {type(value).__name__} "
+                         f"in a world file room")
+
+
+def _record(name, room, heap):
+    """writes the strings of a room to the heap
+
+    Returns:
+        tuple of the room's index record, see _RECORD
+    """
+    if not isinstance(room, dict) or\
+       set(room).difference(part for part, _ in ROOM_PARTS):
+        raise ValueError(f"no world file form for room {name}")
+    refs = [heap.string(name)]
+    flags = 0
+    for shift, (part, keys) in enumerate(ROOM_PARTS):
+        record = room.get(part, _NO_PART)
+        state = ABSENT if record is _NO_PART else\
+            NULL if record is None else PRESENT
+        if state == PRESENT and (not isinstance(record, dict) or
+                                 set(record).difference(keys)):
+            raise ValueError(f"no world file form for {part} of {name}")
+        flags |= state << (2 * shift)
+        for key in keys:
+            if state != PRESENT or key not in record:
+                refs.append(MISSING)
+            else:
+                refs.append(heap.value(record[key]))
+    return (*refs, flags)
+
+
+def write_world(data, file_name):
+    """writes game data as a world file
+
+    The header holds MAGIC, VERSION, the number of rooms, the offsets of
+    the string heap and of the rest of the data, and the sha256 digest
+    of everything after the header. It is followed by the room index,
+    one fixed-size record per room sorted by name, holding heap refs of
+    the name and of every key of ROOM_PARTS. Everything but the rooms is
+    stored at the end in the format of dork.binary. The file is written
+    next to file_name and moved in place once complete.
+
+    Args:
+        data: dictionary of game data
+        file_name: path of the world file
+
+    Raises:
+        ValueError: data holds something the format cannot store
+    """
+    rooms = data.get("rooms") or {}
+    if any(not isinstance(name, str) for name in rooms):
+        raise ValueError("world files need string room names")
+    names = sorted(rooms)
+    heap_offset = _HEADER.size + len(names) * _RECORD.size
+    temp_name = file_name + ".tmp"
+    try:
+        with open(temp_name, "w+b") as file:
+            file.seek(heap_offset)
+            heap = _Heap(file)
+            records = [_RECORD.pack(*_record(name, rooms[name], heap))
+                       for name in names]
+            rest_offset = heap_offset + heap.size
+            file.write(binary.dumps({key: value for key, value
+                                     in data.items() if key != "rooms"}))
+            file.seek(_HEADER.size)
+            file.write(b"".join(records))
+            file.seek(_HEADER.size)
+            digest = hashlib.sha256()
+            for block in iter(lambda: file.read(1 << 16), b""):
+                digest.update(block)
+            file.seek(0)
+            file.write(_HEADER.pack(MAGIC, VERSION, "rooms" in data, 0,
+                                    len(names), heap_offset, rest_offset,
+                                    digest.digest()))
+        os.replace(temp_name, file_name)
+    finally:
+        if os.path.exists(temp_name):
+            os.remove(temp_name)
+
+
+def is_world_file(file_name):
+    """returns True if a file starts like a world file
+    """
+    with open(file_name, "rb") as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+
+class WorldFile(Mapping):
+    """Rooms of a world file, mapped into memory and decoded on lookup
+
+    Looking up a room binary searches the index and reads the heap
+    entries of that room only, so opening a world of any size is
+    immediate and only the pages of visited rooms are ever read. Decoded
+    rooms are kept, so changes made to them by overlays and delta
+    records stick.
+
+    Attributes:
+        digest: sha256 hex digest of the file after its header
+
+    Args:
+        file_name: path of the world file
+
+    Raises:
+        ValueError: the file is not a world file, or one of a later version
+    """
+
+    def __init__(self, file_name):
+        with open(file_name, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < _HEADER.size or\
+           self._map[:len(MAGIC)] != MAGIC:
+            self._map.close()
+            raise ValueError(f"{file_name} is not a world file")
+        (_, version, has_rooms, _, self._count, self._heap, self._rest,
+         digest) = _HEADER.unpack_from(self._map)
+        if version > VERSION:
+            self._map.close()
+            raise ValueError(f"world file version {version} is newer "
+                             f"than {VERSION}")
+        self._has_rooms = bool(has_rooms)
+        self.digest = digest.hex()
+        self._rooms = {}
+
+    def _value(self, ref):
+        """decodes the heap entry at ref, or the constant ref stands for
+        """
+        if ref < 0:
+            return _CONSTANTS[ref]
+        offset = self._heap + ref
+        tag, count = _ENTRY.unpack_from(self._map, offset)
+        offset += _ENTRY.size
+        if tag == _STRING:
+            return sys.intern(self._map[offset:offset + count]
+                              .decode("utf-8", "surrogatepass"))
+        return [self._value(ref) for ref in
+                struct.unpack_from(f"<{count}q", self._map, offset)]
+
+    def _record(self, index):
+        return _RECORD.unpack_from(self._map, _HEADER.size +
+                                   index * _RECORD.size)
+
+    def _name(self, index):
+        (ref,) = _REF.unpack_from(self._map, _HEADER.size +
+                                  index * _RECORD.size)
+        return self._value(ref)
+
+    def _find(self, name):
+        """returns the index of a room by binary search, None if missing
+        """
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._name(middle) < name:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._count and self._name(low) == name:
+            return low
+        return None
+
+    def _decode(self, index):
+        """returns the room dictionary of an index record
+        """
+        _, *refs, flags = self._record(index)
+        room = {}
+        column = 0
+        for shift, (part, keys) in enumerate(ROOM_PARTS):
+            state = (flags >> (2 * shift)) & 3
+            if state == PRESENT:
+                room[part] = {key: self._value(ref) for key, ref
+                              in zip(keys, refs[column:column + len(keys)])
+                              if ref != MISSING}
+            elif state == NULL:
+                room[part] = None
+            column += len(keys)
+        return room
+
+    def __getitem__(self, name):
+        room = self._rooms.get(name)
+        if room is None:
+            index = self._find(name) if isinstance(name, str) else None
+            if index is None:
+                raise KeyError(name)
+            room = self._rooms[name] = self._decode(index)
+        return room
+
+    def __contains__(self, name):
+        return name in self._rooms or\
+            (isinstance(name, str) and self._find(name) is not None)
+
+    def __iter__(self):
+        return (self._name(index) for index in range(self._count))
+
+    def __len__(self):
+        return self._count
+
+    def decoded(self):
+        """returns the number of rooms decoded so far
+        """
+        return len(self._rooms)
+
+    def update(self, rooms):
+        """replaces rooms, as delta records do
+
+        Raises:
+            KeyError: a room is not in the world file
+        """
+        for name, room in rooms.items():
+            if name not in self:
+                raise KeyError(name)
+            self._rooms[name] = room
+
+    def data(self):
+        """returns the game data of the file, with this mapping as rooms
+        """
+        data = binary.loads(self._map[self._rest:])
+        if self._has_rooms:
+            data["rooms"] = self
+        return data
+
+    def close(self):
+        """unmaps the file
+        """
+        self._map.close()
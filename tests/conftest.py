@@ -36,6 +36,15 @@ def noop_args(*_):
     """
 
 
+@pytest.fixture(autouse=True)
+def world_store(monkeypatch, tmp_path):
+    """fixture that keeps stored worlds and the database out of the
+    repository
+    """
+    monkeypatch.setenv("DORK_STORE", str(tmp_path / "store"))
+    monkeypatch.setenv("DORK_DATABASE", str(tmp_path / "dork.db"))
+
+
 @pytest.fixture(autouse=True)
 def maptype(monkeypatch):
     """fixture that prevents Map from drawing a plot
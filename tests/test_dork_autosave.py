@@ -0,0 +1,71 @@
+"""Tests for dork.autosave
+"""
+import datetime
+import os
+import dork.cli
+import dork.saveload
+from dork import types
+from dork.autosave import AutoSave, slot_name
+
+
+def test_autosave_slots(tmp_path):
+    """autosaves should rotate through their slots in the background
+    """
+    assert slot_name("yml/autosave.yml.gz", 2) == "yml/autosave.2.yml.gz"
+    game = types.Game(dork.saveload.load_file('./dork/yaml/default.yml'),
+                      map_backend="none")
+    save_name = str(tmp_path / "autosave.yml")
+    autosave = AutoSave(game, save_name, slots=2, every=2)
+    autosave.tick()
+    autosave.tick()
+    game.player.inventory.append("key")
+    autosave.close()
+    assert "key" not in types.Game(dork.saveload.load_file(
+        slot_name(save_name, 1))).player.inventory,\
+        "the snapshot is taken when the autosave is requested"
+    assert not os.path.exists(slot_name(save_name, 2))
+
+    autosave = AutoSave(game, save_name, slots=2, every=1)
+    autosave.tick()
+    autosave.close()
+    assert autosave.latest() == 2
+    saved = types.Game(dork.saveload.load_file(slot_name(save_name, 2)))
+    assert saved.save() == game.save()
+
+    autosave = AutoSave(game, str(tmp_path / "missing" / "autosave.yml"),
+                        every=1)
+    autosave.tick()
+    autosave.close()
+    assert isinstance(autosave.error, OSError), "errors are kept, not raised"
+
+    game.player.stats["born"] = datetime.date(2019, 4, 1)
+    autosave = AutoSave(game, save_name, slots=2, every=1)
+    autosave.tick()
+    autosave.close()
+    assert autosave.error is None, "dates are snapshotted too"
+    assert types.Game(dork.saveload.load_file(slot_name(
+        save_name, autosave.latest()))).player.stats["born"] ==\
+        datetime.date(2019, 4, 1)
+
+
+def test_prompt_autosave(run, monkeypatch, tmp_path):
+    """the prompt should autosave every few commands
+    """
+    save_name = str(tmp_path / "autosave.yml")
+    monkeypatch.setenv("DORK_AUTOSAVE", save_name)
+    monkeypatch.setenv("DORK_AUTOSAVE_EVERY", "2")
+    game = types.Game(dork.saveload.load_file('./dork/yaml/default.yml'),
+                      map_backend="none")
+    run(dork.cli.prompt, game,
+        input_values=["inspect room", "take key", "quit"])
+    saved = types.Game(dork.saveload.load_file(slot_name(save_name, 1)))
+    assert "key" in saved.player.inventory
+    assert dork.cli.the_predork_cli([], "", "-a", save_name) ==\
+        (False, False, {"autosave": save_name})
+
+    monkeypatch.delenv("DORK_AUTOSAVE")
+    save_name = str(tmp_path / "named.yml")
+    run(dork.cli.prompt, game, None, save_name,
+        input_values=["inspect room", "inspect room", "quit"])
+    assert os.path.exists(slot_name(save_name, 1)),\
+        "autosaves can be named without the environment"
@@ -0,0 +1,49 @@
+"""Tests for dork.binary
+"""
+import yaml
+from dork import binary
+
+
+def default_data():
+    """the loaded default world
+    """
+    with open('./dork/yaml/default.yml') as file:
+        return yaml.safe_load(file.read())
+
+
+def test_binary_round_trip():
+    """worlds should read back as they were written
+    """
+    data = default_data()
+    saved = binary.dumps(data)
+    assert binary.is_binary(saved), "saves start with the magic bytes"
+    assert binary.loads(saved) == data
+    assert len(saved) < len(yaml.safe_dump(data)), "strings are stored once"
+
+    partial = {"base": "ab", "player": {"stats": {"health": 40, "x": 1.5}},
+               "rooms": {"a": {"door": {"item": ["key"]},
+                               "fight": {"fight": True}},
+                         "b": {"messages": None, "paths": {"up": "a"}},
+                         "c": {}}}
+    assert binary.loads(binary.dumps(partial)) == partial,\
+        "overlays and rooms lacking parts keep their shape"
+
+
+def test_binary_errors():
+    """what the format cannot hold should be refused
+    """
+    for data in ({"rooms": {"a": {"door": {"locked": 1}}}},
+                 {"rooms": {"a": {"attic": {}}}},
+                 {"player": {"points": 2 ** 70}}):
+        try:
+            binary.dumps(data)
+            assert False, f"{data} has no binary form"
+        except ValueError:
+            pass
+    saved = binary.dumps(default_data())
+    for broken in (saved[:-1], b"not a save", saved[:8] + b"\xff" + saved[9:]):
+        try:
+            binary.loads(broken)
+            assert False, "broken saves cannot load"
+        except ValueError:
+            pass
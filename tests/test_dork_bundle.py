@@ -0,0 +1,58 @@
+"""Tests for dork.bundle
+"""
+import yaml
+import dork.saveload
+from dork import types
+from dork.bundle import load_bundle, merge
+
+
+def _write(path, data):
+    with open(path, "w") as file:
+        yaml.safe_dump(data, file)
+
+
+def test_bundle_loading(tmp_path, capsys):
+    """a bundle of region files should load as the world they split
+    """
+    world = dork.saveload.load_file('./dork/yaml/default.yml')
+    del world["base"]
+    bundle = tmp_path / "jail.bundle"
+    bundle.mkdir()
+    names = sorted(world["rooms"])
+    _write(bundle / "north.yml",
+           {"rooms": {name: world["rooms"][name] for name in names[:4]},
+            "items": world["items"]})
+    _write(bundle / "south.yml",
+           {"rooms": {name: world["rooms"][name] for name in names[4:]},
+            "npc": world["npc"]})
+    _write(bundle / "manifest.yml",
+           {"regions": {"north": "north.yml", "south": "south.yml"},
+            "player": world["player"]})
+
+    data = dork.saveload.load_file(str(bundle))
+    assert capsys.readouterr().out == "", "a clean split has no conflicts"
+    assert {key: data[key] for key in world} == world
+    game = types.Game(data, map_backend="none")
+    assert game.base == data["base"]
+    assert game.save_overlay()["base"] == data["base"]
+    assert load_bundle(str(bundle), max_workers=1)["base"] == data["base"]
+
+
+def test_bundle_conflicts():
+    """merging should resolve paths across regions and report conflicts
+    """
+    regions = [
+        ("east", {"rooms": {"gate": {"paths": {"left": "west/hall",
+                                               "right": "moat"}}},
+                  "items": {"key": {"damage": 0}},
+                  "player": {"position": {"location": "gate"}}}),
+        ("west", {"rooms": {"hall": {"paths": {"right": "gate"}},
+                            "gate": {"paths": {}}},
+                  "items": {"key": {"damage": 1}},
+                  "player": {"position": {"location": "hall"}}}),
+    ]
+    data, conflicts = merge(regions)
+    assert data["rooms"]["gate"]["paths"] == {"left": "hall", "right": ""}
+    assert data["rooms"]["hall"]["paths"] == {"right": "gate"}
+    assert data["player"]["position"]["location"] == "gate"
+    assert len(conflicts) == 4, "player, gate, key and the moat path"
@@ -0,0 +1,60 @@
+"""Tests for dork.catalog
+"""
+import os
+import shutil
+import dork.catalog
+import dork.saveload
+from dork import types
+from dork.catalog import INDEX_SUFFIX, Catalog, index_file
+
+
+def test_catalog_entries(tmp_path):
+    """the catalog should describe every world and save in a directory
+    """
+    tmp_path = tmp_path / "games"
+    tmp_path.mkdir()
+    shutil.copy('./dork/yaml/default.yml', tmp_path / "world.yml")
+    game = types.Game(dork.saveload.load_file(str(tmp_path / "world.yml")),
+                      map_backend="none")
+    game.player.position["location"] = "Jail hallway"
+    (tmp_path / "saves").mkdir()
+    dork.saveload.write(game, str(tmp_path / "saves" / "overlay.dork"))
+    (tmp_path / "broken.yml").write_text("player: [")
+    (tmp_path / "notes.txt").write_text("not a save")
+
+    catalog = Catalog(str(tmp_path)).refresh()
+    assert catalog.names() == ["broken.yml", "saves/overlay.dork",
+                               "world.yml"]
+    world = catalog.entries["world.yml"]
+    assert (world["rooms"], world["location"]) == (8, "cell")
+    assert world["size"] == os.path.getsize(tmp_path / "world.yml")
+    overlay = catalog.entries["saves/overlay.dork"]
+    assert (overlay["rooms"], overlay["location"]) == (8, "Jail hallway"),\
+        "overlay saves count the rooms of their base world"
+    assert catalog.entries["broken.yml"]["rooms"] is None
+    assert "world.yml  8 rooms  at cell" in catalog.lines()[2]
+
+
+def test_catalog_refresh(tmp_path, mocker):
+    """refreshing should only parse files that changed since the index
+    """
+    shutil.copy('./dork/yaml/default.yml', tmp_path / "one.yml")
+    shutil.copy('./dork/yaml/default.yml', tmp_path / "two.yml")
+    Catalog(str(tmp_path)).refresh()
+    assert os.path.exists(index_file(str(tmp_path)))
+    assert not any(name.endswith(INDEX_SUFFIX)
+                   for name in os.listdir(tmp_path)),\
+        "the index is kept out of the listed directory"
+
+    describe = mocker.spy(dork.catalog, "describe")
+    catalog = Catalog(str(tmp_path)).refresh()
+    assert describe.call_count == 0, "unchanged files come from the index"
+    assert "one.yml" in catalog
+
+    with open(tmp_path / "two.yml", "a") as file:
+        file.write("\n")
+    os.remove(tmp_path / "one.yml")
+    catalog = Catalog(str(tmp_path)).refresh()
+    assert describe.call_count == 1
+    assert catalog.names() == ["two.yml"]
+    assert Catalog(str(tmp_path / "missing")).refresh().names() == []
@@ -277,6 +277,28 @@ def test_pre_cli_generation(run):
         .format(err=err)
 
 
+def test_pre_cli_map(run, monkeypatch):
+    """map option should pick the minimap backend and then run dork
+    """
+    monkeypatch.setenv("DORK_MAP", "matplotlib")
+    flags = dork.cli.the_predork_cli([], *("", "-m", "terminal"))
+    assert flags == (False, False, {"map": "terminal"}),\
+        "map option should select the backend and start the game"
+    assert dork.cli.os.environ["DORK_MAP"] == "matplotlib",\
+        "map option should leave the environment alone"
+    out, _ = run(dork.cli.the_predork_cli, [], *("", "-m", "paper"))
+    assert "does not exist" in out, "unknown backends should be refused"
+
+    monkeypatch.setenv("DORK_MAP_WORKER", "thread")
+    flags = dork.cli.the_predork_cli([], *("", "-w", "process"))
+    assert flags == (False, False, {"map_worker": "process"}),\
+        "map worker option should select the worker and start the game"
+    assert dork.cli.os.environ["DORK_MAP_WORKER"] == "thread",\
+        "map worker option should leave the environment alone"
+    out, _ = run(dork.cli.the_predork_cli, [], *("", "-w", "fiber"))
+    assert "does not exist" in out, "unknown workers should be refused"
+
+
 def test_title_screen(run, mocker):
     """Tests for title screen
     """
@@ -296,6 +318,9 @@ def test_setup_game(run, mocker):
     mocked_game_state = mocker.patch('dork.saveload.game_state')
     run(dork.cli.setup_game)
     assert mocked_game_state.call_count == 1
+    run(dork.cli.setup_game, {"map": "none", "map_worker": "thread"})
+    assert mocked_game_state.call_args[0] == ("none", "thread"),\
+        "settings should pick the map backend and worker"
 
 
 def test_load_game(run, mocker):
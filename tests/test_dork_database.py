@@ -0,0 +1,69 @@
+"""Tests for dork.database
+"""
+import yaml
+from dork.database import Database
+
+
+def default_data():
+    """the loaded default world
+    """
+    with open('./dork/yaml/default.yml') as file:
+        return yaml.safe_load(file.read())
+
+
+def test_database_worlds(tmp_path):
+    """worlds should read back row by row as they were stored
+    """
+    data = default_data()
+    database = Database(str(tmp_path / "dork.db"))
+    base = database.add_world("default", data)
+    assert database.query("PRAGMA journal_mode")[0][0] == "wal"
+    assert database.worlds() == ["default"]
+    assert database.world_named(base) == "default"
+    assert database.add_world("default", data) == base, "stable digests"
+    assert database.worlds() == ["default"], "worlds are replaced"
+
+    world = database.world("default")
+    rooms = world["rooms"]
+    assert world["player"] == data["player"] and world["base"] == base
+    assert rooms["cell"] == data["rooms"]["cell"] and rooms.decoded() == 1
+    assert "cell" in rooms and "attic" not in rooms
+    assert len(rooms) == len(data["rooms"])
+    assert list(rooms) == sorted(data["rooms"])
+    assert dict(world["items"]) == data["items"]
+    try:
+        database.world("attic")
+        assert False, "missing worlds are missing"
+    except KeyError:
+        pass
+    database.close()
+
+
+def test_database_saves(tmp_path):
+    """saves should keep the player and the rooms of an overlay
+    """
+    database = Database(str(tmp_path / "dork.db"))
+    base = database.add_world("default", default_data())
+    overlay = {"base": base, "player": {"inventory": ["key"]},
+               "rooms": {"cell": {"door": {"item": [], "locked": False}}}}
+    database.add_save("first", overlay)
+    database.add_save("first", overlay)
+    assert database.saves() == ["first"], "saves are replaced"
+    database.add_world("default", default_data())
+    assert database.saves() == ["first"], "replacing a world keeps saves"
+    other = default_data()
+    other["rooms"]["cell"]["door"]["locked"] = True
+    try:
+        database.add_world("default", other)
+        assert False, "worlds with saves keep their content"
+    except ValueError:
+        pass
+    assert database.world("default")["base"] == base
+    assert database.save("first")["world"] == "default"
+    assert database.save("first") == dict(overlay, world="default")
+    try:
+        database.add_save("lost", dict(overlay, base="0" * 64))
+        assert False, "saves need a stored world"
+    except KeyError:
+        pass
+    database.close()
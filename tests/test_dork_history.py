@@ -0,0 +1,78 @@
+"""Tests for dork.history
+"""
+import yaml
+import dork.cli
+from dork.types import Game
+
+
+def default_game():
+    """game of the default world without a drawn map
+    """
+    with open('./dork/yaml/default.yml') as file:
+        return Game(yaml.safe_load(file.read()), map_backend="none")
+
+
+def test_undo_redo():
+    """undo and redo should walk the versions of a game
+    """
+    game = default_game()
+    history = game.history
+    start = game.save()
+    assert history.commit() is history.versions[0], "nothing changed yet"
+
+    game.player.inventory.append("key")
+    game.rooms["cell"].door["item"].remove("key")
+    taken = history.commit()
+    assert set(taken.rooms) == {"cell"}, "versions hold what changed"
+
+    game.player.position["location"] = "Jail hallway"
+    game.rooms["Jail hallway"].door["locked"] = False
+    moved = history.commit()
+    assert set(moved.rooms) == {"Jail hallway"}, "cell is shared"
+
+    assert history.undo() and history.head is taken
+    assert game.rooms["Jail hallway"].door["locked"] is True
+    assert game.player.position["location"] == "cell"
+    assert history.undo() and game.save() == start, "back to the start"
+    assert not history.undo(), "nothing before the first version"
+
+    assert history.redo() and history.redo() and history.head is moved
+    assert not game.rooms["Jail hallway"].door["locked"]
+    assert not history.redo(), "nothing left to redo"
+
+    history.undo()
+    game.player.stats["health"] -= 5
+    branch = history.commit()
+    assert branch.parent is taken and not history.redo(),\
+        "a new command starts a branch"
+    history.checkout(moved.number)
+    assert game.player.stats["health"] == start["player"]["stats"]["health"]
+    assert not game.rooms["Jail hallway"].door["locked"], "other branch"
+
+
+def test_fork():
+    """forks should not share state with the game they came from
+    """
+    game = default_game()
+    game.player.inventory.append("key")
+    game.rooms["cell"].door["item"].remove("key")
+    game.history.commit()
+
+    fork = game.history.fork()
+    assert fork.save() == game.save(), "forks start where the game is"
+    fork.player.inventory.clear()
+    fork.rooms["cell"].fight["fight"] = True
+    assert game.player.inventory == ["key"], "players are separate"
+    assert not game.rooms["cell"].fight["fight"], "rooms are separate"
+    assert game.history.fork(0).save()["player"]["inventory"] == [],\
+        "forks can start from any version"
+
+
+def test_undo_command(run):
+    """undo and redo should be commands of the prompt
+    """
+    game = default_game()
+    out, _ = run(dork.cli.prompt, game,
+                 input_values=["undo", "take key", "undo", "redo", "quit"])
+    assert "nothing to undo" in out, "nothing to undo before a command"
+    assert "back in the cell" in out and game.player.inventory == ["key"]
@@ -0,0 +1,59 @@
+"""Tests for dork.journal
+"""
+import os
+import dork.cli
+import dork.saveload
+from dork import types
+from dork.journal import Journal, recover
+
+
+def test_journal_recovery(tmp_path):
+    """recovery should replay the journal onto the last snapshot
+    """
+    game = types.Game(dork.saveload.load_file('./dork/yaml/default.yml'),
+                      map_backend="none")
+    journal_name = str(tmp_path / "game.journal")
+    journal = Journal(game, journal_name, snapshot_every=2)
+    assert journal.record() is None, "nothing changed, nothing recorded"
+
+    game.player.position["location"] = "Jail hallway"
+    game.touch()
+    assert journal.record() == {"player": game.player.save(), "rooms": {}}
+    game.rooms["cell"].door["item"].remove("key")
+    game.player.inventory.append("key")
+    game.touch("cell")
+    assert set(journal.record()["rooms"]) == {"cell"}
+    game.rooms["Jail hallway"].door["locked"] = False
+    game.touch("Jail hallway")
+    journal.record()
+    journal.close()
+    assert len(os.listdir(tmp_path)) <= 4, "finished segments are folded"
+    assert types.Game(recover(journal_name)).save() == game.save()
+
+    with open(journal_name + ".00000001.log", "a") as file:
+        file.write('{"player": {"inven')
+    assert types.Game(recover(journal_name)).save() == game.save(),\
+        "a torn last record is ignored"
+
+
+def test_prompt_journal(run, monkeypatch, tmp_path):
+    """the prompt should journal every command that changes the game
+    """
+    journal_name = str(tmp_path / "game.journal")
+    monkeypatch.setenv("DORK_JOURNAL", journal_name)
+    game = types.Game(dork.saveload.load_file('./dork/yaml/default.yml'),
+                      map_backend="none")
+    run(dork.cli.prompt, game,
+        input_values=["inspect room", "take key", "quit"])
+    recovered = types.Game(dork.saveload.load_file(journal_name))
+    assert "key" in recovered.player.inventory, "moves are recovered"
+    assert dork.cli.the_predork_cli([], "", "-j", journal_name) ==\
+        (False, False, {"journal": journal_name})
+
+    monkeypatch.delenv("DORK_JOURNAL")
+    journal_name = str(tmp_path / "named.journal")
+    run(dork.cli.prompt, game, journal_name,
+        input_values=["drop", "key", "quit"])
+    recovered = types.Game(dork.saveload.load_file(journal_name))
+    assert "key" not in recovered.player.inventory,\
+        "journals can be named without the environment"
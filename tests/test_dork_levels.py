@@ -0,0 +1,50 @@
+"""Tests for dork.levels
+"""
+import random
+import networkx as nx
+import pytest
+from dork.maze import Maze
+from dork.levels import MultiLevelMaze
+
+
+def test_maze_multi_level():
+    """tests multi-level maze generation and paths across floors
+    """
+    random.seed(26)
+    maze = MultiLevelMaze(width=6, height=6, depth=3, max_workers=1)
+
+    assert len(maze.floors) == 3, "maze should have three floors"
+    assert maze.size() == 108, "maze should have 6*6*3 nodes"
+    assert maze.location(maze.node_id(2, 3, 1)) == (2, 3, 1),\
+        "3D node ids should decompose into their coordinates"
+    assert all(maze.stairs[z] for z in range(0, 2)),\
+        "every pair of floors should be connected by a stair"
+
+    maze.claim_area("cell", Maze.Area(x=0, y=0, width=2, height=2), floor=0)
+    maze.claim_area("roof", Maze.Area(x=3, y=3, width=2, height=2), floor=2)
+    with pytest.raises(KeyError, match="already used"):
+        maze.claim_area("cell", Maze.Area(x=3, y=3, width=2, height=2),
+                        floor=1)
+    with pytest.raises(ValueError, match="floor 1"):
+        maze.claim_area("hall", Maze.Area(x=0, y=0, width=6, height=6),
+                        floor=1)
+    assert "hall" not in maze.areas, "refused areas are not claimed"
+
+    path = maze.get_path("cell", "right", "roof", "left")
+    assert path[0][0] == "cell" and path[-1][0] == "roof",\
+        "path should start at cell and end at roof"
+    nodes = path[1:-1]
+    assert maze.location(nodes[0])[2] == 0, "path should start on floor 0"
+    assert maze.location(nodes[-1])[2] == 2, "path should end on floor 2"
+    for node, next_node in zip(nodes, nodes[1:]):
+        assert next_node in maze.neighbors(node),\
+            "path should only step between neighbouring nodes"
+
+
+def test_maze_multi_level_parallel():
+    """floors generated in worker processes should be independent mazes
+    """
+    maze = MultiLevelMaze(width=5, height=5, depth=2, max_workers=2)
+    for floor in maze.floors:
+        assert nx.is_strongly_connected(floor.graph),\
+            "generated floors should be fully connected"
@@ -166,6 +166,36 @@ def test_maze_claim_area():
     assert "hallway" in maze.areas, f"hallway was not found in maze"
 
 
+def test_maze_claim_areas():
+    """claiming areas at once should keep the free nodes connected
+    """
+    maze = Maze(width=12, height=12)
+    maze.claim_area("room", Maze.Area(x=0, y=0, width=2, height=2))
+    maze.claim_areas({
+        "hall": Maze.Area(x=3, y=1, width=5, height=2),
+        "cell": Maze.Area(x=1, y=5, width=2, height=6),
+        "vault": Maze.Area(x=6, y=6, width=4, height=4)})
+    assert set(maze.areas) == {"room", "hall", "cell", "vault"},\
+        "every area should be claimed"
+
+    inside = {node.id for area in maze.areas.values()
+              for node in maze._get_area_nodes(area)}
+    free = maze.graph.subgraph(set(maze.graph.nodes()) - inside)
+    assert nx.is_strongly_connected(free), "free nodes should stay connected"
+    assert not any(maze.graph.has_edge(u, v) for u in inside
+                   for v in free.nodes()), "areas should be islands"
+
+    for name, area, error in [
+            ("hall", Maze.Area(x=9, y=0, width=1, height=1), KeyError),
+            ("wide", Maze.Area(x=9, y=0, width=5, height=1), ValueError),
+            ("over", Maze.Area(x=7, y=2, width=2, height=2), ValueError)]:
+        try:
+            maze.claim_areas({name: area})
+            assert False, f"{name} should not be claimed"
+        except error:
+            pass
+
+
 def test_maze_get_path():
     """tests maze get path
     """
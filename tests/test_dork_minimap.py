@@ -0,0 +1,190 @@
+"""Tests for dork.minimap
+"""
+import io
+import math
+import random
+import subprocess
+import sys
+import time
+import yaml
+from dork.minimap import AsyncMap, BACKENDS, FrameExporter, GridIndex,\
+    NullMap, TerminalMap, get_map
+from dork.types import Game
+
+
+def default_game(map_backend="none"):
+    """game of the default world without a drawn map
+    """
+    with open('./dork/yaml/default.yml') as file:
+        data = yaml.safe_load(file.read())
+    return Game(data, map_backend=map_backend)
+
+
+def test_null_map(monkeypatch):
+    """the none backend should neither lay out nor draw the map
+    """
+    game = default_game()
+    assert isinstance(game.room_map, NullMap), "none should pick NullMap"
+    assert game.room_map.room_map == {}, "nothing should be laid out"
+    assert game.rooms.hydrated() == 0, "no room should be built"
+    game.room_map.update()
+    assert TerminalMap(game, stream=io.StringIO()).room_map.keys() ==\
+        set(game.rooms), "layouts should lay out every room"
+    assert game.rooms.hydrated() == 0, "layouts should build no room"
+
+    monkeypatch.setenv("DORK_MAP", "terminal")
+    assert isinstance(get_map(game), TerminalMap),\
+        "DORK_MAP should pick the backend"
+    try:
+        get_map(game, "paper")
+    except KeyError as err:
+        assert "unknown map backend" in str(err), "unknown backend"
+
+
+def test_terminal_map():
+    """the terminal backend should print rooms and the player
+    """
+    game = default_game()
+    stream = io.StringIO()
+    minimap = TerminalMap(game, stream=stream)
+    minimap.update()
+    text = stream.getvalue()
+    assert text.count(TerminalMap.PLAYER) == 1, "player should be drawn once"
+    assert text.count(TerminalMap.ROOM) == len(minimap.origins) - 1,\
+        "every other room should be drawn"
+    assert "-" in text or "|" in text, "connections should be drawn"
+
+
+def test_lazy_matplotlib():
+    """importing dork should not import matplotlib or networkx
+    """
+    code = ("import sys, dork.cli, dork.types; "
+            "print(any(name in sys.modules for name in "
+            "('matplotlib', 'networkx', 'pylab')))")
+    out = subprocess.run([sys.executable, "-c", code], check=True,
+                         stdout=subprocess.PIPE, cwd=".").stdout
+    assert out.strip() == b"False", "matplotlib should be imported lazily"
+
+
+class SlowMap(NullMap):
+    """backend that takes a while to draw and records what it drew
+    """
+    drawn = []
+    radii = []
+
+    def show(self):
+        time.sleep(0.05)
+        SlowMap.drawn.append(self._player_room())
+        SlowMap.radii.append(self.radius)
+
+
+def test_async_map(monkeypatch):
+    """updates should return at once and bursts should be coalesced
+    """
+    monkeypatch.setitem(BACKENDS, "slow", SlowMap)
+    game = default_game()
+    minimap = get_map(game, "slow", worker="thread", radius=2)
+    assert isinstance(minimap, AsyncMap), "worker should pick AsyncMap"
+    assert minimap.room_map == {}, "only the worker should lay out the map"
+
+    rooms = list(game.rooms)
+    started = time.time()
+    for room in rooms * 5:
+        game.player.position["location"] = room
+        minimap.update()
+    assert time.time() - started < 0.05, "updates should not wait to draw"
+
+    minimap.close()
+    assert SlowMap.drawn[-1] == rooms[-1], "the latest location is drawn"
+    assert len(SlowMap.drawn) < len(rooms) * 5, "bursts should be coalesced"
+    assert set(SlowMap.radii) == {2}, "the worker should keep the radius"
+
+
+def test_async_map_process():
+    """maps drawn in a worker process should stop when closed
+    """
+    minimap = AsyncMap(default_game(), "none", worker="process")
+    minimap.update()
+    minimap.close()
+    assert minimap.worker.exitcode == 0, "worker should stop cleanly"
+    try:
+        get_map(default_game(), "matplotlib", worker="thread")
+        assert False, "matplotlib cannot draw in a thread"
+    except ValueError as err:
+        assert "process" in str(err)
+
+
+def test_grid_index():
+    """grid index queries should match a brute force search
+    """
+    rng = random.Random(32)
+    points = {f"room{number}": (rng.randint(-50, 50), rng.randint(-50, 50))
+              for number in range(0, 500)}
+    index = GridIndex(points, cell_size=4)
+
+    def distance(name, x, y):
+        return math.hypot(points[name][0] - x, points[name][1] - y)
+
+    for _ in range(0, 50):
+        x, y = rng.uniform(-60, 60), rng.uniform(-60, 60)
+        radius = rng.uniform(0, 20)
+        assert sorted(index.within(x, y, radius)) ==\
+            sorted(name for name in points if distance(name, x, y) <= radius),\
+            "range query should find every point in the circle"
+        assert distance(index.nearest(x, y), x, y) ==\
+            min(distance(name, x, y) for name in points),\
+            "nearest query should find the closest point"
+    assert GridIndex({}).nearest(0, 0) is None, "empty index has no nearest"
+
+
+def test_terminal_map_radius():
+    """a radius should limit the terminal map to nearby rooms
+    """
+    game = default_game()
+    stream = io.StringIO()
+    minimap = TerminalMap(game, stream=stream, radius=1)
+    minimap.update()
+    visible = minimap.visible_rooms()
+    assert game.player.position["location"] in visible,\
+        "the player room should be visible"
+    assert len(visible) < len(minimap.origins), "far rooms should be culled"
+    assert stream.getvalue().count(TerminalMap.ROOM) == len(visible) - 1,\
+        "only visible rooms should be drawn"
+    origin = minimap.origins[visible[0]]
+    closest = minimap.origins[minimap.room_at(origin.x + 0.1, origin.y)]
+    assert (closest.x, closest.y) == (origin.x, origin.y),\
+        "room_at should find the closest room"
+
+
+def test_frame_exporter(tmp_path):
+    """frames should only differ by the player marker, and be quick
+    """
+    game = default_game()
+    exporter = FrameExporter(game, file_name=str(tmp_path / "map.png"))
+    width, height = exporter.size
+    rooms = list(exporter.origins)
+    first = exporter.frame(rooms[0])
+    assert len(first) == 4 * width * height, "frames should be RGBA"
+    assert exporter.frame(rooms[1]) != first, "the marker should move"
+    assert exporter.frame(rooms[0]) == first, "the background is restored"
+
+    file_names = exporter.write_frames(rooms[:2],
+                                       str(tmp_path / "frame_{:02d}.png"))
+    for file_name in file_names:
+        with open(file_name, "rb") as file:
+            assert file.read(8) == b"\x89PNG\r\n\x1a\n", "PNG frames"
+
+    start = time.time()
+    stream = io.BytesIO()
+    exporter.write_animation(stream, rooms * 25)
+    assert time.time() - start < len(rooms) * 25 / 20,\
+        "frames should be composited, not redrawn"
+    animation = stream.getvalue()
+    assert animation.count(b"fcTL") == len(rooms) * 25, "one frame per room"
+    assert animation.count(b"fdAT") == len(rooms) * 25 - 1, "one IDAT frame"
+
+    game.room_map = exporter
+    game.room_map.update()
+    game.room_map.close()
+    with open(tmp_path / "map.png", "rb") as file:
+        assert b"acTL" in file.read(), "close should write the session"
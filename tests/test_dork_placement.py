@@ -0,0 +1,88 @@
+"""Tests for dork.placement
+"""
+import random
+import time
+from dork.maze import Maze
+from dork.placement import pack_rooms, place_rooms
+from dork.types import Room
+from tests.test_dork_minimap import default_game
+
+
+class GridWorld():
+    """rooms on a square grid, connected to their four neighbours
+    """
+    def __init__(self, side):
+        def name(x, y):
+            return f"{x},{y}" if 0 <= x < side and 0 <= y < side else None
+        self.rooms = {name(x, y): Room({"paths": {
+            "up": name(x, y - 1), "down": name(x, y + 1),
+            "left": name(x - 1, y), "right": name(x + 1, y)}})
+                      for y in range(0, side) for x in range(0, side)}
+
+
+def assert_walkable(maze, path):
+    """every step of a corridor should follow a maze edge
+    """
+    for step, next_step in zip(path[1:-2], path[2:-1]):
+        assert maze.graph.has_edge(step, next_step), "corridor has a wall"
+    for (_, room_node), outside in [(path[0], path[1]), (path[-1], path[-2])]:
+        assert abs(room_node % maze.width - outside % maze.width) +\
+            abs(room_node // maze.width - outside // maze.width) == 1,\
+            "corridors should start and end next to the rooms"
+
+
+def test_pack_rooms():
+    """packed rooms should keep a free cell around them
+    """
+    areas, (width, height) = pack_rooms(
+        {name: (2 + name % 3, 1 + name % 2) for name in range(0, 40)})
+    cells = {}
+    for name, area in areas.items():
+        assert area.origin.x >= 1 and area.origin.y >= 1, "border padding"
+        assert area.origin.x + area.box.width < width, "right padding"
+        assert area.origin.y + area.box.height < height, "bottom padding"
+        for x in range(area.origin.x - 1, area.origin.x + area.box.width):
+            for y in range(area.origin.y - 1,
+                           area.origin.y + area.box.height):
+                assert (x, y) not in cells, f"{name} touches {cells[x, y]}"
+                if x >= area.origin.x and y >= area.origin.y:
+                    cells[x, y] = name
+    assert pack_rooms({})[1][0] == Maze.MIN, "empty worlds stay valid"
+
+
+def test_place_rooms_default():
+    """the default world should be placed with a corridor per path
+    """
+    random.seed(33)
+    game = default_game("terminal")
+    placement = place_rooms(game)
+    assert set(placement.maze.areas) == set(game.rooms), "rooms claimed"
+    for name, room in game.rooms.items():
+        for way, other in room.paths.items():
+            if other:
+                path = placement.corridors[(name, way)]
+                assert path[0][0] == name and path[-1][0] == other,\
+                    "corridors should join the connected rooms"
+                assert_walkable(placement.maze, path)
+
+    room_map = game.room_map.room_map
+    for name, info in room_map.items():
+        assert info["node_id"] == placement.node_id(name),\
+            "the minimap should use maze node ids"
+        area = placement.maze.areas[name]
+        assert info["node_id"] == area.origin.x +\
+            area.origin.y * placement.maze.width, "node id of the origin"
+    assert placement.node_id("Jail hallway") in\
+        room_map["Stairwell"]["edges"], "edges should follow the paths"
+
+
+def test_place_rooms_many():
+    """thousands of rooms should be placed in seconds
+    """
+    random.seed(33)
+    world = GridWorld(40)
+    start = time.time()
+    placement = place_rooms(world)
+    assert time.time() - start < 30, "placement should scale"
+    assert len(placement.corridors) == 4 * 40 * 39, "one per direction"
+    assert_walkable(placement.maze, placement.corridors[("0,0", "right")])
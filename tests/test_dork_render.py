@@ -0,0 +1,78 @@
+"""Tests for dork.render
+"""
+import random
+import struct
+import zlib
+from dork.maze import Maze
+from dork.render import render, PATH, AREA, WALL
+
+
+def claimed_maze():
+    """a small maze with two areas and a path between them
+    """
+    random.seed(28)
+    maze = Maze(width=10, height=10)
+    maze.claim_area("room", Maze.Area(x=0, y=0, width=2, height=2))
+    maze.claim_area("hallway", Maze.Area(x=3, y=0, width=3, height=1))
+    return maze, maze.get_path("room", "right", "hallway", "left")
+
+
+def png_pixels(data):
+    """decodes the palette indexes of an unfiltered PNG
+    """
+    assert data.startswith(b"\x89PNG\r\n\x1a\n"), "png signature missing"
+    offset, idat, width = 8, b"", 0
+    while offset < len(data):
+        length, kind = struct.unpack(">I4s", data[offset:offset + 8])
+        chunk = data[offset + 8:offset + 8 + length]
+        if kind == b"IHDR":
+            width = struct.unpack(">I", chunk[:4])[0]
+        if kind == b"IDAT":
+            idat += chunk
+        offset += 12 + length
+    raw = zlib.decompress(idat)
+    return [raw[start + 1:start + 1 + width]
+            for start in range(0, len(raw), width + 1)]
+
+
+def test_render_png(tmp_path):
+    """png output should show walls, areas and the path
+    """
+    maze, path = claimed_maze()
+    file_name = str(tmp_path / "maze.png")
+    render(maze, file_name, paths=[path])
+    with open(file_name, "rb") as file:
+        rows = png_pixels(file.read())
+
+    assert len(rows) == 21 and len(rows[0]) == 21,\
+        "a 10x10 maze should be a 21x21 pixel image"
+    assert set(rows[0]) == {WALL}, "top border should be wall"
+    assert rows[1][1] == AREA, "claimed areas should be highlighted"
+    x, y = path[1] % 10, path[1] // 10
+    assert rows[2 * y + 1][2 * x + 1] == PATH, "path should be highlighted"
+
+
+def test_render_pgm_and_svg(tmp_path):
+    """pgm and svg output should have the scaled dimensions
+    """
+    maze, path = claimed_maze()
+    file_name = str(tmp_path / "maze.pgm")
+    render(maze, file_name, scale=2, paths=[path])
+    with open(file_name, "rb") as file:
+        data = file.read()
+    assert data.startswith(b"P5\n42 42\n255\n"), "pgm header is wrong"
+    assert len(data) == len(b"P5\n42 42\n255\n") + 42 * 42,\
+        "pgm should hold one byte per pixel"
+
+    file_name = str(tmp_path / "maze.svg")
+    render(maze, file_name, paths=[path])
+    with open(file_name) as file:
+        svg = file.read()
+    assert svg.startswith("<svg") and svg.endswith("</svg>\n"),\
+        "svg should be a single svg element"
+    assert 'fill="#dc2828"' in svg, "path should be drawn"
+
+    try:
+        render(maze, str(tmp_path / "maze.bmp"))
+    except ValueError as err:
+        assert ".png" in str(err), "unsupported formats should be refused"
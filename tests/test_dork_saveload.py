@@ -1,6 +1,10 @@
 """Tests saveload.
 """
+import os
+import shutil
 from types import FunctionType
+from unittest.mock import patch
+import pytest
 import yaml
 import dork.saveload
 from dork import types
@@ -43,3 +47,269 @@ def teststate(run):
         run(dork.saveload.game_state)
     except:  # noqa: E722
         raise AssertionError("cannot run 'dork' command")
+
+
+def test_delta_saves(tmp_path):
+    """saving to the same file again should only append what changed
+    """
+    with open('./dork/yaml/default.yml') as file:
+        game = types.Game(yaml.safe_load(file.read()), map_backend="none")
+    file_name = str(tmp_path / "delta.yml")
+    dork.saveload.write(game, file_name)
+    size = len(open(file_name).read())
+
+    dork.saveload.write(game, file_name)
+    assert len(open(file_name).read()) == size, "nothing changed"
+
+    game.player.inventory.append("key")
+    game.rooms["cell"].door["item"].remove("key")
+    game.touch("cell")
+    dork.saveload.write(game, file_name)
+    game.player.position["location"] = "Jail hallway"
+    game.touch()
+    dork.saveload.write(game, file_name)
+
+    with open(file_name) as file:
+        documents = list(yaml.safe_load_all(file))
+    assert len(documents) == 3, "one delta record per save"
+    assert list(documents[1]["rooms"]) == ["cell"], "only changed rooms"
+    assert "rooms" not in documents[2], "moves only save the player"
+    loaded = dork.saveload.load_file(file_name)
+    assert loaded.pop("base"), "loaded files are added to the store"
+    assert loaded == game.save(), "deltas should fold onto the full save"
+
+    dork.saveload.write(game, str(tmp_path / "other.yml"))
+    dork.saveload.write(game, file_name)
+    with open(file_name) as file:
+        assert len(list(yaml.safe_load_all(file))) == 1,\
+            "a full save drops the delta records"
+
+
+def test_overlay_saves(tmp_path):
+    """games loaded from a world should save only their mutable slice
+    """
+    data = dork.saveload.load_file('./dork/yaml/default.yml')
+    game = types.Game(data, map_backend="none")
+    assert game.base, "loaded worlds are stored by content hash"
+
+    game.player.inventory.append("key")
+    game.rooms["cell"].door["item"].remove("key")
+    game.touch("cell")
+    game.rooms["Jail hallway"].door["locked"] = False
+    game.touch("Jail hallway")
+    file_name = str(tmp_path / "overlay.yml")
+    dork.saveload.write(game, file_name)
+    with open(file_name) as file:
+        overlay = yaml.safe_load(file.read())
+    assert overlay["base"] == game.base, "overlays name their base world"
+    assert set(overlay["rooms"]) == {"cell", "Jail hallway"},\
+        "only rooms that may have changed are saved"
+    assert "messages" not in overlay["rooms"]["cell"], "no static text"
+
+    loaded = dork.saveload.load_file(file_name)
+    assert loaded["overlay"] == ["Jail hallway", "cell"]
+    reloaded = types.Game(loaded, map_backend="none")
+    assert reloaded.save() == game.save(), "overlays load as saved"
+    assert set(reloaded.save_overlay()["rooms"]) == {"cell", "Jail hallway"},\
+        "overlay rooms stay in later overlays"
+
+    with open(file_name, "w") as file:
+        yaml.safe_dump(dict(overlay, base="0" * 64), file)
+    try:
+        dork.saveload.load_file(file_name)
+        assert False, "unknown base worlds cannot load"
+    except FileNotFoundError as err:
+        assert "0" * 64 in str(err)
+
+
+def test_overlay_delta_saves(tmp_path):
+    """rooms changed by delta records of an overlay should stay in later
+    overlays
+    """
+    game = types.Game(dork.saveload.load_file('./dork/yaml/default.yml'),
+                      map_backend="none")
+    file_name = str(tmp_path / "x.yml")
+    dork.saveload.write(game, file_name)
+    game.rooms["Jail hallway"].door["locked"] = False
+    game.touch("Jail hallway")
+    dork.saveload.write(game, file_name)
+    with open(file_name) as file:
+        delta = list(yaml.safe_load_all(file))[1]
+    assert "messages" not in delta["rooms"]["Jail hallway"],\
+        "deltas of overlays hold no static text"
+
+    loaded = types.Game(dork.saveload.load_file(file_name),
+                        map_backend="none")
+    dork.saveload.write(loaded, str(tmp_path / "y.yml"))
+    reloaded = types.Game(dork.saveload.load_file(str(tmp_path / "y.yml")),
+                          map_backend="none")
+    assert reloaded.rooms["Jail hallway"].door["locked"] is False
+
+
+def test_parse_cache(tmp_path):
+    """unchanged files should load from the parse cache without parsing
+    """
+    file_name = str(tmp_path / "world.yml")
+    shutil.copyfile('./dork/yaml/default.yml', file_name)
+    data = dork.saveload.load_file(file_name)
+    assert os.path.exists(dork.saveload.cache_file(file_name)),\
+        "parses are cached"
+    assert not os.path.exists(file_name + dork.saveload.CACHE_SUFFIX),\
+        "caches are kept in the store"
+
+    with patch("yaml.load_all") as load_all:
+        assert dork.saveload.load_file(file_name) == data
+        os.utime(file_name, ns=(0, 0))
+        assert dork.saveload.load_file(file_name) == data,\
+            "touched files are recognised by their hash"
+        assert not load_all.called, "cached files are not parsed"
+
+    with open(file_name, "a") as file:
+        file.write("---\nplayer:\n  position:\n    location: cell\n")
+    assert dork.saveload.load_file(file_name)["player"]["position"] ==\
+        {"location": "cell"}, "changed files are parsed again"
+
+
+def test_binary_saves(tmp_path):
+    """binary saves should load like YAML ones and convert both ways
+    """
+    data = dork.saveload.load_file('./dork/yaml/default.yml')
+    game = types.Game(data, map_backend="none")
+    game.rooms["Jail hallway"].door["locked"] = False
+    game.touch("Jail hallway")
+    file_name = str(tmp_path / "game.dork")
+    dork.saveload.write(game, file_name)
+    dork.saveload.write(game, file_name)
+    with open(file_name, "rb") as file:
+        assert dork.binary.is_binary(file.read()), "no YAML delta appended"
+    loaded = types.Game(dork.saveload.load_file(file_name), map_backend="none")
+    assert loaded.save() == game.save(), "binary saves load as saved"
+
+    yaml_name = str(tmp_path / "game.yml")
+    dork.saveload.convert(file_name, yaml_name)
+    dork.saveload.convert(yaml_name, str(tmp_path / "again.dork"))
+    with open(yaml_name) as file:
+        assert yaml.safe_load(file.read())["base"] == game.base
+    assert dork.saveload.load_file(str(tmp_path / "again.dork")) ==\
+        dork.saveload.load_file(file_name), "conversions lose nothing"
+
+
+def test_world_file_saves(tmp_path):
+    """world files should load as the base of overlay saves
+    """
+    world_name = str(tmp_path / "default.world")
+    dork.saveload.convert('./dork/yaml/default.yml', world_name)
+    game = types.Game(dork.saveload.load_file(world_name), map_backend="none")
+    assert "key" in game.rooms.loaded("cell")["door"]["item"]
+    game.rooms["cell"].door["item"].remove("key")
+    game.touch("cell")
+    file_name = str(tmp_path / "overlay.yml")
+    dork.saveload.write(game, file_name)
+    reloaded = types.Game(dork.saveload.load_file(file_name),
+                          map_backend="none")
+    assert "key" not in reloaded.rooms["cell"].door["item"], "overlays apply"
+    assert reloaded.rooms.loaded("Entrance") == game.rooms.loaded("Entrance")
+
+
+def test_database_saves(tmp_path):
+    """games should save to and load from the database by name
+    """
+    game = types.Game(dork.saveload.load_file('./dork/yaml/default.yml'),
+                      map_backend="none")
+    game.rooms["cell"].door["item"].remove("key")
+    game.touch("cell")
+    game.player.inventory.append("key")
+    dork.saveload.write(game, "db:first")
+    assert dork.saveload.open_database().saves() == ["first"]
+    assert dork.saveload.open_database().worlds() == [game.base],\
+        "the base world is added with the first save"
+
+    loaded = types.Game(dork.saveload.load_file("db:first"),
+                        map_backend="none")
+    assert loaded.save() == game.save(), "database saves load as saved"
+    assert dork.saveload.load_file(f"db:{game.base}")["base"] == game.base
+    try:
+        dork.saveload.load_file("db:missing")
+        assert False, "missing saves cannot load"
+    except FileNotFoundError:
+        pass
+    dork.saveload.convert("db:first", str(tmp_path / "first.yml"))
+    assert dork.saveload.load_file(str(tmp_path / "first.yml"))["player"] ==\
+        game.player.save()
+
+
+def test_compressed_saves(tmp_path):
+    """compressed saves should stream and load by their magic bytes
+    """
+    game = types.Game(dork.saveload.load_file('./dork/yaml/default.yml'),
+                      map_backend="none")
+    for suffix in dork.saveload.COMPRESSORS:
+        for name in ("game.yml", "game.dork"):
+            file_name = str(tmp_path / (name + suffix))
+            game.save_file = None
+            dork.saveload.write(game, file_name)
+            with open(file_name, "rb") as file:
+                assert b"player" not in file.read(), "saves are compressed"
+            loaded = types.Game(dork.saveload.load_file(file_name),
+                                map_backend="none")
+            assert loaded.save() == game.save(), f"{file_name} loads"
+
+    file_name = str(tmp_path / "game.yml.gz")
+    game.save_file = None
+    dork.saveload.write(game, file_name)
+    game.rooms["cell"].door["item"].remove("key")
+    game.touch("cell")
+    dork.saveload.write(game, file_name)
+    renamed = str(tmp_path / "renamed.yml")
+    os.replace(file_name, renamed)
+    loaded = types.Game(dork.saveload.load_file(renamed), map_backend="none")
+    assert loaded.save() == game.save(), "deltas append as new streams"
+
+
+def test_store_suffixes(tmp_path):
+    """stored worlds should keep the suffix of the file they came from
+    """
+    world = str(tmp_path / "world.yml.gz")
+    dork.saveload.convert('./dork/yaml/default.yml', world)
+    game = types.Game(dork.saveload.load_file(world), map_backend="none")
+    with pytest.raises(FileNotFoundError):
+        dork.saveload.resolve_world(game.base)
+
+    file_name = str(tmp_path / "overlay.yml")
+    dork.saveload.write(game, file_name)
+    stored = dork.saveload.resolve_world(game.base)
+    assert stored == os.path.join(dork.saveload.store_dir(),
+                                  game.base + ".yml.gz")
+    assert dork.saveload.store_world(world, game.base) == game.base
+    assert os.listdir(dork.saveload.store_dir()).count(
+        game.base + ".yml.gz") == 1, "worlds are stored once"
+    loaded = types.Game(dork.saveload.load_file(file_name),
+                        map_backend="none")
+    assert loaded.save() == game.save(), "overlays load from any suffix"
+
+
+def test_full_saves(tmp_path):
+    """games should save whole when asked to or when their base world
+    cannot be stored
+    """
+    world = str(tmp_path / "world.yml")
+    shutil.copyfile('./dork/yaml/default.yml', world)
+    game = types.Game(dork.saveload.load_file(world), map_backend="none")
+    file_name = str(tmp_path / "full.yml")
+    dork.saveload.write(game, file_name, full=True)
+    with open(file_name) as file:
+        assert "base" not in yaml.safe_load(file.read()),\
+            "full saves need no store"
+    with pytest.raises(FileNotFoundError):
+        dork.saveload.resolve_world(game.base)
+
+    with open(world, "a") as file:
+        file.write("---\nplayer:\n  position:\n    location: cell\n")
+    file_name = str(tmp_path / "changed.yml")
+    dork.saveload.write(game, file_name)
+    with open(file_name) as file:
+        assert "base" not in yaml.safe_load(file.read()),\
+            "games whose world changed on disk are saved whole"
+    loaded = types.Game(dork.saveload.load_file(file_name),
+                        map_backend="none")
+    assert loaded.save() == game.save()
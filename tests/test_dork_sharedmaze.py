@@ -0,0 +1,68 @@
+"""Tests for dork.sharedmaze
+"""
+import multiprocessing
+import random
+import pytest
+from dork.maze import Maze
+from dork.sharedmaze import SharedMaze
+
+
+def attached_neighbors(name):
+    """attaches to a shared maze from a worker process
+    """
+    maze = SharedMaze.attach(name)
+    found = {node: sorted(maze.neighbors(node))
+             for node in range(0, maze.size())}
+    path = maze.get_path("room", "right", "hallway", "left")
+    maze.close()
+    return found, path
+
+
+def test_shared_maze():
+    """shared mazes should answer queries like the maze they copy
+    """
+    random.seed(27)
+    maze = Maze(width=10, height=10)
+    maze.claim_area("room", Maze.Area(x=0, y=0, width=2, height=2))
+    maze.claim_area("hallway", Maze.Area(x=3, y=0, width=3, height=1))
+
+    shared = SharedMaze.publish(maze)
+    try:
+        with multiprocessing.Pool(1) as pool:
+            found, path = pool.apply(attached_neighbors, (shared.name,))
+    finally:
+        shared.close()
+        shared.unlink()
+
+    assert all(found[node] == sorted(maze.neighbors(node))
+               for node in maze.graph.nodes()),\
+        "shared maze neighbours should match the maze graph"
+    assert path[0][0] == "room" and path[-1][0] == "hallway",\
+        "path should go from room to hallway"
+    nodes = path[1:-1]
+    assert all(next_node in found[node]
+               for node, next_node in zip(nodes, nodes[1:])),\
+        "path should only step between neighbouring nodes"
+
+
+def test_shared_maze_read_only():
+    """shared mazes should refuse changes
+    """
+    shared = SharedMaze.publish(Maze(width=5, height=5))
+    try:
+        assert shared.size() == 25, "shared maze should have 25 nodes"
+        with pytest.raises(RuntimeWarning, match="read only"):
+            shared.claim_area("room", Maze.Area(x=0, y=0, width=2, height=2))
+    finally:
+        shared.close()
+        shared.unlink()
+
+    published = SharedMaze.publish(Maze(width=5, height=5))
+    reader = SharedMaze.attach(published.name)
+    try:
+        with pytest.raises(RuntimeWarning, match="publisher"):
+            reader.unlink()
+    finally:
+        reader.close()
+        published.close()
+        published.unlink()
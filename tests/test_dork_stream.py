@@ -0,0 +1,42 @@
+"""Tests for dork.stream
+"""
+import gzip
+import io
+import os
+import shutil
+import yaml
+import dork.saveload
+from dork import stream
+
+
+def test_stream_documents():
+    """streaming should parse the same documents as yaml does
+    """
+    with open('./dork/yaml/default.yml', 'rb') as file:
+        content = file.read()
+    assert stream.documents(io.BytesIO(content)) ==\
+        list(yaml.safe_load_all(content))
+    content = b"version: &v [1, 2]\nrooms:\n  a: {v: *v}\n  b: *v\n" +\
+        b"items: {}\n---\nplayer: {}\n"
+    parsed = stream.documents(io.BytesIO(content))
+    assert parsed == list(yaml.safe_load_all(content))
+    assert parsed[0]["rooms"]["a"]["v"] is parsed[0]["version"],\
+        "aliases share their anchored objects"
+    assert stream.documents(io.BytesIO(b"")) == []
+    assert stream.documents(io.BytesIO(b"- 1\n- 2\n")) == [[1, 2]]
+
+
+def test_streamed_parse_file(tmp_path, monkeypatch):
+    """files of STREAM_SIZE or more should be streamed and not cached
+    """
+    file_name = str(tmp_path / "huge.yml")
+    shutil.copy('./dork/yaml/default.yml', file_name)
+    expected = dork.saveload.parse_file('./dork/yaml/default.yml')
+    monkeypatch.setattr(dork.saveload, "STREAM_SIZE", 0)
+    assert dork.saveload.parse_file(file_name) == expected
+    assert not os.path.exists(dork.saveload.cache_file(file_name))
+
+    with open(file_name, 'rb') as source,\
+            gzip.open(file_name + ".gz", 'wb') as target:
+        shutil.copyfileobj(source, target)
+    assert dork.saveload.parse_file(file_name + ".gz") == expected
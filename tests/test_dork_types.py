@@ -1,7 +1,9 @@
 """tests types not covered in other test files
 """
+import copy
+import tracemalloc
 import yaml
-from dork.types import Map, Game, Room
+from dork.types import Map, Game, Player, Room
 
 
 def dork_test_map():
@@ -24,3 +26,145 @@ def dork_test_map():
         "room map is not fully connected"
 
     minimap.update()
+
+
+def test_map_update_redraws_once(mocker):
+    """moving the player should only move the marker, not redraw the map
+    """
+    with open('./dork/yaml/default.yml') as file:
+        data = yaml.safe_load(file.read())
+
+    draw = mocker.spy(Map, "_draw")
+    game = Game(data)
+    for room_name in game.rooms:
+        game.player.position["location"] = room_name
+        game.room_map.update()
+        assert tuple(game.room_map._marker.get_offsets()[0]) ==\
+            game.room_map.positions[room_name],\
+            "player marker should follow the player"
+    assert draw.call_count == 1, "the static map should be drawn once"
+
+
+def test_compact_rooms():
+    """rooms should save as loaded while sharing their immutable parts
+    """
+    with open('./dork/yaml/default.yml') as file:
+        data = yaml.safe_load(file.read())
+
+    for name, room_data in data["rooms"].items():
+        saved = Room(room_data).save()
+        assert saved == room_data, f"{name} should save unchanged"
+        assert all(list(saved[key]) == list(room_data[key])
+                   for key in room_data), "key order should be kept"
+
+    copies = [Room(yaml.safe_load(yaml.safe_dump(data["rooms"]["cell"])))
+              for _ in range(0, 2)]
+    assert copies[0].messages is copies[1].messages, "messages are shared"
+    assert copies[0].door is not copies[1].door, "doors are not shared"
+    copies[0].door["locked"] = not copies[1].door["locked"]
+    assert copies[0].door["locked"] != copies[1].door["locked"],\
+        "door state belongs to one room"
+    try:
+        copies[0].messages["inspect"] = ""
+        assert False, "messages should be immutable"
+    except TypeError:
+        pass
+    try:
+        copies[0].notes = ""
+        assert False, "entities should not grow attributes"
+    except AttributeError:
+        pass
+
+
+def test_record_extras():
+    """keys records do not know should be kept and saved back
+    """
+    with open('./dork/yaml/default.yml') as file:
+        data = yaml.safe_load(file.read())
+    cell = data["rooms"]["cell"]
+    cell["door"]["hinge"] = "left"
+    cell["messages"]["smell"] = {"damp": True}
+    cell["paths"]["through"] = "wall"
+
+    room = Room(copy.deepcopy(cell))
+    assert room.save() == cell, "unknown keys should be saved back"
+    assert room.door["hinge"] == "left" and "hinge" in room.door.extras
+    assert Room(copy.deepcopy(cell)).paths is room.paths,\
+        "records with extras are still shared"
+
+    game = Game(data, map_backend="none")
+    assert game.rooms["cell"].save() == cell, "world rooms keep them too"
+    assert game.rooms["cell"].paths["through"] == "wall"
+
+
+def test_compact_rooms_memory():
+    """rooms should take a fraction of the memory of the loaded data
+    """
+    with open('./dork/yaml/default.yml') as file:
+        rooms = yaml.safe_load(file.read())["rooms"]
+    text = yaml.safe_dump(rooms)
+
+    tracemalloc.start()
+    loaded = [yaml.safe_load(text) for _ in range(0, 10)]
+    raw_size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    compact = [{name: Room(room) for name, room in yaml.safe_load(
+        text).items()} for _ in range(0, 10)]
+    compact_size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert len(loaded) == len(compact)
+    assert compact_size < raw_size / 2, "rooms should be compact"
+
+
+def test_lazy_game():
+    """entities and the minimap should only be built when used
+    """
+    with open('./dork/yaml/default.yml') as file:
+        data = yaml.safe_load(file.read())
+    cell = data["rooms"]["cell"]
+    data["rooms"].update({f"room {number}": copy.deepcopy(cell)
+                          for number in range(0, 2000)})
+    expected = copy.deepcopy(data)
+
+    game = Game(data, map_backend="none")
+    assert game._room_map is None, "the minimap waits for the first move"
+    assert game.rooms.hydrated() == 0, "rooms wait for their first visit"
+    assert "room 5" in game.rooms and len(game.rooms) == len(data["rooms"])
+    assert game.rooms.hydrated() == 0, "membership builds no room"
+
+    game.rooms["cell"].door["locked"] = True
+    expected["rooms"]["cell"]["door"]["locked"] = True
+    assert game.rooms.hydrated() == 1, "only the visited room is built"
+    assert game.rooms["cell"] is game.rooms["cell"], "rooms are kept"
+    assert game.save() == expected, "saves should hold every entry"
+    game.close()
+    assert game._room_map is None, "closing should not build the minimap"
+
+
+def test_world_rooms_save_as_loaded():
+    """world rooms should only save the flags and paths they were loaded with
+    """
+    with open('./dork/yaml/default.yml') as file:
+        data = yaml.safe_load(file.read())
+    cell = data["rooms"]["cell"]
+    del cell["door"]["locked"]
+    del cell["fight"]["fight"]
+    cell["paths"] = {"left": cell["paths"]["left"]}
+    expected = copy.deepcopy(cell)
+
+    game = Game(data, map_backend="none")
+    room = game.rooms["cell"]
+    assert room.save() == expected, "missing keys should stay missing"
+    room.door["locked"] = True
+    assert room.save()["door"] == dict(expected["door"], locked=True),\
+        "keys set since loading are saved"
+
+
+def test_partial_player():
+    """players should load without some of their entries, as None
+    """
+    player = Player({'position': {'location': 'x'}})
+    assert player.save() == {"position": {"location": "x"},
+                             "inventory": None, "stats": None}
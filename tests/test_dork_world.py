@@ -0,0 +1,64 @@
+"""Tests for dork.world
+"""
+import yaml
+from dork.types import Game
+from dork.world import DIRECTIONS, NO_NAME, NO_ROOM, World
+
+
+def default_data():
+    """the loaded default world
+    """
+    with open('./dork/yaml/default.yml') as file:
+        return yaml.safe_load(file.read())
+
+
+def test_world_paths():
+    """paths and flags should match the loaded rooms
+    """
+    rooms = default_data()["rooms"]
+    world = World(rooms)
+    assert world.step(world.room_id("cell"), "up") >= 0, "cell leads up"
+    assert len(world.names) < len(rooms), "rooms get ids on first lookup"
+    for name, room in rooms.items():
+        for way in DIRECTIONS:
+            assert world.path(name, way) == room["paths"][way],\
+                f"{name} {way} should lead where the room says"
+        assert world.is_locked(name) == room["door"]["locked"]
+        assert world.has_fight(name) == room["fight"]["fight"]
+
+    assert world.compile() is world and len(world.names) == len(rooms)
+    assert len(world.paths) == 4 * len(rooms), "one row per room"
+    assert set(world.rooms_where(world.locked)) ==\
+        {name for name, room in rooms.items() if room["door"]["locked"]},\
+        "bulk queries should cover every room"
+
+    world = World({"a": {"paths": {"up": None, "down": "b"}},
+                   "b": {"paths": {}}})
+    assert world.step(world.room_id("a"), "up") == NO_NAME
+    assert world.step(world.room_id("a"), "left") == NO_ROOM
+    assert world.path("a", "down") == "b" and world.path("b", "up") == ""
+
+
+def test_world_room_views():
+    """rooms of a game should read and write the world arrays
+    """
+    data = default_data()
+    game = Game(data, map_backend="none")
+    hallway = game.rooms["Jail hallway"]
+    assert dict(hallway.paths) == data["rooms"]["Jail hallway"]["paths"]
+    assert hallway.door["locked"] is True, "flags should stay booleans"
+
+    hallway.door["locked"] = False
+    hallway.fight["fight"] = False
+    assert not game.world.is_locked("Jail hallway"), "doors write through"
+    assert not game.world.has_fight("Jail hallway"), "fights write through"
+    saved = game.save()["rooms"]["Jail hallway"]
+    assert saved["door"] == {"item": ["torch"], "locked": False,
+                             "unlock": "key"}, "saves read the arrays"
+    assert list(saved["paths"]) == list(data["rooms"]["cell"]["paths"]),\
+        "paths should save in the loaded order"
+    try:
+        hallway.paths["up"] = "cell"
+        assert False, "paths are read only"
+    except TypeError:
+        pass
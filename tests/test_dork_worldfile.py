@@ -0,0 +1,60 @@
+"""Tests for dork.worldfile
+"""
+import yaml
+from dork.types import Game
+from dork.worldfile import WorldFile, is_world_file, write_world
+
+
+def default_data():
+    """the loaded default world
+    """
+    with open('./dork/yaml/default.yml') as file:
+        return yaml.safe_load(file.read())
+
+
+def test_world_file(tmp_path):
+    """rooms should be decoded from the mapped file only when looked up
+    """
+    data = default_data()
+    file_name = str(tmp_path / "default.world")
+    write_world(data, file_name)
+    assert is_world_file(file_name)
+
+    world = WorldFile(file_name)
+    assert len(world) == len(data["rooms"]) and world.decoded() == 0
+    assert list(world) == sorted(data["rooms"]), "the index is sorted"
+    assert world["cell"] == data["rooms"]["cell"]
+    assert "cell" in world and "attic" not in world
+    assert world.decoded() == 1, "only looked up rooms are decoded"
+    try:
+        world["attic"]
+        assert False, "missing rooms are missing"
+    except KeyError:
+        pass
+
+    loaded = world.data()
+    assert loaded["player"] == data["player"] and loaded["rooms"] is world
+    game = Game(loaded, map_backend="none")
+    paths = data["rooms"]["cell"]["paths"]
+    assert game.world.path("cell", "up") == paths["up"]
+    assert world.decoded() <= 2, "the game reads the rooms it visits"
+    assert dict(world) == data["rooms"], "every room reads back as written"
+    world.close()
+
+
+def test_world_file_partial_rooms(tmp_path):
+    """rooms lacking parts or keys should keep their shape
+    """
+    rooms = {"a": {"door": {"item": ["key", None]}, "fight": None},
+             "b": {}}
+    file_name = str(tmp_path / "partial.world")
+    write_world({"player": {}, "rooms": rooms}, file_name)
+    world = WorldFile(file_name)
+    assert dict(world) == rooms
+    world.close()
+    for room in ({"attic": {}}, {"door": {"locked": 1}}):
+        try:
+            write_world({"rooms": {"a": room}}, file_name)
+            assert False, f"{room} has no world file form"
+        except ValueError:
+            pass